@@ -1,15 +1,28 @@
 from flask import Flask, render_template, request, redirect, url_for, session
-from sqlalchemy import create_engine, text
-import os
+from sqlalchemy import text
+import subprocess
+import sys
+import threading
+
+import catalog
+import metrics
+from db import get_engine, read_connection
 
 app = Flask(__name__)
 app.secret_key = "your_secret_key"
 
-# Database configuration
-DATABASE_URL = os.getenv("DATABASE_URL")
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-engine = create_engine(DATABASE_URL)
+# Database configuration (DATABASE_URL); the engine is shared by all threads of a worker
+engine = get_engine()
+
+# The Dash dashboard process started from /dash, shared by all threads of a worker
+dash_process = None
+dash_lock = threading.Lock()
+
+# Request latency, pool usage and the /metrics endpoint
+metrics.instrument_app(app, engine)
+
+# Product lookups by ID, barcode or name (/api/products/...), served from an in-memory index
+catalog.register_routes(app, engine)
 
 # Flask route for login
 @app.route("/", methods=["GET", "POST"])
@@ -19,16 +32,20 @@ def login():
         password = request.form["password"]
 
         # Query the database for the user
-        with engine.connect() as conn:
+        with read_connection(engine) as conn:
             query = text("SELECT * FROM users WHERE username = :username AND password = :password")
             result = conn.execute(query, {"username": username, "password": password}).fetchone()
 
         # Validate user
         if result:
+            metrics.LOGINS.labels("success").inc()
+            if not session.get("logged_in"):
+                metrics.ACTIVE_SESSIONS.inc()
             session["logged_in"] = True
             session["username"] = username
             return redirect(url_for("menu"))
         else:
+            metrics.LOGINS.labels("failure").inc()
             return render_template("login.html", error="Invalid credentials")
 
     return render_template("login.html")
@@ -43,7 +60,8 @@ def menu():
 
 @app.route("/logout")
 def logout():
-    session.pop("logged_in", None)
+    if session.pop("logged_in", None):
+        metrics.ACTIVE_SESSIONS.dec()
     session.pop("username", None)
     return redirect(url_for("login"))
 
@@ -52,7 +70,11 @@ def logout():
 def dash_dashboard():
     if not session.get("logged_in"):
         return redirect(url_for("login"))
-    os.system("python dash_dashboard.py")  # Launch Dash
+    global dash_process
+    # Launch Dash in the background (once) instead of blocking this worker until it exits
+    with dash_lock:
+        if dash_process is None or dash_process.poll() is not None:
+            dash_process = subprocess.Popen([sys.executable, "dash_dashboard.py"])
     return "Dash dashboard is running!"
 
 
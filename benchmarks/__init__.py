@@ -0,0 +1,3 @@
+"""
+Benchmark harnesses for the dashboard data pipeline, the Flask app and the batch imports.
+"""
@@ -0,0 +1,253 @@
+"""
+Load test for the Flask app (app.py).
+
+Starts the app (by default under gunicorn with gunicorn.conf.py) against
+a SQLite stand-in for the users table, then drives it with concurrent simulated
+users that log in, open the menu and log out in a loop. Reports p50/p95/p99
+latency per route and overall throughput, and writes them to JSON.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_app --users 10 50 --duration 30
+    python -m benchmarks.bench_app --users 50 --worker-class sync
+    python -m benchmarks.bench_app --server flask --users 20
+    python -m benchmarks.bench_app --url http://localhost:8000 --users 20   # already running app
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlparse
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# '{prelude}' runs before the server starts (see DB_LATENCY_PRELUDE); forked workers inherit it
+SERVER_COMMANDS = {
+    "gunicorn": [sys.executable, "-c", "{prelude}import sys; from gunicorn.app.wsgiapp import run; "
+                                       "sys.argv[0] = 'gunicorn'; run()",
+                 "app:app", "--config", "gunicorn.conf.py",
+                 "--workers", "{workers}", "--worker-class", "{worker_class}", "--threads", "{threads}",
+                 "--bind", "127.0.0.1:{port}"],
+    "flask": [sys.executable, "-c", "{prelude}from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"],
+}
+
+# Adds a fixed delay to every query, so the local SQLite stand-in waits on the
+# database like a login against a remote Postgres does
+DB_LATENCY_PRELUDE = ("import time; from sqlalchemy import event; from sqlalchemy.engine import Engine; "
+                      "event.listen(Engine, 'before_cursor_execute', lambda *args: time.sleep({latency})); ")
+
+
+def create_users_db(path, users):
+    """
+    SQLite stand-in with a 'users' table holding user<i> / password<i>.
+    """
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password TEXT)")
+        conn.executemany("INSERT OR REPLACE INTO users VALUES (?, ?)",
+                         [(f"user{i}", f"password{i}") for i in range(users)])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(host, port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on {host}:{port} did not start within {timeout}s")
+
+
+class Session:
+    """
+    Keep-alive HTTP connection with a cookie jar, one per simulated user.
+    Redirects are not followed so every route is measured on its own.
+    """
+
+    def __init__(self, host, port):
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+        self.cookies = SimpleCookie()
+
+    def request(self, method, path, form=None):
+        headers = {}
+        body = None
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v.value}" for k, v in self.cookies.items())
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        self.conn.request(method, path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        response.read()
+        for header in response.headers.get_all("Set-Cookie") or []:
+            self.cookies.load(header)
+        return response.status
+
+    def close(self):
+        self.conn.close()
+
+
+def simulated_user(host, port, user_id, deadline, samples, errors, lock):
+    """
+    Logs in, opens the menu and logs out until 'deadline'.
+    """
+    steps = [
+        ("login", "POST", "/", {"username": f"user{user_id}", "password": f"password{user_id}"}, 302),
+        ("menu", "GET", "/menu", None, 200),
+        ("logout", "GET", "/logout", None, 302),
+    ]
+    session = Session(host, port)
+    local = defaultdict(list)
+    local_errors = defaultdict(int)
+    try:
+        while time.time() < deadline:
+            for route, method, path, form, expected in steps:
+                start = time.perf_counter()
+                try:
+                    status = session.request(method, path, form)
+                except (OSError, http.client.HTTPException):
+                    session.close()
+                    session = Session(host, port)
+                    status = None
+                local[route].append(time.perf_counter() - start)
+                if status != expected:
+                    local_errors[route] += 1
+    finally:
+        session.close()
+        with lock:
+            for route, values in local.items():
+                samples[route].extend(values)
+            for route, count in local_errors.items():
+                errors[route] += count
+
+
+def run_load(host, port, users, duration):
+    """
+    Runs 'users' simulated users for 'duration' seconds; returns per-route stats.
+    """
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.time() + duration
+    threads = [
+        threading.Thread(target=simulated_user, args=(host, port, i, deadline, samples, errors, lock))
+        for i in range(users)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    routes = {}
+    for route, values in samples.items():
+        ms = np.array(values) * 1000
+        routes[route] = {
+            "requests": len(values),
+            "errors": errors[route],
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "requests_per_second": len(values) / elapsed,
+        }
+    total = sum(len(values) for values in samples.values())
+    return {
+        "users": users,
+        "duration_s": elapsed,
+        "requests": total,
+        "errors": sum(errors.values()),
+        "requests_per_second": total / elapsed,
+        "routes": routes,
+    }
+
+
+def print_result(result):
+    print(f"users={result['users']}: {result['requests']:,} requests, {result['errors']} errors, "
+          f"{result['requests_per_second']:,.1f} req/s")
+    for route, stats in result["routes"].items():
+        print(f"  {route:<7} p50 {stats['p50_ms']:7.1f}ms  p95 {stats['p95_ms']:7.1f}ms  "
+              f"p99 {stats['p99_ms']:7.1f}ms  {stats['requests_per_second']:8.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Flask login/menu/logout routes.")
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 50], help="Concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per load level")
+    parser.add_argument("--server", choices=list(SERVER_COMMANDS), default="gunicorn")
+    parser.add_argument("--workers", type=int, default=3, help="gunicorn workers (gunicorn.conf.py uses 3)")
+    parser.add_argument("--worker-class", default="gthread", help="gunicorn worker class: sync, gthread or gevent")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per gthread worker")
+    parser.add_argument("--server-args", default="", help="Extra arguments appended to the server command")
+    parser.add_argument("--db-latency", type=float, default=0,
+                        help="Milliseconds added to every query of the started app, to mimic a remote database")
+    parser.add_argument("--url", help="Use an already running app instead of starting one")
+    parser.add_argument("--database-url", help="Database for the started app (default: SQLite stand-in)")
+    parser.add_argument("--output", default="bench_app.json", help="JSON results file")
+    args = parser.parse_args()
+
+    server = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            parsed = urlparse(args.url)
+            host, port = parsed.hostname, parsed.port or 80
+        else:
+            host, port = "127.0.0.1", free_port()
+            database_url = args.database_url
+            if not database_url:
+                db_path = os.path.join(tmp, "users.db")
+                create_users_db(db_path, max(args.users))
+                database_url = f"sqlite:///{db_path}"
+            threads = args.threads if args.worker_class == "gthread" else 1
+            prelude = DB_LATENCY_PRELUDE.format(latency=args.db_latency / 1000) if args.db_latency else ""
+            command = [part.format(port=port, workers=args.workers, worker_class=args.worker_class, threads=threads,
+                                   prelude=prelude)
+                       for part in SERVER_COMMANDS[args.server]]
+            command += args.server_args.split()
+            env = dict(os.environ, DATABASE_URL=database_url)
+            server = subprocess.Popen(command, cwd=ROOT, env=env)
+
+        try:
+            wait_for_server(host, port)
+            results = []
+            for users in args.users:
+                result = run_load(host, port, users, args.duration)
+                print_result(result)
+                results.append(result)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+
+    report = {
+        "benchmark": "app",
+        "server": args.url or " ".join([args.server, f"workers={args.workers}", f"worker_class={args.worker_class}",
+                                        f"threads={args.threads}", f"db_latency_ms={args.db_latency:g}",
+                                        args.server_args]).strip(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "results": results,
+    }
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
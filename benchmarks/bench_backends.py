@@ -0,0 +1,165 @@
+"""
+Parity check and benchmark of the dashboard's execution backends.
+
+Runs the clean -> filter -> aggregate pipeline (see dashboard/backends.py) on
+synthetic sales data with every requested backend, checks that each returns
+the same rows, order, columns and dtypes as pandas, and times each step.
+Backends whose engine isn't installed are reported and skipped. Besides the
+synthetic frame, a small frame of messy workbook values (text numbers with
+thousand separators, invalid values, abbreviated months, no Group column) is
+checked for parity only.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_backends --rows 100000 1000000 10000000
+    python -m benchmarks.bench_backends --backends pandas polars --check --output bench_backends.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_sales_frame
+from dashboard import backends
+
+
+def messy_frame():
+    """
+    Workbook values the cleaning has to cope with, for the parity check.
+    """
+    return pd.DataFrame({
+        " Grouping ": ["GRC Rice", "FRS Fruit", "BZR Toys", "ELE Phones", "bzr Books", "GRC Oil", "FRS Milk"],
+        "penjualan": ["1.250.000", "980000", "12,5", "5000", "abc", 3000, "7.000"],
+        "HPP": [1000000, 700000, 10, 4000, 1, 2000, 5000],
+        "Gross Margin": ["250.000", "280000", "2,5", "1000", "1", "1000", "2.000"],
+        "Store Name": ["Store A", "Store B", 12, "Store A", "Store C", "Store B", "Store A"],
+        "Month": ["Feb", "Jan", "Jan", "Mar", "Feb", "Jan", "Sept"],
+        "year": [2024, 2024, 2024, 2024, 2024, 2023, 2024],
+        "Stock Value": [5e5, 1e6, np.nan, 2e5, 1e5, 0, 4e5],
+    })
+
+
+def _timed(func, repeat):
+    seconds = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds.append(time.perf_counter() - start)
+    return result, seconds
+
+
+def _filters(cleaned):
+    """
+    Dashboard-like filters: both divisions, the last year and every other store.
+    """
+    return {
+        "Group": sorted(cleaned["Group"].unique()),
+        "year": sorted(cleaned["year"].unique())[-1:],
+        "Month": sorted(cleaned["Month"].unique()),
+        "Store Name": sorted(cleaned["Store Name"].unique())[::2],
+    }
+
+
+def run_pipeline(raw, backend, repeat=1):
+    """
+    Returns ({step: result}, {step: seconds per run}) for 'backend'.
+    """
+    results, timings = {}, {}
+    results["clean"], timings["clean"] = _timed(lambda: backends.clean(raw.copy(), backend), repeat)
+    filters = _filters(results["clean"])
+    results["filter"], timings["filter"] = _timed(
+        lambda: backends.filter_rows(results["clean"], filters, backend), repeat
+    )
+    results["aggregate"], timings["aggregate"] = _timed(
+        lambda: backends.aggregate(results["clean"], backend), repeat
+    )
+    return results, timings
+
+
+def mismatches(expected, actual):
+    """
+    Steps whose result differs from the pandas one (with the difference).
+    """
+    problems = {}
+    for step, frame in expected.items():
+        try:
+            pd.testing.assert_frame_equal(frame, actual[step])
+        except AssertionError as e:
+            problems[step] = str(e).strip().splitlines()[0:6]
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and benchmark the dashboard execution backends.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000],
+                        help="Row counts to benchmark")
+    parser.add_argument("--stores", type=int, default=100, help="Stores in the synthetic data")
+    parser.add_argument("--backends", nargs="+", default=backends.BACKENDS, choices=backends.BACKENDS)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per step (the median is reported)")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if a backend's results differ")
+    parser.add_argument("--output", default="bench_backends.json", help="JSON results file")
+    args = parser.parse_args()
+
+    available = []
+    for name in args.backends:
+        try:
+            backends.get_backend(name)
+            available.append(name)
+        except ImportError as e:
+            print(f"skipping {name}: {e}")
+
+    failures = 0
+    expected, _ = run_pipeline(messy_frame(), "pandas")
+    for name in available:
+        problems = mismatches(expected, run_pipeline(messy_frame(), name)[0])
+        failures += bool(problems)
+        print(f"messy workbook values, {name}: {'identical' if not problems else problems}")
+
+    results = []
+    for rows in args.rows:
+        raw = make_sales_frame(rows, stores=args.stores)
+        print(f"\nrows={rows:,} stores={args.stores}")
+        expected = None
+        for name in ["pandas"] + [n for n in available if n != "pandas"]:
+            if name not in available and name != "pandas":
+                continue
+            output, timings = run_pipeline(raw, name, args.repeat)
+            if name == "pandas":
+                expected = output
+                problems = {}
+            else:
+                problems = mismatches(expected, output)
+            failures += bool(problems)
+            for step, seconds in timings.items():
+                entry = {"rows": rows, "stores": args.stores, "backend": name, "step": step,
+                         "median": statistics.median(seconds), "min": min(seconds), "runs": len(seconds),
+                         "identical": step not in problems}
+                results.append(entry)
+                print(f"  {name:<7} {step:<10} median {entry['median']:.4f}s  min {entry['min']:.4f}s"
+                      f"{'' if entry['identical'] else '  MISMATCH'}")
+            for step, problem in problems.items():
+                print(f"  {name} {step} differs from pandas: {problem}")
+
+    report = {
+        "benchmark": "backends",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "results": results,
+    }
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
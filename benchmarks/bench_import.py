@@ -0,0 +1,129 @@
+"""
+Benchmark of the daily product import: row-by-row vs bulk upsert.
+
+Runs scripts/daily_update.py's upsert_products_rowwise and upsert_products
+against a fresh 'products' table for each size, twice per size: an initial load
+(all inserts) and a reload where part of the rows changed (all conflicts).
+
+Uses a temporary SQLite database by default. With --database-url the tables are
+created in a separate 'bench_import' schema of that PostgreSQL database.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_import --rows 10000 100000 1000000
+    python -m benchmarks.bench_import --database-url postgresql://localhost/bench --output import.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, text
+
+from benchmarks.synthetic import make_products_frame
+
+# scripts/ is not a package; make daily_update importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import daily_update  # noqa: E402
+
+BENCH_SCHEMA = "bench_import"
+
+PRODUCTS_DDL = """
+    CREATE TABLE products (
+        product_id   TEXT PRIMARY KEY,
+        product_name TEXT,
+        vendor_name  TEXT,
+        category     TEXT,
+        barcode      TEXT
+    )
+"""
+
+METHODS = {
+    "rowwise": daily_update.upsert_products_rowwise,
+    "bulk": daily_update.upsert_products,
+}
+
+
+def make_engine(database_url, tmp_dir):
+    if not database_url:
+        return create_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench_import.db')}")
+
+    engine = create_engine(database_url, connect_args={"options": f"-csearch_path={BENCH_SCHEMA}"})
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {BENCH_SCHEMA}"))
+    return engine
+
+
+def reset_products(engine):
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            # Also drops the products_current view and products_as_of function built on it
+            conn.execute(text("DROP TABLE IF EXISTS products_history CASCADE"))
+        conn.execute(text("DROP TABLE IF EXISTS products"))
+        conn.execute(text(PRODUCTS_DDL))
+
+
+def run(engine, rows, method, changed_fraction=0.1):
+    """
+    Times the initial load and the reload of 'rows' products with 'method'.
+    """
+    upsert = METHODS[method]
+    results = []
+    reset_products(engine)
+    for phase, df in [
+        ("initial_load", make_products_frame(rows)),
+        ("reload", make_products_frame(rows, seed=1, changed_fraction=changed_fraction)),
+    ]:
+        start = time.perf_counter()
+        upsert(df, engine=engine)
+        seconds = time.perf_counter() - start
+        results.append({
+            "rows": rows,
+            "method": method,
+            "phase": phase,
+            "seconds": seconds,
+            "rows_per_second": rows / seconds if seconds else None,
+        })
+        print(f"  {method:<8} {phase:<13} {seconds:8.2f}s  {rows / seconds:12,.0f} rows/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark row-by-row vs bulk product upserts.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--methods", nargs="+", choices=list(METHODS), default=list(METHODS))
+    parser.add_argument("--max-rowwise-rows", type=int, default=100_000,
+                        help="Skip the row-by-row method above this size")
+    parser.add_argument("--database-url", help="PostgreSQL URL (default: temporary SQLite file)")
+    parser.add_argument("--output", default="bench_import.json", help="JSON results file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(args.database_url, tmp)
+        print(f"Database: {engine.dialect.name}")
+        for rows in args.rows:
+            print(f"rows={rows:,}")
+            for method in args.methods:
+                if method == "rowwise" and rows > args.max_rowwise_rows:
+                    print(f"  {method:<8} skipped (--max-rowwise-rows {args.max_rowwise_rows:,})")
+                    continue
+                results.extend(run(engine, rows, method))
+        engine.dispose()
+
+    report = {
+        "benchmark": "import",
+        "database": engine.dialect.name,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "results": results,
+    }
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Benchmark of the Streamlit dashboard data pipeline on synthetic data.
+
+Times every stage the dashboard runs on an upload: read, column check, numeric
+cleanup, date parse, division assignment, filter, shared aggregates, each tab's
+tables (through the same dashboard helpers as the page), table formatting and
+chart building. Results are written as JSON so runs from different versions can
+be compared.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pipeline --rows 10000 100000 1000000 --stores 10 100 --output bench.json
+    python -m benchmarks.bench_pipeline --rows 10000000 --stores 1000 --skip-read
+    python -m benchmarks.bench_pipeline --rows 100000 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import EXCEL_MAX_ROWS, make_sales_frame, write_workbook
+from dashboard import backends, charts, comparison, loading, ranking
+
+
+def _timed(func, repeat):
+    """
+    Runs 'func' 'repeat' times; returns (last result, list of seconds).
+    """
+    seconds = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds.append(time.perf_counter() - start)
+    return result, seconds
+
+
+def tab_stages(filtered, kelompok, monthly_agg):
+    """
+    Stage name -> callable reproducing the tables behind each tab, through the
+    same helpers as dashboard/page.py (uncached).
+    """
+    multi_month = monthly_agg['Date'].nunique() > 1
+
+    def tab1():
+        return comparison.comparison_table(monthly_agg, 'Group', blocks=("Sales", "Difference", "Percent Change"))
+
+    def tab2():
+        blocks = ("Sales", "Difference") if multi_month else ("Sales",)
+        return comparison.comparison_table(monthly_agg, 'Store Name', blocks=blocks)
+
+    def tab3():
+        blocks = ("Sales", "Difference", "Percent Change") if multi_month else ("Sales",)
+        detail = comparison.comparison_table(monthly_agg, ["Grouping", "Store Name", "Group"], blocks=blocks,
+                                             labels={"Difference": "Change"}, grand_total=False)
+        detail['Total Sales'] = detail[comparison.block_columns(detail, "Sales")].sum(axis=1)
+        detail['Rank'] = detail.groupby('Group')['Total Sales'].rank(ascending=False, method='min')
+        return detail
+
+    def tab6():
+        return kelompok.groupby(['Date', 'Store Name', 'Grouping'])['Penjualan'].sum().reset_index()
+
+    def tab7():
+        return ranking.top_bottom(monthly_agg, "Grouping", "Penjualan", n=10)
+
+    def tab8():
+        by_division = filtered.groupby('Group')[['Gross Margin', 'Penjualan']].sum()
+        by_store = filtered.groupby('Store Name')[['Gross Margin', 'Penjualan']].sum()
+        detail = filtered.groupby(['Store Name', 'Grouping'])[['Gross Margin', 'Penjualan']].sum()
+        return by_division, by_store, detail
+
+    def tab9():
+        stock_data = filtered.groupby(['Group', 'Date'])['Stock Value'].sum().reset_index()
+        top_bottom = ranking.top_bottom(monthly_agg, "Grouping", "Average Stock Value", n=10)
+        store_stock = comparison.comparison_table(filtered, 'Store Name', value='Stock Value',
+                                                  labels={"Sales": "Stock Value"}, grand_total=False)
+        sales_stock, _ = comparison.sales_stock_table(monthly_agg, "Grouping")
+        return stock_data, top_bottom, store_stock, sales_stock
+
+    return {
+        "tab1_group_sales": tab1,
+        "tab2_store_comparison": tab2,
+        "tab3_detailed_view": tab3,
+        "tab6_sales_trend": tab6,
+        "tab7_top_bottom": tab7,
+        "tab8_gross_margin": tab8,
+        "tab9_stock_value": tab9,
+    }
+
+
+def chart_stages(filtered, kelompok):
+    """
+    Stage name -> callable building (and serializing) the large charts.
+    """
+    def group_line():
+        data = filtered.groupby(['Group', 'Date'])['Penjualan'].sum().reset_index()
+        data['Month_Display'] = data['Date'].dt.strftime('%b %Y')
+        return charts.line_chart(data, x="Month_Display", y="Penjualan", color="Group").to_json()
+
+    def store_bar():
+        data = filtered.groupby(['Date', 'Store Name'])['Penjualan'].sum().reset_index()
+        data['Month_Display'] = data['Date'].dt.strftime('%b %Y')
+        return charts.bar_chart(data, x="Month_Display", y="Penjualan", color="Store Name",
+                                barmode="group").to_json()
+
+    def trend_line():
+        data = kelompok.groupby(['Date', 'Store Name', 'Grouping'])['Penjualan'].sum().reset_index()
+        data['Month_Display'] = data['Date'].dt.strftime('%b %Y')
+        return charts.line_chart(data, x='Month_Display', y='Penjualan', color='Store Name',
+                                 facet_col='Grouping', facet_col_wrap=2).to_json()
+
+    return {
+        "chart_group_line": group_line,
+        "chart_store_bar": store_bar,
+        "chart_trend_line": trend_line,
+    }
+
+
+def run_size(rows, stores, repeat=3, skip_read=False, max_format_rows=100_000):
+    """
+    Benchmarks one (rows, stores) configuration and returns a list of stage results.
+    """
+    results = []
+
+    def record(stage, seconds, note=None):
+        entry = {
+            "rows": rows,
+            "stores": stores,
+            "stage": stage,
+            "min": min(seconds),
+            "median": statistics.median(seconds),
+            "runs": len(seconds),
+        }
+        if note:
+            entry["note"] = note
+        results.append(entry)
+        print(f"  {stage:<24} median {entry['median']:.4f}s  min {entry['min']:.4f}s")
+
+    print(f"rows={rows:,} stores={stores}")
+    source = make_sales_frame(rows, stores=stores)
+
+    # -------------------- Read --------------------
+    if skip_read or rows > EXCEL_MAX_ROWS:
+        note = "skipped" if skip_read else "skipped: more rows than an .xlsx sheet holds"
+        results.append({"rows": rows, "stores": stores, "stage": "read", "note": note})
+        print(f"  {'read':<24} {note}")
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_workbook(source, os.path.join(tmp, "sales.xlsx"))
+            _, seconds = _timed(lambda: loading.read_sales_workbook(path), 1)
+            record("read", seconds)
+
+    # -------------------- Cleaning --------------------
+    for stage, func in [
+        ("check_columns", loading.check_columns),
+        ("numeric_cleanup", loading.convert_numeric),
+        ("date_parse", loading.parse_dates),
+        ("assign_divisions", loading.assign_divisions),
+    ]:
+        data, seconds = _timed(lambda: func(source.copy()), repeat)
+        record(stage, seconds)
+        source = data
+
+    cleaned = source
+
+    # -------------------- Filter (dashboard defaults: everything selected) --------------------
+    def apply_filters():
+        selection = {column: cleaned[column].unique() for column in ('year', 'Month', 'Store Name')}
+        filtered = backends.filter_rows(cleaned, {'Group': cleaned['Group'].unique(), **selection})
+        first_grouping = sorted(cleaned['Grouping'].unique())[:1]
+        kelompok = backends.filter_rows(cleaned, {'Grouping': first_grouping, **selection})
+        return filtered, kelompok
+
+    (filtered, kelompok), seconds = _timed(apply_filters, repeat)
+    record("filter", seconds)
+
+    monthly_agg, seconds = _timed(lambda: backends.aggregate(filtered), repeat)
+    record("monthly_aggregates", seconds)
+
+    # -------------------- Tabs --------------------
+    tables = {}
+    for stage, func in tab_stages(filtered, kelompok, monthly_agg).items():
+        tables[stage], seconds = _timed(func, repeat)
+        record(stage, seconds)
+
+    # -------------------- Formatting --------------------
+    detail = tables["tab3_detailed_view"]
+    note = None
+    if len(detail) > max_format_rows:
+        note = f"first {max_format_rows:,} of {len(detail):,} rows"
+        detail = detail.head(max_format_rows)
+    number_cols = [col for col in detail.columns if col.startswith(("Sales_", "Change_")) or col == "Total Sales"]
+    _, seconds = _timed(lambda: detail.style.format({col: "{:,.0f}" for col in number_cols}).to_html(), 1)
+    record("formatting", seconds, note)
+
+    # -------------------- Charts --------------------
+    for stage, func in chart_stages(filtered, kelompok).items():
+        _, seconds = _timed(func, repeat)
+        record(stage, seconds)
+
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold=1.2):
+    """
+    Prints stages that got slower than 'threshold' x the baseline median.
+    """
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)
+    previous = {(r["rows"], r["stores"], r["stage"]): r for r in baseline["results"] if "median" in r}
+
+    print(f"\nComparison with {baseline_path} (revision {baseline.get('revision')}):")
+    regressions = 0
+    for r in results:
+        before = previous.get((r["rows"], r["stores"], r["stage"]))
+        if before is None or "median" not in r or not before["median"]:
+            continue
+        ratio = r["median"] / before["median"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"  rows={r['rows']:,} stores={r['stores']} {r['stage']:<24} x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard data pipeline.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Row counts to benchmark (10k to 10M)")
+    parser.add_argument("--stores", type=int, nargs="+", default=[10, 100],
+                        help="Store counts to benchmark (10 to 1000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage (the median is reported)")
+    parser.add_argument("--skip-read", action="store_true", help="Don't write and read .xlsx workbooks")
+    parser.add_argument("--max-format-rows", type=int, default=100_000,
+                        help="Rows formatted in the formatting stage")
+    parser.add_argument("--output", default="bench_pipeline.json", help="JSON results file")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        for stores in args.stores:
+            results.extend(run_size(rows, stores, args.repeat, args.skip_read, args.max_format_rows))
+
+    report = {
+        "benchmark": "pipeline",
+        "revision": _git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "results": results,
+    }
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
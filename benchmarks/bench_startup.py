@@ -0,0 +1,112 @@
+"""
+Import-time check for the Streamlit dashboard's cold start.
+
+Runs fresh interpreters with `python -X importtime` and reports the cumulative
+import time of the entry path (streamlit + dashboard.page, everything needed
+before the page shell paints) and of the modules it defers (pandas, plotly,
+the analysis modules). It also lists heavy modules the entry path pulls in;
+with --check the run fails if any of them is imported before first paint.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeat 5 --check --output bench_startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What the page needs to paint, and what it should only import once there is data
+ENTRY_MODULES = ["streamlit", "dashboard.page"]
+DEFERRED_MODULES = ["pandas", "numpy", "plotly.express", "sqlalchemy", "pyarrow",
+                    "dashboard.loading", "dashboard.history", "dashboard.charts", "dashboard.ranking",
+                    "dashboard.stock", "db"]
+# Modules that must not be imported by the entry path
+HEAVY_MODULES = ["pandas", "plotly.express", "sqlalchemy", "pyarrow"]
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_times(modules, preload=()):
+    """
+    Imports 'preload' and then 'modules' in a fresh interpreter with -X importtime.
+    Returns {module: cumulative seconds} for every module imported after the preload.
+    """
+    # The marker separates the preload's imports from the measured ones
+    code = "".join(f"import {m}; " for m in preload) + "import sys; sys.stderr.write('--preloaded--\\n'); " + \
+        "; ".join(f"import {m}" for m in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    lines = result.stderr.splitlines()
+    lines = lines[lines.index("--preloaded--") + 1:]
+
+    times = {}
+    for line in lines:
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            times[match.group(4)] = int(match.group(2)) / 1e6
+    return times
+
+
+def measure(repeat):
+    """
+    Median cumulative import seconds of the entry path and of each deferred module.
+    """
+    entry, deferred, heavy = [], {m: [] for m in DEFERRED_MODULES}, set()
+    for _ in range(repeat):
+        times = import_times(ENTRY_MODULES)
+        entry.append(sum(times.get(m, 0) for m in ENTRY_MODULES))
+        heavy.update(m for m in HEAVY_MODULES if m in times)
+
+        # Deferred modules are timed on top of the entry path, as the page imports them;
+        # a module already pulled in by an earlier one reports (almost) nothing
+        times = import_times(DEFERRED_MODULES, preload=ENTRY_MODULES)
+        for module in DEFERRED_MODULES:
+            deferred[module].append(times.get(module, 0))
+
+    return {
+        "entry_seconds": statistics.median(entry),
+        "deferred_seconds": {m: statistics.median(v) for m, v in deferred.items()},
+        "heavy_modules_on_entry": sorted(heavy),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the dashboard's import time with -X importtime.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per measurement")
+    parser.add_argument("--check", action="store_true",
+                        help="Fail if the entry path imports any of the heavy modules")
+    parser.add_argument("--output", default="bench_startup.json", help="JSON results file")
+    args = parser.parse_args()
+
+    result = measure(args.repeat)
+    print(f"entry path ({' + '.join(ENTRY_MODULES)}): {result['entry_seconds']:.3f}s")
+    print("deferred until there is data (imported in this order, each on top of the previous ones):")
+    for module, seconds in result["deferred_seconds"].items():
+        print(f"  {module:<20} {seconds:.3f}s")
+    if result["heavy_modules_on_entry"]:
+        print(f"heavy modules imported before first paint: {', '.join(result['heavy_modules_on_entry'])}")
+
+    report = {
+        "benchmark": "startup",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        **result,
+    }
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.check and result["heavy_modules_on_entry"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Synthetic sales data with the columns the dashboard requires:
+Grouping, Penjualan, HPP, Gross Margin, Store Name, Month, year, Stock Value.
+"""
+import calendar
+import math
+
+import numpy as np
+import pandas as pd
+
+MONTH_NAMES = np.array(calendar.month_name[1:], dtype=object)
+GROUP_PREFIXES = np.array(["GRC", "FRS", "BZR"], dtype=object)
+
+# Largest number of data rows an .xlsx sheet can hold (plus the header row)
+EXCEL_MAX_ROWS = 1_048_575
+
+
+def make_sales_frame(rows, stores=10, months=36, start_year=2022, seed=0):
+    """
+    Returns a DataFrame with 'rows' rows spread over 'stores' stores and
+    'months' consecutive months starting January 'start_year'. The number of
+    Grouping values grows with 'rows' so every (Grouping, Store, Month) is unique.
+    """
+    rng = np.random.default_rng(seed)
+    idx = np.arange(rows)
+    month_idx = idx % months
+    combo = idx // months
+    store_idx = combo % stores
+    grouping_idx = combo // stores
+    n_groupings = max(1, math.ceil(rows / (months * stores)))
+
+    grouping_names = np.array(
+        [f"{GROUP_PREFIXES[i % 3]} Grouping {i:05d}" for i in range(n_groupings)], dtype=object
+    )
+    store_names = np.array([f"Store {i:04d}" for i in range(stores)], dtype=object)
+
+    # Whole numbers, as in the source workbooks
+    penjualan = rng.integers(100_000, 50_000_000, rows)
+    hpp = np.rint(penjualan * rng.uniform(0.6, 0.9, rows)).astype(np.int64)
+
+    return pd.DataFrame({
+        "Grouping": grouping_names[grouping_idx],
+        "Penjualan": penjualan,
+        "HPP": hpp,
+        "Gross Margin": penjualan - hpp,
+        "Store Name": store_names[store_idx],
+        "Month": MONTH_NAMES[month_idx % 12],
+        "year": start_year + month_idx // 12,
+        "Stock Value": rng.integers(0, 100_000_000, rows),
+    })
+
+
+def write_workbook(df, path):
+    """
+    Writes 'df' as a single-sheet .xlsx workbook like the ones uploaded to the dashboard.
+    """
+    if len(df) > EXCEL_MAX_ROWS:
+        raise ValueError(f"An .xlsx sheet holds at most {EXCEL_MAX_ROWS:,} rows, got {len(df):,}")
+    df.to_excel(path, index=False)
+    return path
+
+
+def make_products_frame(rows, seed=0, changed_fraction=0.0):
+    """
+    Returns a product master with the columns written by scripts/daily_update.py:
+    product_id, product_name, vendor_name, category, barcode.
+    'changed_fraction' of the rows get a different category/vendor for the same
+    seed, to simulate the next day's file.
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, rows + 1)
+    categories = np.array([f"Category {i:03d}" for i in range(200)], dtype=object)
+    vendors = np.array([f"Vendor {i:04d}" for i in range(2_000)], dtype=object)
+
+    category_idx = ids % len(categories)
+    vendor_idx = ids % len(vendors)
+    if changed_fraction:
+        changed = rng.random(rows) < changed_fraction
+        category_idx = np.where(changed, (category_idx + 1) % len(categories), category_idx)
+        vendor_idx = np.where(changed, (vendor_idx + 1) % len(vendors), vendor_idx)
+
+    return pd.DataFrame({
+        "product_id": ids.astype(str),
+        "product_name": pd.Series(ids).map("Product {:07d}".format).to_numpy(dtype=object),
+        "vendor_name": vendors[vendor_idx],
+        "category": categories[category_idx],
+        "barcode": pd.Series(899_000_000_0000 + ids).astype(str).to_numpy(dtype=object),
+    })
@@ -0,0 +1,377 @@
+"""
+In-memory product catalog for lookups by product ID, barcode or name.
+
+The 'products' table written by scripts/daily_update.py is loaded once per
+process into column arrays (one numpy array per column, one row per product):
+  - product_id and barcode are hash lookups (dicts of value -> row),
+  - name prefixes are binary-searched (np.searchsorted) in the lowercased
+    names, sorted once,
+  - name substrings use a trigram index laid out like a CSR matrix: the rows
+    of every trigram are one slice of a single int32 array. A query
+    intersects the rows of its trigrams, rarest first, and checks the few
+    candidates left.
+
+Refreshes only read the products whose updated_at moved past the newest one
+already loaded (daily_update sets it on the rows it inserts or changes). They
+run every CATALOG_REFRESH_SECONDS, and right after each import: daily_update
+bumps the 'products' dataset version, which the refresh thread follows (see
+versions.py).
+Changed products are appended as new rows and their old row is marked dead;
+the appended rows are scanned linearly until there are more than
+CATALOG_COMPACT_ROWS of them, when the sorted names and the trigram index
+are rebuilt from memory. Every refresh builds a new CatalogIndex and swaps it
+in, so requests never see a half-updated index.
+
+Every gunicorn worker holds its own copy (roughly 300 MB per million products)
+and loads it on its first catalog request (about 10 s per million products).
+"""
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import inspect, text
+
+import versions
+from db import read_connection
+
+COLUMNS = ["product_id", "product_name", "vendor_name", "category", "barcode"]
+# Looked up exactly, so stored without surrounding spaces
+KEY_COLUMNS = ["product_id", "barcode"]
+REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "60"))
+COMPACT_ROWS = int(os.getenv("CATALOG_COMPACT_ROWS", "2000"))
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 200
+GRAM = 3
+# Candidates of a substring search are checked in name order, in chunks doubling from this size
+CANDIDATE_CHUNK = 64
+# Sorts after every character, so names starting with a prefix end before prefix + PREFIX_END
+PREFIX_END = "\U0010ffff"
+
+logger = logging.getLogger(__name__)
+
+
+def _text(values, strip=False):
+    """
+    Column values as an object array of str, with '' for missing values.
+    """
+    series = pd.Series(values, dtype=object)
+    series = series.where(series.notna(), "")
+    if pd.api.types.infer_dtype(series, skipna=False) != "string":
+        series = series.astype(str)
+    return (series.str.strip() if strip else series).to_numpy(dtype=object)
+
+
+def _lower(names):
+    return pd.Series(names, dtype=object).str.lower().to_numpy(dtype=object)
+
+
+def gram_keys(text):
+    """
+    One uint64 per trigram of 'text' (str or fixed-width unicode array): its three
+    code points (21 bits each) side by side. Returns (keys, valid) where 'valid'
+    is False for trigrams running into the padding of shorter names.
+    """
+    points = np.array(text, dtype=str, ndmin=1)
+    width = points.dtype.itemsize // 4
+    points = points.view(np.uint32).reshape(len(points), width).astype(np.uint64)
+    keys = (points[:, :-2] << np.uint64(42)) | (points[:, 1:-1] << np.uint64(21)) | points[:, 2:]
+    return keys, points[:, 2:] != 0
+
+
+def trigram_index(names, chunk_rows=100_000):
+    """
+    Trigram index of 'names' (lowercased str), as arrays: returns (keys, bounds,
+    positions) where keys are the sorted trigram keys (see gram_keys) and
+    positions[bounds[i]:bounds[i + 1]] the sorted positions in 'names' of the
+    names containing trigram keys[i].
+    """
+    keys, positions = [], []
+    # Names are turned into a (names x characters) code point matrix a chunk at a time
+    for start in range(0, len(names), chunk_rows):
+        chunk = names[start:start + chunk_rows]
+        if max(map(len, chunk), default=0) < GRAM:
+            continue
+        chunk_keys, valid = gram_keys(chunk)
+        rows, _ = np.nonzero(valid)
+        keys.append(chunk_keys[valid])
+        positions.append(rows.astype(np.int32) + start)
+    if not keys:
+        return np.empty(0, dtype=np.uint64), np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int32)
+
+    keys, positions = np.concatenate(keys), np.concatenate(positions)
+    order = np.lexsort((positions, keys))
+    keys, positions = keys[order], positions[order]
+    # A name repeating a trigram lists its position once
+    keep = np.ones(len(keys), dtype=bool)
+    keep[1:] = (keys[1:] != keys[:-1]) | (positions[1:] != positions[:-1])
+    keys, positions = keys[keep], positions[keep]
+    unique_keys, starts = np.unique(keys, return_index=True)
+    return unique_keys, np.append(starts, len(keys)), positions
+
+
+class CatalogIndex:
+    """
+    Immutable snapshot of the catalog: column arrays plus the indexes over them.
+    Rows [0, indexed_rows) are in the sorted names and the trigram index; the
+    rows after them were appended by refreshes and are scanned.
+    """
+
+    def __init__(self, columns, watermark=None):
+        self.columns = {col: _text(columns[col], strip=col in KEY_COLUMNS) for col in COLUMNS}
+        self.names = _lower(self.columns["product_name"])
+        self.live = np.ones(len(self.names), dtype=bool)
+        self.watermark = watermark
+        self.id_rows = dict(zip(self.columns["product_id"], range(len(self.names))))
+        self.barcode_rows = {code: row for row, code in enumerate(self.columns["barcode"]) if code}
+        # Products listed twice keep their last row, like the import's upsert
+        self.live[:] = False
+        self.live[list(self.id_rows.values())] = True
+        self._build_indexes()
+
+    def _build_indexes(self):
+        self.indexed_rows = len(self.names)
+        self.sorted_rows = np.argsort(self.names, kind="stable").astype(np.int32)
+        self.sorted_names = self.names[self.sorted_rows]
+        # Positions in sorted_names, so candidates come out in name order
+        self.gram_keys, self.gram_bounds, self.gram_positions = trigram_index(self.sorted_names)
+
+    def __len__(self):
+        return len(self.id_rows)
+
+    def with_changes(self, changes, watermark):
+        """
+        A new index with the products of 'changes' (COLUMNS) inserted or replaced.
+        """
+        updated = object.__new__(CatalogIndex)
+        added = {col: _text(changes[col], strip=col in KEY_COLUMNS) for col in COLUMNS}
+        first = len(self.names)
+        updated.columns = {col: np.concatenate([self.columns[col], added[col]]) for col in COLUMNS}
+        updated.names = np.concatenate([self.names, _lower(added["product_name"])])
+        updated.live = np.concatenate([self.live, np.ones(len(added["product_id"]), dtype=bool)])
+        updated.watermark = watermark
+        updated.id_rows = dict(self.id_rows)
+        updated.barcode_rows = dict(self.barcode_rows)
+        for row, (product_id, barcode) in enumerate(zip(added["product_id"], added["barcode"]), first):
+            old = updated.id_rows.get(product_id)
+            if old is not None:
+                updated.live[old] = False
+                old_barcode = updated.columns["barcode"][old]
+                if updated.barcode_rows.get(old_barcode) == old:
+                    del updated.barcode_rows[old_barcode]
+            updated.id_rows[product_id] = row
+            if barcode:
+                updated.barcode_rows[barcode] = row
+
+        if len(updated.names) - self.indexed_rows > COMPACT_ROWS:
+            live = np.flatnonzero(updated.live)
+            return CatalogIndex({col: updated.columns[col][live] for col in COLUMNS}, watermark)
+        updated.indexed_rows = self.indexed_rows
+        updated.sorted_rows, updated.sorted_names = self.sorted_rows, self.sorted_names
+        updated.gram_keys, updated.gram_bounds = self.gram_keys, self.gram_bounds
+        updated.gram_positions = self.gram_positions
+        return updated
+
+    def record(self, row):
+        return {col: self.columns[col][row] for col in COLUMNS}
+
+    def get(self, product_id):
+        row = self.id_rows.get(str(product_id).strip())
+        return None if row is None else self.record(row)
+
+    def by_barcode(self, barcode):
+        row = self.barcode_rows.get(str(barcode).strip())
+        return None if row is None else self.record(row)
+
+    def _scanned_rows(self, matches):
+        rows = np.arange(self.indexed_rows, len(self.names))
+        return [row for row in rows[self.live[self.indexed_rows:]] if matches(self.names[row])]
+
+    def prefix_rows(self, prefix, limit=SEARCH_LIMIT):
+        """
+        Rows whose name starts with 'prefix' (lowercased), by name.
+        """
+        lo = np.searchsorted(self.sorted_names, prefix, side="left")
+        hi = np.searchsorted(self.sorted_names, prefix + PREFIX_END, side="left")
+        rows = []
+        for row in self.sorted_rows[lo:hi]:
+            if self.live[row]:
+                rows.append(row)
+                if len(rows) == limit:
+                    break
+        rows += self._scanned_rows(lambda name: name.startswith(prefix))
+        return sorted(rows, key=lambda row: self.names[row])[:limit]
+
+    def _postings(self, query):
+        """
+        The sorted positions of each trigram of 'query', rarest first; None if one
+        of them is in no indexed name.
+        """
+        keys = np.unique(gram_keys(query)[0][0])
+        at = np.searchsorted(self.gram_keys, keys)
+        if np.any(at >= len(self.gram_keys)) or np.any(self.gram_keys[np.minimum(at, len(self.gram_keys) - 1)] != keys):
+            return None
+        postings = [self.gram_positions[self.gram_bounds[i]:self.gram_bounds[i + 1]] for i in at]
+        return sorted(postings, key=len)
+
+    def contains_rows(self, query, limit=SEARCH_LIMIT):
+        """
+        Rows whose name contains 'query' (lowercased), by name. Queries shorter
+        than a trigram are searched as prefixes.
+        """
+        if len(query) < GRAM:
+            return self.prefix_rows(query, limit)
+        rows = []
+        postings = self._postings(query) if len(self.gram_keys) else None
+        if postings is not None:
+            rarest, others = postings[0], postings[1:]
+            # Walk the rarest trigram's names in name order, keep those having every
+            # other trigram, and stop once 'limit' names contain the whole query
+            start, chunk = 0, CANDIDATE_CHUNK
+            while start < len(rarest) and len(rows) < limit:
+                candidates = rarest[start:start + chunk]
+                start, chunk = start + chunk, chunk * 2
+                for other in others:
+                    at = np.minimum(np.searchsorted(other, candidates), len(other) - 1)
+                    candidates = candidates[other[at] == candidates]
+                for row in self.sorted_rows[candidates]:
+                    # Trigrams can appear in another order than in the query
+                    if self.live[row] and query in self.names[row]:
+                        rows.append(row)
+                        if len(rows) == limit:
+                            break
+        rows += self._scanned_rows(lambda name: query in name)
+        return sorted(rows, key=lambda row: self.names[row])[:limit]
+
+    def search(self, query, mode="contains", limit=SEARCH_LIMIT):
+        query = query.strip().lower()
+        if not query:
+            return []
+        rows = self.prefix_rows(query, limit) if mode == "prefix" else self.contains_rows(query, limit)
+        return [self.record(row) for row in rows]
+
+
+class ProductCatalog:
+    """
+    The process's CatalogIndex over 'products', loaded on first use and refreshed
+    by a daemon thread every 'refresh_seconds' and when the 'products' version changes.
+    """
+
+    def __init__(self, engine, refresh_seconds=REFRESH_SECONDS):
+        self.engine = engine
+        self.refresh_seconds = refresh_seconds
+        self.index = None
+        self.refreshed_at = None
+        self._lock = threading.RLock()
+        self._thread = None
+        self._wake = threading.Event()
+
+    def _has_updated_at(self):
+        return "updated_at" in {col["name"] for col in inspect(self.engine).get_columns("products")}
+
+    def refresh(self):
+        """
+        Loads the products changed since the last refresh (all of them the first
+        time, or when 'products' has no updated_at column). Returns the rows read.
+        """
+        with self._lock:
+            incremental = self.index is not None and self.index.watermark is not None
+            if self._has_updated_at():
+                query = f"SELECT {', '.join(COLUMNS)}, updated_at FROM products"
+                params = {}
+                if incremental:
+                    query += " WHERE updated_at > :since"
+                    params["since"] = self.index.watermark
+            else:
+                query, params, incremental = f"SELECT {', '.join(COLUMNS)} FROM products", {}, False
+
+            # From the read replica when there is one: a lagging replica only delays changes
+            with read_connection(self.engine) as conn:
+                frame = pd.read_sql(text(query), conn, params=params)
+            watermark = frame["updated_at"].max() if "updated_at" in frame and len(frame) else None
+            if incremental:
+                if len(frame):
+                    self.index = self.index.with_changes(frame, watermark)
+            else:
+                self.index = CatalogIndex(frame, watermark)
+            self.refreshed_at = time.time()
+            return len(frame)
+
+    def _refresh_loop(self):
+        while True:
+            self._wake.wait(self.refresh_seconds)
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Product catalog refresh failed; keeping the current index")
+
+    def _on_versions(self, changed):
+        if versions.PRODUCTS in changed:
+            self._wake.set()
+
+    def current(self):
+        """
+        The current CatalogIndex, loading it (and starting the refresh thread) on first use.
+        """
+        if self.index is None:
+            with self._lock:
+                # Requests arriving during the first load wait for it instead of loading again
+                if self.index is None:
+                    self.refresh()
+                if self._thread is None and self.refresh_seconds > 0:
+                    self._thread = threading.Thread(target=self._refresh_loop, name="catalog-refresh",
+                                                     daemon=True)
+                    self._thread.start()
+                    try:
+                        versions.get_watcher(self.engine).subscribe(self._on_versions)
+                    except Exception:
+                        logger.exception("Could not follow the products version; refreshing on the interval only")
+        return self.index
+
+
+def register_routes(app, engine, require_login=True):
+    """
+    Adds the product lookup API to 'app':
+        GET /api/products/<product_id>
+        GET /api/products/barcode/<barcode>
+        GET /api/products/search?q=<name>&mode=contains|prefix&limit=20
+    With 'require_login' the routes answer 401 outside a logged-in session.
+    The catalog is loaded by the first request of each worker.
+    """
+    from flask import jsonify, request, session
+
+    catalog = ProductCatalog(engine)
+    app.extensions["product_catalog"] = catalog
+
+    def _denied():
+        return require_login and not session.get("logged_in")
+
+    @app.route("/api/products/<product_id>")
+    def product_by_id(product_id):
+        if _denied():
+            return jsonify(error="Not logged in"), 401
+        product = catalog.current().get(product_id)
+        return (jsonify(product), 200) if product else (jsonify(error="Product not found"), 404)
+
+    @app.route("/api/products/barcode/<barcode>")
+    def product_by_barcode(barcode):
+        if _denied():
+            return jsonify(error="Not logged in"), 401
+        product = catalog.current().by_barcode(barcode)
+        return (jsonify(product), 200) if product else (jsonify(error="Product not found"), 404)
+
+    @app.route("/api/products/search")
+    def product_search():
+        if _denied():
+            return jsonify(error="Not logged in"), 401
+        mode = request.args.get("mode", "contains")
+        if mode not in ("contains", "prefix"):
+            return jsonify(error="mode must be 'contains' or 'prefix'"), 400
+        limit = min(request.args.get("limit", SEARCH_LIMIT, type=int), MAX_SEARCH_LIMIT)
+        products = catalog.current().search(request.args.get("q", ""), mode, max(limit, 1))
+        return jsonify(products=products, count=len(products))
+
+    return catalog
@@ -1,16 +1,207 @@
+"""
+Converts legacy stock-on-hand (SOH) .xls exports (e.g. 'soh gc 20241226.xls')
+to Parquet or CSV.
+
+Each .xls is read directly with xlrd into typed columns (numbers, dates, text),
+without going through an intermediate .xlsx. Directories are batch-converted in
+parallel and a throughput summary (rows/s) is printed at the end.
+
+Usage:
+    python convert.py ~/Downloads --out-dir converted --format parquet
+    python convert.py "soh gc 20241226.xls" --format csv
+    python convert.py ~/Downloads --benchmark      # parse only, report rows/s
+"""
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-import pyexcel as p
+import xlrd
+
+DEFAULT_PATTERN = "*.xls"
+
+# Excel serial date origins for the two workbook date modes
+DATE_ORIGINS = {0: "1899-12-30", 1: "1904-01-01"}
+
+
+def _unique_names(header):
+    """
+    Makes header names unique the way pandas does ('Qty', 'Qty.1', ...).
+    """
+    seen = {}
+    names = []
+    for i, name in enumerate(header):
+        name = str(name).strip() or f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _typed_column(values, types, datemode):
+    """
+    Builds one column from xlrd cell values and cell types.
+    Columns whose non-empty cells are all numbers, dates or booleans get
+    that type; anything else is kept as text.
+    """
+    types = np.asarray(types)
+    empty = (types == xlrd.XL_CELL_EMPTY) | (types == xlrd.XL_CELL_BLANK)
+    present = types[~empty]
+
+    if present.size == 0:
+        return pd.Series([None] * len(values), dtype=object)
+
+    if np.all(present == xlrd.XL_CELL_NUMBER):
+        numbers = np.array([v if t == xlrd.XL_CELL_NUMBER else np.nan for v, t in zip(values, types)], dtype=float)
+        if not empty.any() and np.all(np.mod(numbers, 1) == 0):
+            return pd.Series(numbers.astype(np.int64))
+        return pd.Series(numbers)
+
+    if np.all(present == xlrd.XL_CELL_DATE):
+        serials = np.array([v if t == xlrd.XL_CELL_DATE else np.nan for v, t in zip(values, types)], dtype=float)
+        return pd.Series(pd.to_datetime(serials, unit="D", origin=DATE_ORIGINS[datemode]))
+
+    if np.all(present == xlrd.XL_CELL_BOOLEAN):
+        return pd.Series([bool(v) if t == xlrd.XL_CELL_BOOLEAN else None for v, t in zip(values, types)],
+                         dtype="boolean")
+
+    text = []
+    for v, t in zip(values, types):
+        if t in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+            text.append(None)
+        elif t == xlrd.XL_CELL_NUMBER and float(v).is_integer():
+            text.append(str(int(v)))
+        else:
+            text.append(str(v).strip())
+    return pd.Series(text, dtype=object)
+
+
+def read_xls(path, sheet=0, header_row=0):
+    """
+    Reads one sheet of an .xls file with xlrd into a DataFrame with typed columns.
+    'sheet' is a sheet index or name; 'header_row' is the row holding the column names.
+    """
+    book = xlrd.open_workbook(path, on_demand=True)
+    try:
+        sh = book.sheet_by_name(sheet) if isinstance(sheet, str) else book.sheet_by_index(sheet)
+        if sh.nrows <= header_row:
+            return pd.DataFrame()
+        names = _unique_names(sh.row_values(header_row))
+        start = header_row + 1
+        columns = {
+            name: _typed_column(sh.col_values(c, start_rowx=start), sh.col_types(c, start_rowx=start), book.datemode)
+            for c, name in enumerate(names)
+        }
+    finally:
+        book.release_resources()
+    return pd.DataFrame(columns)
+
+
+def output_path(path, out_dir, fmt):
+    """
+    'soh gc 20241226.xls' -> '<out_dir>/soh_gc_20241226.<fmt>'
+    """
+    stem = os.path.splitext(os.path.basename(path))[0].strip().replace(" ", "_")
+    return os.path.join(out_dir or os.path.dirname(path), f"{stem}.{fmt}")
+
+
+def write_output(df, path, fmt):
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "csv":
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unsupported output format: {fmt}")
+
+
+def convert_file(path, out_dir=None, fmt="parquet", write=True):
+    """
+    Converts one .xls file. Returns a dict with the source, output path,
+    row count and elapsed seconds (read and write).
+    Top-level so it can run in a worker process.
+    """
+    start = time.perf_counter()
+    df = read_xls(path)
+    read_seconds = time.perf_counter() - start
+
+    out = None
+    if write:
+        out = output_path(path, out_dir, fmt)
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+        write_output(df, out, fmt)
+
+    return {
+        "source": path,
+        "output": out,
+        "rows": len(df),
+        "read_seconds": read_seconds,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def find_inputs(inputs, pattern=DEFAULT_PATTERN):
+    """
+    Expands directories in 'inputs' to the .xls files they contain.
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, pattern))))
+        else:
+            paths.append(item)
+    return paths
+
+
+def convert_many(paths, out_dir=None, fmt="parquet", workers=None, write=True):
+    """
+    Converts every file in 'paths' in a process pool.
+    Returns (results, wall_seconds).
+    """
+    start = time.perf_counter()
+    if len(paths) <= 1 or workers == 1:
+        results = [convert_file(path, out_dir, fmt, write) for path in paths]
+    else:
+        workers = workers or min(len(paths), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(convert_file, path, out_dir, fmt, write) for path in paths]
+            results = [future.result() for future in futures]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert SOH .xls exports to Parquet or CSV.")
+    parser.add_argument("inputs", nargs="+", help=".xls files or directories containing them")
+    parser.add_argument("--out-dir", help="Output directory (default: next to each input)")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet", help="Output format")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN, help="File pattern used inside directories")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--benchmark", action="store_true", help="Only parse the files and report throughput")
+    args = parser.parse_args()
+
+    paths = find_inputs(args.inputs, args.pattern)
+    if not paths:
+        print("No .xls files found.")
+        return
+
+    results, wall_seconds = convert_many(paths, args.out_dir, args.format, args.workers,
+                                         write=not args.benchmark)
 
-# Correct the file paths
-xls_file = '/Users/aguschandra/Downloads/soh gc 20241226.xls'  # Full path to the .xls file
-xlsx_file = '/Users/aguschandra/Downloads/soh_gc_20241226.xlsx'  # Full path for the converted .xlsx file
+    for r in results:
+        rate = r["rows"] / r["read_seconds"] if r["read_seconds"] else 0
+        target = f" -> {r['output']}" if r["output"] else ""
+        print(f"{r['source']}{target}: {r['rows']:,} rows in {r['seconds']:.2f}s (read {rate:,.0f} rows/s)")
 
-# Convert .xls to .xlsx
-p.save_book_as(file_name=xls_file, dest_file_name=xlsx_file)
-print("Conversion complete!")
+    total_rows = sum(r["rows"] for r in results)
+    throughput = total_rows / wall_seconds if wall_seconds else 0
+    print(f"Converted {len(results)} file(s), {total_rows:,} rows in {wall_seconds:.2f}s "
+          f"({throughput:,.0f} rows/s overall).")
 
-# Read the .xlsx file
-df = pd.read_excel(xlsx_file, engine="openpyxl")
 
-# Display the first few rows
-print(df.head())
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+Helper modules used by streamlit_dashboard.py.
+"""
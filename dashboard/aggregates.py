@@ -0,0 +1,59 @@
+"""
+Shared monthly aggregates for the Streamlit dashboard.
+
+Every tab summarises the same filtered rows by some subset of
+(Group, Store Name, Grouping, Date). Grouping the filtered rows once at the
+finest of those grains gives a much smaller frame that the tabs (and the
+ranking service) can roll up further instead of re-scanning 'filtered_data'.
+"""
+from dashboard.cache import LRUCache
+
+AGGREGATE_KEYS = ["Group", "Store Name", "Grouping", "Date"]
+VALUE_COLS = ["Penjualan", "HPP", "Gross Margin", "Stock Value"]
+
+# 'Rows' keeps the number of source rows behind each aggregate so
+# averages (e.g. Average Stock Value) can be derived exactly later on.
+ROW_COUNT_COL = "Rows"
+
+_aggregate_cache = LRUCache(maxsize=16)
+
+
+def monthly_aggregates(data):
+    """
+    Sums the value columns of 'data' per (Group, Store Name, Grouping, Date)
+    and adds the number of source rows per combination.
+    """
+    grouped = data.groupby(AGGREGATE_KEYS, observed=True, sort=False)
+    aggregates = grouped[VALUE_COLS].sum()
+    aggregates[ROW_COUNT_COL] = grouped.size()
+    return aggregates.reset_index()
+
+
+def cached_monthly_aggregates(key, data):
+    """
+    monthly_aggregates(data) cached under 'key' (dataset fingerprint + filters),
+    computed by the configured execution backend (see dashboard/backends.py).
+    """
+    # Imported here: the backends build on this module's constants
+    from dashboard import backends
+
+    return _aggregate_cache.get_or_build(key, lambda: backends.aggregate(data))
+
+
+def select(aggregates, groups, stores, dates):
+    """
+    Rows of precomputed aggregates matching the dashboard's general filters.
+    """
+    mask = (
+        aggregates['Group'].isin(groups) &
+        aggregates['Store Name'].isin(stores) &
+        aggregates['Date'].isin(dates)
+    )
+    return aggregates[mask].reset_index(drop=True)
+
+
+def cached_selection(key, aggregates, groups, stores, dates):
+    """
+    select(...) cached under 'key' (dataset fingerprint + filters).
+    """
+    return _aggregate_cache.get_or_build(key, lambda: select(aggregates, groups, stores, dates))
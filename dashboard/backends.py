@@ -0,0 +1,331 @@
+"""
+Execution backends for the dashboard's clean -> filter -> aggregate pipeline.
+
+The pipeline is defined once by the constants of dashboard/loading.py and
+dashboard/aggregates.py (required and numeric columns, divisions, aggregate
+keys and values), and each backend runs the same steps on its own engine:
+  - pandas: the eager functions of dashboard/loading.py and aggregates.py,
+  - polars: one lazy query per step, executed by Polars' multi-threaded engine,
+  - duckdb: one SQL query per step on an embedded, in-memory DuckDB.
+The backend is picked with DASHBOARD_BACKEND (pandas by default). Polars and
+DuckDB are optional dependencies, imported only when selected. Every backend
+takes and returns pandas DataFrames with the same rows, row order, columns and
+dtypes, so the tabs don't know which one ran; benchmarks/bench_backends.py
+checks this and times the backends against each other.
+
+Workbooks are still read by pandas (see loading.load_workbooks) and column
+names are checked with loading.check_columns before the data is handed over.
+"""
+import calendar
+import os
+
+import numpy as np
+import pandas as pd
+
+from dashboard import loading
+from dashboard.aggregates import AGGREGATE_KEYS, ROW_COUNT_COL, VALUE_COLS, monthly_aggregates
+
+BACKEND = os.getenv("DASHBOARD_BACKEND", "pandas").strip().lower()
+BACKENDS = ["pandas", "polars", "duckdb"]
+
+# Month names as parsed by '%B' and '%b' (English, case-insensitive)
+FULL_MONTHS = [name.lower() for name in calendar.month_name[1:]]
+ABBREVIATED_MONTHS = [name.lower() for name in calendar.month_abbr[1:]]
+
+# A cleaned numeric string that pd.to_numeric turns into an integer
+INTEGER_PATTERN = r"^\s*[+-]?\d+\s*$"
+ROW_COL = "__row"
+
+
+def _prepare(raw_data):
+    """
+    Checks the columns of 'raw_data' and makes it convertible to Arrow the way
+    loading.convert_numeric sees it: float and text numeric columns become the
+    strings convert_numeric parses, other mixed-type text columns become strings.
+    Adds ROW_COL (the row position) so engines can keep the pandas row order.
+    Returns (prepared frame, {numeric column: parsed from text}).
+    """
+    raw_data = loading.check_columns(raw_data.copy())
+    from_text = {}
+    for col in loading.NUMERIC_COLS:
+        from_text[col] = not pd.api.types.is_integer_dtype(raw_data[col])
+        if from_text[col]:
+            raw_data[col] = raw_data[col].astype(str)
+    for col in raw_data.columns[raw_data.dtypes == object]:
+        if col not in from_text and pd.api.types.infer_dtype(raw_data[col], skipna=True) not in ("string", "empty"):
+            raw_data[col] = raw_data[col].where(raw_data[col].isna(), raw_data[col].astype(str))
+    if raw_data['year'].isna().any():
+        # loading.parse_dates can't cast a missing year to int either
+        raise ValueError("Error parsing dates: cannot convert a missing 'year' to integer")
+    raw_data[ROW_COL] = np.arange(len(raw_data), dtype=np.int64)
+    return raw_data, from_text
+
+
+def _to_pandas(table, integer_cols=()):
+    """
+    Arrow table -> pandas with the dtypes of the pandas backend: nanosecond
+    'Date', object strings and int64 for 'integer_cols'.
+    """
+    data = table.to_pandas()
+    if 'Date' in data.columns:
+        data['Date'] = data['Date'].astype("datetime64[ns]")
+    for col in integer_cols:
+        data[col] = data[col].astype(np.int64)
+    return data.drop(columns=ROW_COL, errors="ignore")
+
+
+class PandasBackend:
+    """
+    The eager pandas implementation the other backends are checked against.
+    """
+    name = "pandas"
+
+    def clean(self, raw_data):
+        return loading.clean_sales_data(raw_data).reset_index(drop=True)
+
+    def filter(self, data, filters):
+        mask = np.ones(len(data), dtype=bool)
+        for col, values in filters.items():
+            mask &= data[col].isin(values).to_numpy()
+        return data[mask].sort_values('Date', kind="stable").reset_index(drop=True)
+
+    def aggregate(self, data):
+        return monthly_aggregates(data)
+
+
+class PolarsBackend:
+    """
+    Lazy Polars queries; POLARS_MAX_THREADS limits the threads they run on.
+    """
+    name = "polars"
+
+    def __init__(self):
+        import polars
+
+        self.pl = polars
+
+    def _frame(self, data):
+        import pyarrow as pa
+
+        return self.pl.from_arrow(pa.Table.from_pandas(data, preserve_index=False)).lazy()
+
+    def clean(self, raw_data):
+        pl = self.pl
+        raw_data, from_text = _prepare(raw_data)
+        derive_group = 'Group' not in raw_data.columns
+        frame = self._frame(raw_data)
+
+        cleaned_text = {
+            col: pl.col(col).str.replace_all('.', '', literal=True).str.replace_all(',', '.', literal=True)
+            for col, text in from_text.items() if text
+        }
+        integer_flags = frame.select(
+            [text.str.contains(INTEGER_PATTERN).fill_null(False).all().alias(col)
+             for col, text in cleaned_text.items()]
+        ) if cleaned_text else None
+
+        parsed = frame.with_columns(
+            [text.str.strip_chars().cast(pl.Float64, strict=False).alias(col) for col, text in cleaned_text.items()]
+            + [pl.col(col).cast(pl.Float64) for col, text in from_text.items() if not text]
+        ).filter(
+            pl.all_horizontal([pl.col(col).is_not_null() & pl.col(col).is_not_nan() for col in from_text])
+        ).with_columns(
+            ((pl.col('Gross Margin') / pl.col('Penjualan')) * 100).alias('Margin %')
+        )
+
+        # '%B' month names, or '%b' abbreviations when no row has a full month name
+        month = pl.col('Month').cast(pl.Utf8).str.to_lowercase()
+        full = month.replace_strict(FULL_MONTHS, range(1, 13), default=None, return_dtype=pl.Int8)
+        abbreviated = month.replace_strict(ABBREVIATED_MONTHS, range(1, 13), default=None, return_dtype=pl.Int8)
+        month_number = pl.when(full.is_null().all()).then(abbreviated).otherwise(full)
+        dated = parsed.with_columns(
+            pl.datetime(pl.col('year').cast(pl.Int64), month_number, 1).cast(pl.Datetime("ns")).alias('Date')
+        ).filter(pl.col('Date').is_not_null()).sort('Date', maintain_order=True)
+
+        if derive_group:
+            dated = dated.with_columns(
+                pl.col('Grouping').cast(pl.Utf8).str.slice(0, 3).str.to_uppercase().alias('Group')
+            )
+        divided = dated.with_columns(
+            pl.col('Group').replace({'GRC': 'GRC+FRS', 'FRS': 'GRC+FRS'})
+        ).filter(pl.col('Group').is_in(loading.DIVISIONS)).with_columns(
+            pl.col('Date').dt.strftime('%b %Y').alias('Month_Display')
+        )
+
+        if integer_flags is None:
+            result = divided.collect()
+            flags = {}
+        else:
+            result, flag_row = pl.collect_all([divided, integer_flags])
+            flags = flag_row.row(0, named=True)
+        integer_cols = [col for col, text in from_text.items() if not text or flags[col]]
+        return _to_pandas(result.to_arrow(), integer_cols)
+
+    def filter(self, data, filters):
+        pl = self.pl
+        condition = pl.lit(True)
+        for col, values in filters.items():
+            condition &= pl.col(col).is_in(pd.Series(values, dtype=data[col].dtype).tolist())
+        result = self._frame(data).filter(condition).sort('Date', maintain_order=True).collect()
+        return _to_pandas(result.to_arrow()).astype(data.dtypes.to_dict())
+
+    def aggregate(self, data):
+        pl = self.pl
+        result = self._frame(data[AGGREGATE_KEYS + VALUE_COLS]).drop_nulls(AGGREGATE_KEYS).group_by(
+            AGGREGATE_KEYS, maintain_order=True
+        ).agg(
+            [pl.col(col).sum() for col in VALUE_COLS] + [pl.len().cast(pl.Int64).alias(ROW_COUNT_COL)]
+        ).collect()
+        return _to_pandas(result.to_arrow()).astype(data[AGGREGATE_KEYS + VALUE_COLS].dtypes.to_dict())
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DuckDBBackend:
+    """
+    SQL on an in-memory DuckDB connection per call; DUCKDB_THREADS limits its threads.
+    """
+    name = "duckdb"
+
+    def __init__(self):
+        import duckdb
+
+        self.duckdb = duckdb
+
+    def _query(self, data, sql, parameters=None):
+        import pyarrow as pa
+
+        connection = self.duckdb.connect()
+        try:
+            if os.getenv("DUCKDB_THREADS"):
+                connection.execute(f"SET threads = {int(os.environ['DUCKDB_THREADS'])}")
+            connection.register("source", pa.Table.from_pandas(data, preserve_index=False))
+            return connection.execute(sql, parameters or []).fetch_arrow_table()
+        finally:
+            connection.close()
+
+    def clean(self, raw_data):
+        raw_data, from_text = _prepare(raw_data)
+        derive_group = 'Group' not in raw_data.columns
+
+        cleaned_text = {
+            col: f"replace(replace({_quote(col)}, '.', ''), ',', '.')" for col, text in from_text.items() if text
+        }
+        parsed = ", ".join(
+            f"TRY_CAST(trim({cleaned_text[col]}) AS DOUBLE) AS {_quote(col)}" if text
+            else f"CAST({_quote(col)} AS DOUBLE) AS {_quote(col)}"
+            for col, text in from_text.items()
+        )
+        valid = " AND ".join(f"{_quote(col)} IS NOT NULL AND NOT isnan({_quote(col)})" for col in from_text)
+        month = "lower(CAST(Month AS VARCHAR))"
+        columns = [_quote(col) for col in raw_data.columns if col != ROW_COL] + ['"Margin %"', '"Date"']
+        if derive_group:
+            # Derived after Date, as in loading.assign_divisions
+            group = "upper(substring(CAST(Grouping AS VARCHAR), 1, 3))"
+            divisions = f"SELECT *, CASE WHEN {group} IN ('GRC', 'FRS') THEN 'GRC+FRS' ELSE {group} END AS \"Group\""
+            columns.append('"Group"')
+        else:
+            divisions = """SELECT * REPLACE (CASE WHEN "Group" IN ('GRC', 'FRS') THEN 'GRC+FRS'
+                                                  ELSE "Group" END AS "Group")"""
+
+        sql = f"""
+            WITH parsed AS (
+                SELECT * REPLACE ({parsed}) FROM source
+            ), valid AS (
+                SELECT *, "Gross Margin" / Penjualan * 100 AS "Margin %",
+                       list_position($full, {month}) AS full_month,
+                       list_position($abbreviated, {month}) AS abbreviated_month
+                FROM parsed WHERE {valid}
+            ), dated AS (
+                -- '%B' month names, or '%b' abbreviations when no row has a full month name
+                SELECT *, make_timestamp(CAST(year AS BIGINT),
+                                         CASE WHEN count(full_month) OVER () = 0
+                                              THEN abbreviated_month ELSE full_month END,
+                                         1, 0, 0, 0) AS "Date"
+                FROM valid
+            ), divided AS (
+                {divisions} FROM dated WHERE "Date" IS NOT NULL
+            )
+            SELECT {", ".join(columns)}, strftime("Date", '%b %Y') AS Month_Display
+            FROM divided WHERE "Group" IN (SELECT unnest($divisions))
+            ORDER BY "Date", {ROW_COL}
+        """
+        result = self._query(raw_data, sql, {
+            "full": FULL_MONTHS, "abbreviated": ABBREVIATED_MONTHS, "divisions": loading.DIVISIONS,
+        })
+
+        integer_cols = [col for col, text in from_text.items() if not text]
+        if cleaned_text:
+            flags = self._query(raw_data, "SELECT " + ", ".join(
+                f"coalesce(bool_and(coalesce(regexp_matches({text}, '{INTEGER_PATTERN}'), false)), false)"
+                for text in cleaned_text.values()
+            ) + " FROM source").to_pylist()
+            flags = list(flags[0].values()) if flags else []
+            integer_cols += [col for col, flag in zip(cleaned_text, flags) if flag]
+        return _to_pandas(result, integer_cols)
+
+    def filter(self, data, filters):
+        data = data.assign(**{ROW_COL: np.arange(len(data), dtype=np.int64)})
+        conditions = " AND ".join(
+            f"{_quote(col)} IN (SELECT unnest(${i}))" for i, col in enumerate(filters, start=1)
+        ) or "true"
+        parameters = [pd.Series(values, dtype=data[col].dtype).tolist() for col, values in filters.items()]
+        result = self._query(data, f'SELECT * FROM source WHERE {conditions} ORDER BY "Date", {ROW_COL}',
+                             parameters)
+        return _to_pandas(result).astype(data.drop(columns=ROW_COL).dtypes.to_dict())
+
+    def aggregate(self, data):
+        data = data[AGGREGATE_KEYS + VALUE_COLS].assign(**{ROW_COL: np.arange(len(data), dtype=np.int64)})
+        keys = ", ".join(_quote(col) for col in AGGREGATE_KEYS)
+        sums = ", ".join(f"sum({_quote(col)}) AS {_quote(col)}" for col in VALUE_COLS)
+        not_null = " AND ".join(f"{_quote(col)} IS NOT NULL" for col in AGGREGATE_KEYS)
+        result = self._query(data, f"""
+            SELECT {keys}, {sums}, CAST(count(*) AS BIGINT) AS {_quote(ROW_COUNT_COL)}
+            FROM source WHERE {not_null}
+            GROUP BY {keys} ORDER BY min({ROW_COL})
+        """)
+        return _to_pandas(result).astype(data[AGGREGATE_KEYS + VALUE_COLS].dtypes.to_dict())
+
+
+_BACKEND_CLASSES = {"pandas": PandasBackend, "polars": PolarsBackend, "duckdb": DuckDBBackend}
+_backends = {}
+
+
+def get_backend(name=None):
+    """
+    The backend called 'name' (DASHBOARD_BACKEND by default).
+    Raises ValueError for an unknown name and ImportError when its engine isn't installed.
+    """
+    name = (name or BACKEND).lower()
+    if name not in _BACKEND_CLASSES:
+        raise ValueError(f"Unknown dashboard backend '{name}'; expected one of {BACKENDS}")
+    if name not in _backends:
+        try:
+            _backends[name] = _BACKEND_CLASSES[name]()
+        except ImportError as e:
+            raise ImportError(f"The '{name}' dashboard backend needs the {name} package "
+                              f"(pip install {name}): {e}") from e
+    return _backends[name]
+
+
+def clean(raw_data, backend=None):
+    """
+    Cleaned rows of a loaded workbook (see loading.clean_sales_data), sorted by Date.
+    """
+    return get_backend(backend).clean(raw_data)
+
+
+def filter_rows(data, filters, backend=None):
+    """
+    Rows of 'data' whose value is in filters[column] for every column, sorted by Date.
+    """
+    return get_backend(backend).filter(data, filters)
+
+
+def aggregate(data, backend=None):
+    """
+    Monthly aggregates of 'data' (see aggregates.monthly_aggregates).
+    """
+    return get_backend(backend).aggregate(data)
@@ -0,0 +1,76 @@
+"""
+Process-wide LRU cache shared by the dashboard helpers.
+
+Streamlit keeps imported modules alive between reruns, so module-level
+instances survive reruns and are shared across sessions. Keys must
+therefore identify the dataset as well as every filter a value depends on.
+Because they do, the entries of an outdated dataset version can be dropped
+from every cache at once (discard_mentioning).
+"""
+import weakref
+from collections import OrderedDict
+from threading import Lock
+
+# Every LRUCache of the process, for discard_mentioning()
+_caches = weakref.WeakSet()
+
+
+class LRUCache:
+    """
+    Small thread-safe least-recently-used cache.
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = Lock()
+        _caches.add(self)
+
+    def get_or_build(self, key, build):
+        """
+        Returns the value cached under 'key', calling 'build()' on a miss.
+        """
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+
+        value = build()
+
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def discard(self, match):
+        """
+        Removes the entries whose key satisfies 'match(key)'. Returns how many were removed.
+        """
+        with self._lock:
+            stale = [key for key in self._items if match(key)]
+            for key in stale:
+                del self._items[key]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+def mentions(key, value):
+    """
+    Whether 'value' is 'key' or one of its (nested) tuple items.
+    """
+    if isinstance(key, tuple):
+        return any(mentions(item, value) for item in key)
+    return isinstance(key, type(value)) and key == value
+
+
+def discard_mentioning(value):
+    """
+    Removes the entries whose key mentions 'value' (e.g. an outdated dataset
+    version) from every cache. Returns how many were removed.
+    """
+    return sum(cache.discard(lambda key: mentions(key, value)) for cache in list(_caches))
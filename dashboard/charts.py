@@ -0,0 +1,167 @@
+"""
+Chart-building layer for the Streamlit dashboard.
+
+Large trend and comparison charts are reduced before they reach Plotly:
+  - series beyond the top N (by total value) are folded into a single "Other" series,
+  - long series are downsampled with Largest-Triangle-Three-Buckets (LTTB),
+  - line charts switch to WebGL traces once the point count passes a threshold.
+Built figures are cached per (dataset, chart, filters) key so a rerun with the
+same selections does not rebuild or re-serialize them.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from dashboard import profiling
+from dashboard.cache import LRUCache
+
+# Tunables (override through environment variables)
+WEBGL_THRESHOLD = int(os.getenv("CHART_WEBGL_THRESHOLD", "1000"))
+MAX_POINTS_PER_SERIES = int(os.getenv("CHART_MAX_POINTS_PER_SERIES", "500"))
+MAX_SERIES = int(os.getenv("CHART_MAX_SERIES", "20"))
+FIGURE_CACHE_SIZE = int(os.getenv("CHART_FIGURE_CACHE_SIZE", "64"))
+
+OTHER_LABEL = "Other"
+
+
+def lttb_indices(y, threshold, x=None):
+    """
+    Returns the positions of the points kept by Largest-Triangle-Three-Buckets
+    downsampling of the series 'y' down to 'threshold' points.
+    'x' defaults to the positional index (evenly spaced points).
+    """
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+
+    every = (n - 2) / (threshold - 2)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+
+        # Average point of the next bucket is the third vertex of the triangle
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    keep[-1] = n - 1
+    return keep
+
+
+def x_order(data, x):
+    """
+    Returns the chronological order of the values of column 'x',
+    using the 'Date' column when it is present.
+    """
+    if isinstance(data[x].dtype, pd.CategoricalDtype) and data[x].cat.ordered:
+        return [c for c in data[x].cat.categories if c in set(data[x])]
+    if "Date" in data.columns:
+        return list(dict.fromkeys(data.sort_values("Date")[x]))
+    return list(dict.fromkeys(data[x]))
+
+
+def limit_series(data, x, y, color, facet_col=None, max_series=MAX_SERIES):
+    """
+    Keeps the 'max_series - 1' largest series of 'color' (ranked by total 'y')
+    and sums every other series into a single 'Other' series per x (and facet).
+    """
+    if data[color].nunique() <= max_series:
+        return data
+
+    totals = data.groupby(color, observed=True)[y].sum()
+    keep = totals.nlargest(max_series - 1).index
+    mask = data[color].isin(keep)
+
+    keys = [x] + ([facet_col] if facet_col else [])
+    if "Date" in data.columns and "Date" not in keys:
+        keys = ["Date"] + keys
+    other = data.loc[~mask].groupby(keys, observed=True, sort=False)[y].sum().reset_index()
+    other[color] = OTHER_LABEL
+
+    return pd.concat([data.loc[mask, keys + [color, y]], other], ignore_index=True)
+
+
+def downsample(data, y, color, facet_col=None, max_points=MAX_POINTS_PER_SERIES):
+    """
+    Applies LTTB to every series (color, facet) longer than 'max_points'.
+    Rows are expected to already be in x order.
+    """
+    series_keys = [color] + ([facet_col] if facet_col else [])
+    sizes = data.groupby(series_keys, observed=True, sort=False)[y].transform("size")
+    if sizes.max() <= max_points:
+        return data
+
+    kept = []
+    for _, series in data.groupby(series_keys, observed=True, sort=False):
+        idx = lttb_indices(series[y].to_numpy(), max_points)
+        kept.append(series.iloc[idx])
+    return pd.concat(kept)
+
+
+def prepare(data, x, y, color, facet_col=None, max_series=MAX_SERIES, max_points=MAX_POINTS_PER_SERIES):
+    """
+    Reduces a long-format frame to what a chart actually needs to draw and
+    returns it together with the chronological order of 'x'.
+    """
+    order = x_order(data, x)
+    reduced = limit_series(data, x, y, color, facet_col=facet_col, max_series=max_series)
+
+    position = {value: i for i, value in enumerate(order)}
+    reduced = reduced.assign(_x_pos=reduced[x].map(position).astype(float))
+    reduced = reduced.sort_values("_x_pos", kind="stable")
+    reduced = downsample(reduced, y, color, facet_col=facet_col, max_points=max_points)
+    return reduced.drop(columns="_x_pos"), order
+
+
+def line_chart(data, x, y, color, facet_col=None, **kwargs):
+    """
+    plotly.express line chart over a reduced copy of 'data'.
+    Uses WebGL (scattergl) traces once the point count exceeds WEBGL_THRESHOLD.
+    """
+    reduced, order = prepare(data, x, y, color, facet_col=facet_col)
+    if facet_col:
+        kwargs.setdefault("facet_col", facet_col)
+    kwargs.setdefault("category_orders", {x: order})
+    render_mode = "webgl" if len(reduced) > WEBGL_THRESHOLD else "svg"
+    return px.line(reduced, x=x, y=y, color=color, render_mode=render_mode, **kwargs)
+
+
+def bar_chart(data, x, y, color, facet_col=None, **kwargs):
+    """
+    plotly.express bar chart over a reduced copy of 'data'.
+    Plotly has no WebGL bar trace, so only the series limit and
+    downsampling apply here.
+    """
+    reduced, order = prepare(data, x, y, color, facet_col=facet_col)
+    if facet_col:
+        kwargs.setdefault("facet_col", facet_col)
+    kwargs.setdefault("category_orders", {x: order})
+    return px.bar(reduced, x=x, y=y, color=color, **kwargs)
+
+
+figure_cache = LRUCache(maxsize=FIGURE_CACHE_SIZE)
+
+
+def cached_figure(key, build):
+    """
+    Returns the figure cached under 'key', calling 'build()' on a miss.
+    'key' should identify the dataset, the chart and every filter the chart depends on.
+    """
+    def build_profiled():
+        with profiling.span(f"chart_build:{key[0]}"):
+            return build()
+
+    return figure_cache.get_or_build(key, build_profiled)
@@ -0,0 +1,148 @@
+"""
+Month-by-month comparison tables (Sales / Difference / Percent Change / Contribution).
+
+Tabs 1, 2, 3 and 9 show the same kind of table: one row per member (Group,
+Store, Grouping...), one column per month and block, optionally with a Grand
+Total row. Instead of pivoting, re-sorting '%b %Y' strings and concatenating
+frames per block, the pre-aggregated rows are scattered once into a dense
+(rows x months) numpy array with months in Date order, and every block is
+array arithmetic on it. Column names are flattened as '<block>_<Mon YYYY>'.
+Tab 9's sales vs stock table (sales_stock_table) is built the same way.
+"""
+import numpy as np
+import pandas as pd
+
+from dashboard.cache import LRUCache
+
+BLOCKS = ["Sales", "Difference", "Percent Change", "Contribution"]
+TOTAL_LABEL = "Grand Total"
+
+_table_cache = LRUCache(maxsize=32)
+
+
+def month_matrix(data, index, value):
+    """
+    Sums 'value' of 'data' per 'index' columns and month ('Date').
+    Returns (row labels frame, months in chronological order, rows x months array).
+    Rows with a missing key or date are left out, as in pivot_table.
+    """
+    # Each key column is factorized on its own (sorted), and the codes are combined
+    # into one integer per row so np.unique orders the rows like a sorted MultiIndex
+    factorized = [pd.factorize(data[col], sort=True) for col in index]
+    month_codes, months = pd.factorize(data["Date"], sort=True)
+    valid = month_codes >= 0
+    combined = np.zeros(len(data), dtype=np.int64)
+    for codes, uniques in factorized:
+        valid &= codes >= 0
+        combined = combined * len(uniques) + codes
+
+    row_keys, row_codes = np.unique(combined[valid], return_inverse=True)
+    values = np.bincount(
+        row_codes * len(months) + month_codes[valid],
+        weights=data[value].to_numpy(dtype=float)[valid],
+        minlength=len(row_keys) * len(months),
+    ).reshape(len(row_keys), len(months))
+
+    labels = {}
+    for col, (codes, uniques) in reversed(list(zip(index, factorized))):
+        row_keys, col_codes = np.divmod(row_keys, len(uniques))
+        labels[col] = np.asarray(uniques)[col_codes]
+    return pd.DataFrame({col: labels[col] for col in index}), pd.DatetimeIndex(months), values
+
+
+def _difference(values):
+    diff = np.full_like(values, np.nan)
+    diff[:, 1:] = values[:, 1:] - values[:, :-1]
+    return diff
+
+
+def _percent_change(values):
+    change = np.full_like(values, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change[:, 1:] = np.where(values[:, :-1] != 0, (values[:, 1:] - values[:, :-1]) / values[:, :-1] * 100,
+                                 np.nan)
+    return change
+
+
+def comparison_table(data, index, value="Penjualan", blocks=("Sales", "Difference"), labels=None,
+                     grand_total=True):
+    """
+    Builds the comparison table of 'value' per 'index' (a column name or list of
+    them) and month from the rows of 'data' (which needs a 'Date' column).
+
+    'blocks' picks and orders the blocks from BLOCKS; 'labels' renames them in the
+    column names (e.g. {"Sales": "Stock Value"}). With 'grand_total' a last row
+    labelled TOTAL_LABEL holds the column totals (and the blocks of the totals).
+    Contribution is each row's share (%) of the month's total.
+    """
+    index = [index] if isinstance(index, str) else list(index)
+    labels = labels or {}
+    rows, months, values = month_matrix(data, index, value)
+
+    totals = values.sum(axis=0, keepdims=True)
+    if grand_total:
+        values = np.vstack([values, totals])
+        total_row = pd.DataFrame([[TOTAL_LABEL] + [""] * (len(index) - 1)], columns=index)
+        rows = pd.concat([rows, total_row], ignore_index=True)
+
+    computed = {}
+    for block in blocks:
+        if block == "Sales":
+            computed[block] = values
+        elif block == "Difference":
+            computed[block] = _difference(values)
+        elif block == "Percent Change":
+            computed[block] = _percent_change(values)
+        elif block == "Contribution":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                computed[block] = np.where(totals != 0, values / totals * 100, np.nan)
+        else:
+            raise ValueError(f"Unknown block '{block}'; expected one of {BLOCKS}")
+
+    month_names = months.strftime("%b %Y")
+    columns = [f"{labels.get(block, block)}_{month}" for block in blocks for month in month_names]
+    block_values = np.hstack([computed[block] for block in blocks]) if blocks else np.empty((len(rows), 0))
+    return pd.concat([rows, pd.DataFrame(block_values, columns=columns)], axis=1)
+
+
+def sales_stock_table(data, index):
+    """
+    Sales and Stock Value of 'data' per 'index' column and month side by side,
+    with the stock as a percentage of the month's sales (NaN without sales).
+    Columns are '<Mon YYYY>_Sales', '<Mon YYYY>_Stock' and 'Stock%_<Mon YYYY>'.
+    Returns (table, month labels in chronological order).
+    """
+    # Both matrices have the same rows and months: only the summed values differ
+    rows, months, sales = month_matrix(data, [index], "Penjualan")
+    _, _, stock = month_matrix(data, [index], "Stock Value")
+    month_names = list(months.strftime("%b %Y"))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stock_pct = np.where(sales != 0, stock / sales * 100, np.nan)
+    table = pd.concat([
+        rows,
+        pd.DataFrame(sales, columns=[f"{month}_Sales" for month in month_names]),
+        pd.DataFrame(stock, columns=[f"{month}_Stock" for month in month_names]),
+        pd.DataFrame(stock_pct, columns=[f"Stock%_{month}" for month in month_names]),
+    ], axis=1)
+    return table, month_names
+
+
+def cached_comparison_table(key, data, index, value="Penjualan", blocks=("Sales", "Difference"), labels=None,
+                            grand_total=True):
+    """
+    comparison_table(...) cached under 'key' (dataset fingerprint + filters) and the table settings.
+    """
+    index = [index] if isinstance(index, str) else list(index)
+    settings = (tuple(index), value, tuple(blocks), tuple(sorted((labels or {}).items())), grand_total)
+    return _table_cache.get_or_build(
+        (key,) + settings, lambda: comparison_table(data, index, value, blocks, labels, grand_total)
+    )
+
+
+def block_columns(table, block, labels=None):
+    """
+    The columns of 'table' that belong to 'block'.
+    """
+    prefix = f"{(labels or {}).get(block, block)}_"
+    return [col for col in table.columns if isinstance(col, str) and col.startswith(prefix)]
@@ -0,0 +1,208 @@
+"""
+Table exports for the Streamlit dashboard: CSV, Parquet and multi-sheet Excel.
+
+Exports are written to files in EXPORT_DIR chunk by chunk, so writing one
+never needs more than a chunk in memory besides the table itself:
+  - CSV in CHUNK_ROWS slices appended to the file,
+  - Parquet with one row group per slice (pyarrow ParquetWriter),
+  - Excel with openpyxl's write-only workbook, which streams rows to disk;
+    tables longer than an Excel sheet continue on extra sheets.
+Tables with more than BACKGROUND_ROWS rows are exported by a background
+thread pool, so the page keeps rendering while the file is written. Finished
+exports are kept (up to MAX_EXPORTS) under a fingerprint of their content and
+format, so downloading the same table again doesn't rewrite it. The files of
+evicted exports are removed, those still being written once they are done.
+"""
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import RLock
+
+import numpy as np
+import pandas as pd
+
+EXPORT_DIR = os.getenv("DASHBOARD_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "dashboard_exports"))
+CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "50000"))
+BACKGROUND_ROWS = int(os.getenv("EXPORT_BACKGROUND_ROWS", "200000"))
+MAX_EXPORTS = int(os.getenv("EXPORT_MAX_FILES", "32"))
+EXCEL_MAX_ROWS = 1_048_575  # plus the header row
+
+# Format -> (file extension, MIME type)
+FORMATS = {
+    "CSV": (".csv", "text/csv"),
+    "Parquet": (".parquet", "application/octet-stream"),
+    "Excel": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("EXPORT_WORKERS", "2")), thread_name_prefix="export")
+_jobs = OrderedDict()
+# Reentrant: the file of an evicted export that is already done is removed by
+# a done callback that runs right away, while request_export holds the lock
+_jobs_lock = RLock()
+
+
+def _chunks(df):
+    for start in range(0, len(df), CHUNK_ROWS):
+        yield df.iloc[start:start + CHUNK_ROWS]
+
+
+def write_csv(df, path):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        df.iloc[:0].to_csv(fh, index=False)
+        for chunk in _chunks(df):
+            chunk.to_csv(fh, index=False, header=False)
+
+
+def write_parquet(df, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in _chunks(df):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def _sheet_title(name, used):
+    """
+    Excel sheet titles: at most 31 characters, no []:*?/\\ and unique within the workbook.
+    """
+    title = "".join("_" if c in '[]:*?/\\' else c for c in str(name))[:31] or "Sheet"
+    base, n = title, 2
+    while title in used:
+        suffix = f" ({n})"
+        title = base[:31 - len(suffix)] + suffix
+        n += 1
+    used.add(title)
+    return title
+
+
+def _excel_rows(chunk):
+    """
+    Rows of 'chunk' as plain Python values; NaN/NaT become empty cells.
+    """
+    values = chunk.astype(object).where(chunk.notna(), None)
+    for row in values.itertuples(index=False, name=None):
+        yield [v.item() if isinstance(v, np.generic) else v for v in row]
+
+
+def write_excel(tables, path):
+    """
+    Writes every (sheet name, DataFrame) of 'tables' to its own sheet(s) of one workbook.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    used = set()
+    for name, df in tables.items():
+        df = df.reset_index(drop=True)
+        # Long tables continue on 'name (2)', 'name (3)'... sheets
+        for start in range(0, max(len(df), 1), EXCEL_MAX_ROWS):
+            sheet = workbook.create_sheet(_sheet_title(name, used))
+            sheet.append([str(col) for col in df.columns])
+            for chunk in _chunks(df.iloc[start:start + EXCEL_MAX_ROWS]):
+                for row in _excel_rows(chunk):
+                    sheet.append(row)
+    workbook.save(path)
+
+
+def write_export(tables, fmt, path):
+    """
+    Writes 'tables' (sheet name -> DataFrame) to 'path' in 'fmt'. CSV and Parquet
+    hold a single table. The file appears under 'path' only once it is complete.
+    """
+    if fmt != "Excel" and len(tables) != 1:
+        raise ValueError(f"{fmt} exports hold a single table; use Excel for several.")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=FORMATS[fmt][0])
+    os.close(fd)
+    try:
+        if fmt == "CSV":
+            write_csv(next(iter(tables.values())), tmp_path)
+        elif fmt == "Parquet":
+            write_parquet(next(iter(tables.values())), tmp_path)
+        else:
+            write_excel(tables, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+def fingerprint(tables):
+    """
+    Content hash of 'tables' (names, columns and values).
+    """
+    digest = hashlib.md5()
+    for name, df in tables.items():
+        digest.update(str(name).encode())
+        digest.update(str(list(df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _remove_file(key, job):
+    """
+    Removes the file of the evicted export 'job', unless it failed or the same
+    export was requested again since (the new request writes the same path).
+    """
+    if job.exception() is not None:
+        return
+    with _jobs_lock:
+        if key in _jobs:
+            return
+        try:
+            os.remove(job.result())
+        except OSError:
+            pass
+
+
+def _forget(key, job):
+    """
+    Removes the file of an evicted export, once it is written for a running one.
+    """
+    job.add_done_callback(lambda done: _remove_file(key, done))
+
+
+def request_export(tables, fmt, start=True):
+    """
+    Returns the Future of the 'fmt' export of 'tables' (sheet name -> DataFrame),
+    whose result is the file path. Starts it when 'start' is true and it isn't
+    known yet or failed (an unknown export returns None otherwise): small tables
+    are written right away, large ones by the background pool.
+    """
+    key = (fingerprint(tables), fmt)
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is not None:
+            failed = job.done() and job.exception() is not None
+            # A finished export whose file was removed (e.g. a cleaned temp dir) is redone
+            missing = job.done() and not failed and not os.path.exists(job.result())
+            if not missing and not (failed and start):
+                _jobs.move_to_end(key)
+                return job
+        if not start:
+            return None
+
+        job = Future()
+        _jobs[key] = job
+        while len(_jobs) > MAX_EXPORTS:
+            _forget(*_jobs.popitem(last=False))
+
+    path = os.path.join(EXPORT_DIR, f"{key[0]}{FORMATS[fmt][0]}")
+    if sum(len(df) for df in tables.values()) > BACKGROUND_ROWS:
+        _executor.submit(_run, job, tables, fmt, path)
+    else:
+        _run(job, tables, fmt, path)
+    return job
+
+
+def _run(job, tables, fmt, path):
+    try:
+        job.set_result(write_export(tables, fmt, path))
+    except Exception as e:
+        job.set_exception(e)
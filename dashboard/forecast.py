@@ -0,0 +1,121 @@
+"""
+Next-months projections per (Group, Store Name, Grouping) series.
+
+Every series of the monthly aggregates (see dashboard/aggregates.py) is laid
+out as one row of a series x month matrix, so each model is fitted to all
+series at once with numpy instead of one small fit per series:
+  - seasonal naive: the same month of the previous year (the last value when
+    there is less than a year of history),
+  - exponential smoothing: simple exponential smoothing, with the smoothing
+    factor picked per series from a grid by one-step-ahead squared error,
+  - auto: per series, whichever of the two had the lower error when
+    forecasting the last 'horizon' months from the months before them.
+Forecasts are cached per dataset version, metric, method and horizon.
+"""
+import numpy as np
+import pandas as pd
+
+from dashboard.cache import LRUCache
+
+SERIES_KEYS = ["Group", "Store Name", "Grouping"]
+METRICS = ["Penjualan", "Stock Value"]
+METHODS = ["Auto", "Seasonal naive", "Exponential smoothing"]
+# Months ahead the Forecast tab shows by default
+DEFAULT_HORIZON = 3
+
+SEASON = 12
+ALPHAS = np.linspace(0.1, 0.9, 9)
+
+_forecast_cache = LRUCache(maxsize=16)
+
+
+def series_matrix(aggregates, metric):
+    """
+    Returns 'metric' as a (series x month) frame indexed by SERIES_KEYS, with one
+    column per month from the first to the last month of the data. Months
+    without rows count as 0.
+    """
+    totals = aggregates.groupby(SERIES_KEYS + ["Date"], observed=True)[metric].sum()
+    dates = totals.index.get_level_values("Date")
+    months = pd.date_range(dates.min(), dates.max(), freq="MS")
+    return totals.unstack("Date", fill_value=0).reindex(columns=months, fill_value=0).astype(float)
+
+
+def seasonal_naive(values, horizon, season=SEASON):
+    """
+    Seasonal naive forecast of every row of 'values' (series x months).
+    """
+    n = values.shape[1]
+    if n >= season:
+        return values[:, n - season + np.arange(horizon) % season]
+    return np.repeat(values[:, -1:], horizon, axis=1)
+
+
+def exponential_smoothing(values, horizon, alphas=ALPHAS):
+    """
+    Simple exponential smoothing of every row of 'values' (series x months),
+    fitted for all smoothing factors in 'alphas' at once.
+    Returns (forecast, chosen alpha per series).
+    """
+    series = np.arange(values.shape[0])
+    level = np.tile(values[:, 0], (len(alphas), 1))
+    sse = np.zeros_like(level)
+    factors = alphas[:, None]
+    for t in range(1, values.shape[1]):
+        error = values[:, t] - level
+        sse += error ** 2
+        level += factors * error
+
+    best = sse.argmin(axis=0)
+    return np.repeat(level[best, series][:, None], horizon, axis=1), alphas[best]
+
+
+def _fit(values, method, horizon):
+    """
+    Returns (forecast, method name per series) for 'values' (series x months).
+    """
+    if method == "Seasonal naive":
+        return seasonal_naive(values, horizon), np.full(len(values), method, dtype=object)
+    if method == "Exponential smoothing":
+        return exponential_smoothing(values, horizon)[0], np.full(len(values), method, dtype=object)
+
+    # Auto: back-test both models on the last 'horizon' months and keep the better one per series
+    smoothing = exponential_smoothing(values, horizon)[0]
+    if values.shape[1] <= horizon + 1:
+        return smoothing, np.full(len(values), "Exponential smoothing", dtype=object)
+    train, actual = values[:, :-horizon], values[:, -horizon:]
+    naive_error = np.abs(seasonal_naive(train, horizon) - actual).mean(axis=1)
+    smoothing_error = np.abs(exponential_smoothing(train, horizon)[0] - actual).mean(axis=1)
+    use_naive = naive_error < smoothing_error
+    forecast = np.where(use_naive[:, None], seasonal_naive(values, horizon), smoothing)
+    return forecast, np.where(use_naive, "Seasonal naive", "Exponential smoothing")
+
+
+def forecast(aggregates, metric="Penjualan", method="Auto", horizon=3):
+    """
+    Projects 'metric' 'horizon' months past the last month of 'aggregates' for
+    every (Group, Store Name, Grouping). Returns one row per series and future
+    month with SERIES_KEYS, 'Date', 'Forecast' and the 'Method' used.
+    """
+    matrix = series_matrix(aggregates, metric)
+    values, chosen = _fit(matrix.to_numpy(), method, horizon)
+    # Sales and stock can't go negative
+    values = np.clip(values, 0, None)
+
+    future = pd.date_range(matrix.columns[-1], periods=horizon + 1, freq="MS")[1:]
+    result = pd.DataFrame(
+        np.repeat(matrix.index.to_frame(index=False).to_numpy(), horizon, axis=0), columns=SERIES_KEYS
+    )
+    result["Date"] = np.tile(future, len(matrix))
+    result["Forecast"] = values.ravel()
+    result["Method"] = np.repeat(chosen, horizon)
+    return result
+
+
+def cached_forecast(key, aggregates, metric="Penjualan", method="Auto", horizon=3):
+    """
+    forecast(...) cached under 'key' (the dataset version) and the forecast settings.
+    """
+    return _forecast_cache.get_or_build(
+        (key, metric, method, horizon), lambda: forecast(aggregates, metric, method, horizon)
+    )
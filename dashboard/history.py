@@ -0,0 +1,354 @@
+"""
+Persisted sales history for the Streamlit dashboard.
+
+Cleaned rows are stored as Parquet partitioned by year and month, next to a
+partition of monthly aggregates (see dashboard/aggregates.py) for each month:
+
+    <DASHBOARD_DATA_DIR>/
+        manifest.json
+        sales/year=2024/month=01/part-0.parquet
+        aggregates/year=2024/month=01/part-0.parquet
+
+Appending a new month validates it against the stored schema and stores,
+writes its partitions and leaves every other partition untouched. Appends
+hold a file lock (<DASHBOARD_DATA_DIR>/.append.lock) across the manifest
+read-modify-write, so concurrent appends (e.g. two sessions) are applied one
+after the other. Replacing a stored month only replaces the rows of the
+stores in the upload; the month's other stores are kept.
+
+Besides loading the whole history (load_cached), the history can be queried
+out of core, for histories that don't fit in memory:
+  - partition pruning: only the partitions of the selected years and months
+    are opened (the manifest lists them, no directory listing needed),
+  - predicate pushdown: the Group / Store Name / Grouping filters are handed
+    to the Parquet reader, which skips row groups whose statistics can't
+    match (sales partitions are written sorted by store and division, in
+    row groups of HISTORY_ROW_GROUP_ROWS rows, so the statistics are tight),
+  - the monthly aggregates stored with every partition are read the same way,
+    so no query aggregates the history's rows; only the selection and its
+    aggregates are ever held in memory.
+"""
+import calendar
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from dashboard.aggregates import AGGREGATE_KEYS, ROW_COUNT_COL, VALUE_COLS, monthly_aggregates
+from dashboard.cache import LRUCache
+from locks import file_lock
+
+DATA_DIR = os.getenv("DASHBOARD_DATA_DIR", "data")
+# Rows per Parquet row group of the sales partitions (the unit predicate pushdown can skip)
+ROW_GROUP_ROWS = int(os.getenv("HISTORY_ROW_GROUP_ROWS", "65536"))
+# Query the stored history out of core by default (the page offers a toggle)
+OUT_OF_CORE = os.getenv("DASHBOARD_HISTORY_MODE", "memory").strip().lower() == "out-of-core"
+
+SALES_DIR = "sales"
+# Sales partitions are sorted by these columns, so each row group covers few of their values
+SALES_SORT_KEYS = ["Store Name", "Group"]
+AGGREGATES_DIR = "aggregates"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".append.lock"
+
+# 'Month' column values (full or abbreviated names) -> month number
+MONTH_NUMBERS = {name.lower(): number for names in (calendar.month_name, calendar.month_abbr)
+                 for number, name in enumerate(names) if name}
+
+_history_cache = LRUCache(maxsize=2)
+# Out-of-core selections (rows and aggregates) per dataset version and filters
+_selection_cache = LRUCache(maxsize=8)
+
+
+class AppendError(ValueError):
+    """
+    Raised when a new month cannot be merged into the stored history.
+    """
+
+
+def _partition_path(root, kind, year, month):
+    return os.path.join(root, kind, f"year={int(year)}", f"month={int(month):02d}", "part-0.parquet")
+
+
+def _write_parquet(df, path):
+    """
+    Writes 'df' to 'path' atomically (temp file + rename), in row groups of ROW_GROUP_ROWS rows.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path, index=False, row_group_size=ROW_GROUP_ROWS)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def read_manifest(root=DATA_DIR):
+    """
+    Returns the manifest of the stored history, or None if nothing is stored yet.
+    """
+    path = os.path.join(root, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def _write_manifest(manifest, root):
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _schema(df):
+    return {col: str(dtype) for col, dtype in df.dtypes.items()}
+
+
+def validate_append(new_data, manifest, replace=False, allow_new_stores=False):
+    """
+    Checks cleaned rows for a new month against the stored history.
+    Returns the list of (year, month) partitions the rows belong to.
+    Raises AppendError describing every problem found.
+    """
+    if new_data.empty:
+        raise AppendError("The uploaded sheet has no valid rows after cleaning.")
+
+    partitions = sorted({(int(d.year), int(d.month)) for d in new_data['Date'].drop_duplicates()})
+    if manifest is None:
+        return partitions
+
+    problems = []
+    schema = manifest["schema"]
+    missing = [col for col in schema if col not in new_data.columns]
+    if missing:
+        problems.append(f"Missing columns compared to stored history: {missing}")
+
+    for col, dtype in schema.items():
+        if col in new_data.columns and col not in missing:
+            new_dtype = str(new_data[col].dtype)
+            if new_dtype != dtype and not (pd.api.types.is_numeric_dtype(new_data[col]) and
+                                           dtype.startswith(("int", "float"))):
+                problems.append(f"Column '{col}' has type {new_dtype}, stored history has {dtype}")
+
+    if not allow_new_stores:
+        unknown = sorted(set(new_data['Store Name'].unique()) - set(manifest["stores"]))
+        if unknown:
+            problems.append(f"Unknown stores: {unknown}")
+
+    if not replace:
+        stored = {tuple(p) for p in manifest["partitions"]}
+        existing = [f"{datetime(y, m, 1):%b %Y}" for y, m in partitions if (y, m) in stored]
+        if existing:
+            problems.append(f"Months already stored: {existing}")
+
+    if problems:
+        raise AppendError("; ".join(problems))
+    return partitions
+
+
+def append_month(new_data, root=DATA_DIR, replace=False, allow_new_stores=False):
+    """
+    Merges cleaned rows for one (or a few) new months into the stored history.
+    Only the sales and aggregate partitions of those months are (re)written.
+    With 'replace', the (month, store) slices of the upload replace the stored
+    ones; rows of other stores in those months are kept.
+    Returns the updated manifest.
+    """
+    with file_lock(os.path.join(root, LOCK_FILE)):
+        return _append_locked(new_data, root, replace, allow_new_stores)
+
+
+def _append_locked(new_data, root, replace, allow_new_stores):
+    manifest = read_manifest(root)
+    partitions = validate_append(new_data, manifest, replace=replace, allow_new_stores=allow_new_stores)
+
+    if manifest is None:
+        manifest = {
+            "version": 0,
+            "schema": _schema(new_data),
+            "stores": [],
+            "partitions": [],
+        }
+    else:
+        new_data = new_data[list(manifest["schema"])]
+
+    stored = {tuple(p) for p in manifest["partitions"]}
+    for year, month in partitions:
+        month_rows = new_data[(new_data['Date'].dt.year == year) & (new_data['Date'].dt.month == month)]
+        if (year, month) in stored:
+            kept = pd.read_parquet(_partition_path(root, SALES_DIR, year, month))
+            kept = kept[~kept['Store Name'].isin(month_rows['Store Name'].unique())]
+            month_rows = pd.concat([kept, month_rows], ignore_index=True)
+        _write_parquet(month_rows.sort_values(SALES_SORT_KEYS, kind="stable"),
+                       _partition_path(root, SALES_DIR, year, month))
+        _write_parquet(monthly_aggregates(month_rows), _partition_path(root, AGGREGATES_DIR, year, month))
+
+    manifest["partitions"] = [list(p) for p in sorted(stored | set(partitions))]
+    manifest["stores"] = sorted(set(manifest["stores"]) | set(new_data['Store Name'].unique()))
+    manifest["version"] += 1
+    manifest["updated_at"] = datetime.now(timezone.utc).isoformat()
+    _write_manifest(manifest, root)
+    return manifest
+
+
+def _read_partitions(root, kind, manifest):
+    frames = [pd.read_parquet(_partition_path(root, kind, year, month)) for year, month in manifest["partitions"]]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def load_history(root=DATA_DIR):
+    """
+    Returns all stored rows sorted by Date (empty DataFrame if nothing is stored).
+    """
+    manifest = read_manifest(root)
+    if manifest is None:
+        return pd.DataFrame()
+    data = _read_partitions(root, SALES_DIR, manifest)
+    return data.sort_values('Date', kind="stable")
+
+
+def load_aggregates(root=DATA_DIR):
+    """
+    Returns the stored monthly aggregates of every partition.
+    """
+    manifest = read_manifest(root)
+    if manifest is None:
+        return pd.DataFrame()
+    return _read_partitions(root, AGGREGATES_DIR, manifest)
+
+
+def dataset_version(root=DATA_DIR):
+    """
+    Identifier of the stored history, changes on every append.
+    """
+    manifest = read_manifest(root)
+    return f"history-v{manifest['version']}" if manifest else None
+
+
+def load_cached(root=DATA_DIR):
+    """
+    Returns (version, rows, aggregates) of the stored history.
+    Partitions are only re-read when the version changes.
+    """
+    version = dataset_version(root)
+    rows, aggregates = _history_cache.get_or_build(
+        (root, version), lambda: (load_history(root), load_aggregates(root))
+    )
+    return version, rows, aggregates
+
+
+def _pruned_paths(root, kind, manifest, years=None, months=None):
+    """
+    Paths of the 'kind' partitions of the selected years and months (month names
+    as in the 'Month' column, or numbers); None selects every year or month.
+    """
+    if months is not None:
+        months = {m if isinstance(m, int) else MONTH_NUMBERS[str(m).lower()] for m in months}
+    years = None if years is None else {int(y) for y in years}
+    return [
+        _partition_path(root, kind, year, month) for year, month in manifest["partitions"]
+        if (years is None or year in years) and (months is None or month in months)
+    ]
+
+
+def scan(root=DATA_DIR, kind=SALES_DIR, years=None, months=None, stores=None, groups=None, categories=None,
+         columns=None, batch_size=ROW_GROUP_ROWS):
+    """
+    Returns a pyarrow Scanner over the stored 'kind' partitions ('sales' or
+    'aggregates') matching the dashboard filters, or None if nothing matches.
+    Years and months prune partitions; stores, groups and categories (Grouping)
+    are pushed down to the Parquet reader. None means no filter on that column.
+    """
+    import pyarrow.dataset as ds
+
+    manifest = read_manifest(root)
+    paths = _pruned_paths(root, kind, manifest, years, months) if manifest else []
+    filters = (("Store Name", stores), ("Group", groups), ("Grouping", categories))
+    if not paths or any(values is not None and len(values) == 0 for _, values in filters):
+        return None
+
+    dataset = ds.dataset(paths, format="parquet")
+    predicate = None
+    for column, values in filters:
+        if values is not None:
+            condition = ds.field(column).isin(list(values))
+            predicate = condition if predicate is None else predicate & condition
+    return dataset.scanner(columns=columns, filter=predicate, batch_size=batch_size)
+
+
+def read_filtered(root=DATA_DIR, years=None, months=None, stores=None, groups=None, categories=None,
+                  columns=None):
+    """
+    Stored rows matching the dashboard filters, sorted by Date, without reading
+    the rest of the history (see scan).
+    """
+    scanner = scan(root, SALES_DIR, years, months, stores, groups, categories, columns)
+    if scanner is None:
+        return pd.DataFrame()
+    return scanner.to_table().to_pandas().sort_values('Date', kind="stable").reset_index(drop=True)
+
+
+def read_aggregates(root=DATA_DIR, years=None, months=None, stores=None, groups=None, categories=None):
+    """
+    Stored monthly aggregates matching the dashboard filters (see scan). They
+    were computed per partition when each month was appended, so this reads
+    a fraction of the rows read_filtered would.
+    """
+    scanner = scan(root, AGGREGATES_DIR, years, months, stores, groups, categories)
+    if scanner is None:
+        return pd.DataFrame(columns=AGGREGATE_KEYS + VALUE_COLS + [ROW_COUNT_COL])
+    return scanner.to_table().to_pandas()
+
+
+def cached_read_filtered(key, root=DATA_DIR, **filters):
+    """
+    read_filtered(root, **filters) cached under 'key' (dataset version + filters).
+    Returns a copy: the page adds and rewrites columns of the rows it gets,
+    and the cached frame is shared by every session.
+    """
+    return _selection_cache.get_or_build(("rows", root, key), lambda: read_filtered(root, **filters)).copy()
+
+
+def cached_read_aggregates(key, root=DATA_DIR, **filters):
+    """
+    read_aggregates(root, **filters) cached under 'key' (dataset version + filters).
+    """
+    return _selection_cache.get_or_build(("aggregates", root, key), lambda: read_aggregates(root, **filters))
+
+
+def filter_options(root=DATA_DIR):
+    """
+    Values offered by the dashboard filters ('Group', 'year', 'Month',
+    'Store Name', 'Grouping' -> sorted values), from the manifest and the
+    stored aggregates, without reading the sales rows.
+    """
+    manifest = read_manifest(root)
+    if manifest is None:
+        return {}
+    scanner = scan(root, AGGREGATES_DIR, columns=["Group", "Grouping"])
+    groups, categories = set(), set()
+    for batch in scanner.to_batches():
+        groups.update(batch.column("Group").unique().to_pylist())
+        categories.update(batch.column("Grouping").unique().to_pylist())
+    return {
+        "Group": sorted(groups - {None}),
+        "year": sorted({year for year, _ in manifest["partitions"]}),
+        "Month": [calendar.month_name[m] for m in sorted({month for _, month in manifest["partitions"]})],
+        "Store Name": sorted(manifest["stores"]),
+        "Grouping": sorted(categories - {None}),
+    }
+
+
+def cached_filter_options(root=DATA_DIR):
+    """
+    Returns (version, filter_options(root)); re-read only when the version changes.
+    """
+    version = dataset_version(root)
+    return version, _history_cache.get_or_build((root, version, "options"), lambda: filter_options(root))
@@ -0,0 +1,109 @@
+"""
+ABC / Pareto classification and stock cover per (Store Name, Grouping).
+
+Works off the shared monthly aggregates (see dashboard/aggregates.py):
+  - every combination's share of sales is accumulated in descending sales
+    order (numpy lexsort + cumsum, per store or across all stores) and cut
+    into A / B / C classes,
+  - stock-to-sales ratio and weeks of cover compare the average monthly stock
+    with the average monthly / weekly sales over the selected months,
+  - combinations with more weeks of cover than SLOW_MOVER_WEEKS (or stock but
+    no sales) are flagged as slow movers.
+Everything is column arithmetic on one row per combination, so tens of
+thousands of combinations classify in milliseconds.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from dashboard.cache import LRUCache
+
+KEYS = ["Store Name", "Group", "Grouping"]
+
+# Cumulative sales share (%) up to which a combination is class A, then B; the rest is C
+ABC_THRESHOLDS = (80.0, 95.0)
+SLOW_MOVER_WEEKS = float(os.getenv("SLOW_MOVER_WEEKS", "26"))
+WEEKS_PER_MONTH = 52 / 12
+
+_classification_cache = LRUCache(maxsize=16)
+
+
+def abc_classes(cumulative_share, thresholds=ABC_THRESHOLDS):
+    """
+    Maps the cumulative sales share before each combination (in %) to 'A', 'B' or 'C',
+    so the combination that crosses a threshold still belongs to the higher class.
+    """
+    return np.select(
+        [cumulative_share < thresholds[0], cumulative_share < thresholds[1]], ["A", "B"], default="C"
+    )
+
+
+def classify(aggregates, within=None, thresholds=ABC_THRESHOLDS, slow_mover_weeks=SLOW_MOVER_WEEKS):
+    """
+    Returns one row per (Store Name, Group, Grouping) of 'aggregates' with sales,
+    average stock, sales share, cumulative share, ABC class, stock-to-sales
+    ratio, weeks of cover and a slow mover flag, best sellers first.
+    'within' ('Store Name' or None) ranks each store on its own or all combinations together.
+    """
+    months = aggregates["Date"].nunique()
+    totals = aggregates.groupby(KEYS, observed=True)[["Penjualan", "Stock Value"]].sum().reset_index()
+
+    sales = totals["Penjualan"].to_numpy(dtype=float)
+    # Stock Value is a month-end level: average it over the selected months
+    avg_stock = totals["Stock Value"].to_numpy(dtype=float) / max(months, 1)
+
+    # Descending sales within each scope; ties keep a stable order
+    if within:
+        scope = totals[within].astype("category").cat.codes.to_numpy()
+    else:
+        scope = np.zeros(len(totals), dtype=np.int64)
+    order = np.lexsort((np.arange(len(totals)), -sales, scope))
+    table = totals.iloc[order].drop(columns="Stock Value").reset_index(drop=True)
+    sales, avg_stock, scope = sales[order], avg_stock[order], scope[order]
+
+    by_scope = table["Penjualan"].groupby(scope)
+    cumulative = by_scope.cumsum().to_numpy(dtype=float)
+    scope_total = by_scope.transform("sum").to_numpy(dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(scope_total != 0, sales / scope_total * 100, np.nan)
+        cumulative_share = np.where(scope_total != 0, cumulative / scope_total * 100, np.nan)
+        monthly_sales = sales / max(months, 1)
+        stock_to_sales = np.where(monthly_sales != 0, avg_stock / monthly_sales, np.nan)
+        weeks_of_cover = np.where(
+            monthly_sales > 0, avg_stock / (monthly_sales / WEEKS_PER_MONTH),
+            np.where(avg_stock > 0, np.inf, np.nan)
+        )
+
+    table["Average Stock Value"] = avg_stock
+    table["Sales Share %"] = share
+    table["Cumulative Share %"] = cumulative_share
+    table["ABC Class"] = abc_classes(np.nan_to_num(cumulative_share - share, nan=100.0), thresholds)
+    table["Stock-to-Sales Ratio"] = stock_to_sales
+    table["Weeks of Cover"] = weeks_of_cover
+    table["Slow Mover"] = weeks_of_cover > slow_mover_weeks
+    return table
+
+
+def cached_classify(key, aggregates, within=None):
+    """
+    classify(...) cached under 'key' (dataset fingerprint + filters) and 'within'.
+    """
+    return _classification_cache.get_or_build((key, within), lambda: classify(aggregates, within))
+
+
+def summary(table):
+    """
+    Combinations, sales share, stock and slow movers per ABC class.
+    """
+    grouped = table.groupby("ABC Class")
+    result = pd.DataFrame({
+        "Combinations": grouped.size(),
+        "Penjualan": grouped["Penjualan"].sum(),
+        "Average Stock Value": grouped["Average Stock Value"].sum(),
+        "Slow Movers": grouped["Slow Mover"].sum(),
+    }).reindex(["A", "B", "C"], fill_value=0)
+    total_sales = result["Penjualan"].sum()
+    result["Sales Share %"] = result["Penjualan"] / total_sales * 100 if total_sales else np.nan
+    return result.reset_index()
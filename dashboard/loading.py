@@ -0,0 +1,194 @@
+"""
+Loading and cleaning of the sales workbooks used by the Streamlit dashboard.
+
+Several workbooks (e.g. one per region) can be loaded at once: each workbook is
+opened a single time and parsed in a worker process, then the sheets are
+unioned after reconciling their column names.
+"""
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from dashboard import profiling
+
+# Define required columns
+REQUIRED_COLS = ["Grouping", "Penjualan", "HPP", "Gross Margin", "Store Name", "Month", "year", "Stock Value"]
+NUMERIC_COLS = ["Penjualan", "HPP", "Gross Margin", "Stock Value"]
+
+# Divisions kept by the dashboard
+DIVISIONS = ["GRC+FRS", "BZR"]
+
+
+def read_sales_workbook(file):
+    """
+    Reads the first sheet of the uploaded Excel file (opened once).
+    """
+    with pd.ExcelFile(file) as excel_data:
+        first_sheet = excel_data.sheet_names[0]
+        return excel_data.parse(first_sheet)
+
+
+def parse_workbook(name, content, all_sheets=False):
+    """
+    Opens the workbook 'content' (bytes) once and parses its first sheet,
+    or every sheet when 'all_sheets' is set.
+    Returns a list of (name, sheet, DataFrame, seconds) tuples.
+    Top-level so it can run in a worker process.
+    """
+    results = []
+    with pd.ExcelFile(io.BytesIO(content)) as excel_data:
+        sheets = excel_data.sheet_names if all_sheets else excel_data.sheet_names[:1]
+        for sheet in sheets:
+            start = time.perf_counter()
+            df = excel_data.parse(sheet)
+            results.append((name, sheet, df, time.perf_counter() - start))
+    return results
+
+
+def reconcile_columns(frames):
+    """
+    Aligns column names across sheets before they are unioned:
+    names are stripped, required columns are matched case-insensitively to
+    their standard spelling and any other column keeps its first-seen spelling.
+    """
+    canonical = {col.lower(): col for col in REQUIRED_COLS}
+    reconciled = []
+    for df in frames:
+        df = df.copy()
+        df.columns = df.columns.astype(str).str.strip()
+        rename = {}
+        for col in df.columns:
+            standard = canonical.setdefault(col.lower(), col)
+            if standard != col:
+                rename[col] = standard
+        reconciled.append(df.rename(columns=rename))
+    return reconciled
+
+
+def load_workbooks(files, all_sheets=False, max_workers=None):
+    """
+    Loads several workbooks given as (name, bytes) pairs.
+    Workbooks are parsed concurrently in a process pool (one task per workbook,
+    so each is opened once); a single workbook is parsed in-process.
+    Returns (raw_data, timings) where 'timings' has one row per sheet with
+    its source file, row count and parse time in seconds.
+    """
+    files = list(files)
+    if len(files) <= 1:
+        parsed = [parse_workbook(name, content, all_sheets) for name, content in files]
+    else:
+        max_workers = max_workers or min(len(files), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(parse_workbook, name, content, all_sheets) for name, content in files]
+            parsed = [future.result() for future in futures]
+
+    sheets = [item for workbook in parsed for item in workbook]
+    timings = pd.DataFrame(
+        [(name, sheet, len(df), seconds) for name, sheet, df, seconds in sheets],
+        columns=["File", "Sheet", "Rows", "Seconds"]
+    )
+    frames = reconcile_columns([df for _, _, df, _ in sheets])
+    raw_data = pd.concat(frames, ignore_index=True, sort=False) if frames else pd.DataFrame()
+    return raw_data, timings
+
+
+def standard_columns(columns):
+    """
+    Strips column names and renames the ones matching a required column
+    (case-insensitive) to its standard spelling, e.g. 'penjualan ' -> 'Penjualan'.
+    """
+    canonical = {col.lower(): col for col in REQUIRED_COLS}
+    stripped = pd.Index(columns).astype(str).str.strip()
+    return [canonical.get(col.lower(), col) for col in stripped]
+
+
+def check_columns(raw_data):
+    """
+    Normalizes the column names (see standard_columns) and checks for the required columns.
+    Raises ValueError if a required column is missing.
+    """
+    raw_data.columns = standard_columns(raw_data.columns)
+    if not all(col in raw_data.columns for col in REQUIRED_COLS):
+        raise ValueError(f"The uploaded sheet must contain the following columns: {REQUIRED_COLS}")
+    return raw_data
+
+
+def convert_numeric(raw_data):
+    """
+    Parses the numeric columns, drops rows where any of them is invalid
+    and adds 'Margin %'.
+    """
+    for col in NUMERIC_COLS:
+        # Remove thousand separators '.' and replace decimal ',' with '.' if necessary
+        raw_data[col] = raw_data[col].astype(str).str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+        raw_data[col] = pd.to_numeric(raw_data[col], errors='coerce')
+
+    # Drop rows with invalid numeric values
+    raw_data.dropna(subset=NUMERIC_COLS, inplace=True)
+
+    # Calculate Margin %
+    raw_data['Margin %'] = (raw_data['Gross Margin'] / raw_data['Penjualan']) * 100
+    return raw_data
+
+
+def parse_dates(raw_data):
+    """
+    Builds the 'Date' column from 'year' and 'Month' (full or abbreviated
+    month names), drops rows without a valid date and sorts by Date.
+    """
+    try:
+        raw_data['Date'] = pd.to_datetime(raw_data['year'].astype(int).astype(str) + '-' + raw_data['Month'],
+                                          format='%Y-%B', errors='coerce')
+        # If parsing failed (all NaT), try abbreviated month names
+        if raw_data['Date'].isna().all():
+            raw_data['Date'] = pd.to_datetime(raw_data['year'].astype(int).astype(str) + '-' + raw_data['Month'],
+                                              format='%Y-%b', errors='coerce')
+    except Exception as e:
+        raise ValueError(f"Error parsing dates: {e}")
+
+    # Drop rows with invalid Date
+    raw_data.dropna(subset=['Date'], inplace=True)
+
+    # Sort raw_data by Date (stable, so rows of a month keep the sheet order)
+    raw_data.sort_values('Date', kind="stable", inplace=True)
+    return raw_data
+
+
+def assign_divisions(raw_data):
+    """
+    Derives 'Group' when missing, combines GRC and FRS, keeps only DIVISIONS
+    and adds 'Month_Display'.
+    """
+    # If a Group column isn't present, derive it (e.g., first 3 chars of Grouping)
+    if 'Group' not in raw_data.columns:
+        raw_data['Group'] = raw_data['Grouping'].astype(str).str[:3].str.upper()
+
+    # Combine GRC and FRS into GRC+FRS
+    raw_data['Group'] = raw_data['Group'].replace({'GRC': 'GRC+FRS', 'FRS': 'GRC+FRS'})
+    # Filter only GRC+FRS and BZR
+    raw_data = raw_data[raw_data['Group'].isin(DIVISIONS)].copy()
+
+    # Create a Month_Display column
+    raw_data['Month_Display'] = raw_data['Date'].dt.strftime('%b %Y')
+    return raw_data
+
+
+def clean_sales_data(raw_data):
+    """
+    Takes the raw sheet and returns the cleaned rows used by every tab:
+      - numeric columns parsed (thousand separators removed),
+      - 'Margin %', 'Date' and 'Month_Display' columns added,
+      - 'Group' derived when missing, GRC/FRS combined and only DIVISIONS kept.
+    Raises ValueError if a required column is missing.
+    """
+    with profiling.span("check_columns"):
+        raw_data = check_columns(raw_data)
+    with profiling.span("numeric_cleanup"):
+        raw_data = convert_numeric(raw_data)
+    with profiling.span("date_parse"):
+        raw_data = parse_dates(raw_data)
+    with profiling.span("assign_divisions"):
+        return assign_divisions(raw_data)
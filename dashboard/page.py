@@ -0,0 +1,1327 @@
+"""
+Body of the Streamlit dashboard, run by streamlit_dashboard.py on every rerun.
+
+Only streamlit is imported up front so the page shell paints immediately;
+pandas, plotly and the analysis modules are imported inside render() once
+there is data to show.
+"""
+import hashlib
+from datetime import datetime
+
+import streamlit as st
+
+from dashboard import profiling
+
+
+def filter_options(raw_data):
+    """
+    Values offered by the sidebar filters ('Group', 'year', 'Store Name',
+    'Grouping', 'Month' -> sorted values) for in-memory data.
+    """
+    options = {col: sorted(raw_data[col].dropna().unique()) for col in ['Group', 'year', 'Store Name', 'Grouping']}
+    options['Month'] = sorted(raw_data['Month'].dropna().unique(), key=lambda x: datetime.strptime(x, '%B').month)
+    return options
+
+
+def default_filters(filter_values):
+    """
+    The sidebar's default selection: everything, and the first Grouping.
+    """
+    return {
+        'groups': filter_values['Group'],
+        'years': filter_values['year'],
+        'months': filter_values['Month'],
+        'stores': filter_values['Store Name'],
+        'categories': filter_values['Grouping'][:1],
+    }
+
+
+def cache_keys(dataset_key, groups, years, months, stores, categories):
+    """
+    Returns (filter_key, grouping_filter_key, period_key): the keys of the values
+    cached for a selection. The period comparisons and the forecast only depend
+    on the divisions and stores.
+    """
+    filter_key = (dataset_key, tuple(groups), tuple(years), tuple(months), tuple(stores))
+    return filter_key, filter_key + (tuple(categories),), (dataset_key, tuple(groups), tuple(stores))
+
+
+def render():
+    """
+    Renders the data source selection, the filters and every tab.
+    """
+    # Stage timings for this rerun (peak memory only when an admin asks for it)
+    show_profiling = profiling.is_admin(st.query_params)
+    track_memory = show_profiling and st.sidebar.checkbox("Track peak memory per stage", value=False,
+                                                          key='profile_memory')
+    # Finished (and memory tracking released) however the rerun ends, e.g. by st.stop()
+    with profiling.profiled(track_memory=track_memory) as profile:
+        _render_page(profile, show_profiling)
+
+
+def _render_page(profile, show_profiling):
+    """
+    The body of render(), run under the rerun's profile.
+    """
+    dataset_key = None
+
+    # Choose where the data comes from
+    data_source = st.radio(
+        "Data source:",
+        options=["Upload workbook", "Stored history"],
+        horizontal=True,
+        help="Upload a full workbook, or work on the stored history and append new months to it."
+    )
+
+    uploaded_files = []
+    stored_aggregates = None
+    out_of_core = False
+
+    if data_source == "Upload workbook":
+        # File uploader in the main area (one workbook, or one per region)
+        uploaded_files = st.file_uploader("Upload your Sales Data file(s) (Excel format)", type=["xlsx"],
+                                          accept_multiple_files=True)
+        read_all_sheets = st.checkbox("Read all sheets of each workbook", value=False, key='read_all_sheets',
+                                      help="By default only the first sheet of each workbook is read.")
+    else:
+        from dashboard import history, loading, validation
+
+        with st.expander("Append a new month to the stored history", expanded=history.read_manifest() is None):
+            new_month_file = st.file_uploader("Upload the new month's sheet (Excel format)", type=["xlsx"],
+                                              key='append_file')
+            replace_months = st.checkbox("Replace months that are already stored", value=False, key='append_replace',
+                                         help="Replaces the stored rows of the stores in the sheet; other "
+                                              "stores' rows of those months are kept.")
+            allow_new_stores = st.checkbox("Allow stores not seen in the stored history", value=False,
+                                           key='append_new_stores')
+            if new_month_file is not None and st.button("Append to History"):
+                try:
+                    with st.spinner('Validating and appending the new month...'):
+                        new_sheet = loading.read_sales_workbook(new_month_file)
+                        stored = history.read_manifest()
+                        quality_summary, quality_samples = validation.validate(
+                            new_sheet, known_stores=stored["stores"] if stored else None
+                        )
+                        if quality_samples:
+                            validation.show_report(st, quality_summary, quality_samples, in_expander=False)
+                        new_rows = loading.clean_sales_data(new_sheet)
+                        manifest = history.append_month(new_rows, replace=replace_months,
+                                                        allow_new_stores=allow_new_stores)
+                    st.success(f"Appended {len(new_rows):,} rows. "
+                               f"The stored history now covers {len(manifest['partitions'])} months.")
+                except ValueError as e:
+                    st.error(f"Could not append the new month: {e}")
+
+        out_of_core = st.checkbox(
+            "Query the history out of core", value=history.OUT_OF_CORE, key='history_out_of_core',
+            help="Read only the months, stores and divisions selected in the filters instead of loading "
+                 "the whole history into memory."
+        )
+
+    history_available = data_source == "Stored history" and history.read_manifest() is not None
+
+    if uploaded_files or history_available:
+        # The analysis and chart modules (pandas, plotly) are only imported once there is data to show
+        with profiling.span("import"):
+            import numpy as np
+            import pandas as pd
+            import plotly.express as px
+
+            import db
+            import versions
+            from dashboard import (aggregates, backends, charts, comparison, exports, forecast, history, inventory,
+                                   loading, ranking, stock, timeseries, validation, warmup)
+
+            # Drops outdated cache entries and warms the default view after imports (once per process)
+            warmup.start()
+
+        try:
+            # Load and process data
+            with st.spinner('Loading and processing data...'):
+                if uploaded_files:
+                    # Fingerprint of the upload(s), used to key cached figures
+                    upload_hash = hashlib.md5()
+                    for file in uploaded_files:
+                        upload_hash.update(file.getvalue())
+                    dataset_key = (upload_hash.hexdigest(), read_all_sheets)
+
+                    with profiling.span("read"):
+                        raw_data, load_timings = loading.load_workbooks(
+                            [(file.name, file.getvalue()) for file in uploaded_files], all_sheets=read_all_sheets
+                        )
+                    with profiling.span("validate"):
+                        # Checked before cleaning, which drops or rejects the rows it can't read
+                        manifest = history.read_manifest()
+                        quality_summary, quality_samples = validation.cached_validate(
+                            dataset_key, raw_data, known_stores=manifest["stores"] if manifest else None,
+                            sheets=load_timings
+                        )
+                    with profiling.span("clean"):
+                        raw_data = backends.clean(raw_data)
+                else:
+                    with profiling.span("read_history"):
+                        if out_of_core:
+                            # Only the filter values are read here; rows are read per selection below
+                            dataset_key, filter_values = history.cached_filter_options()
+                        else:
+                            dataset_key, raw_data, stored_aggregates = history.load_cached()
+
+                if not out_of_core:
+                    filter_values = filter_options(raw_data)
+
+            st.success('Data loaded and processed successfully!')
+            if uploaded_files:
+                validation.show_report(st, quality_summary, quality_samples)
+            if uploaded_files and len(load_timings) > 1:
+                with st.expander("Load timings per sheet"):
+                    st.dataframe(load_timings.style.format({'Rows': "{:,}", 'Seconds': "{:.2f}"}))
+
+            # Sidebar Filters (dashboard/warmup.py precomputes the default selection's values)
+            defaults = default_filters(filter_values)
+            st.sidebar.header("Filters")
+            with st.sidebar.expander("General Filters", expanded=True):
+                # Divisions Filter (Now only GRC+FRS and BZR)
+                selected_groups = st.multiselect(
+                    "Select Divisions (GRC+FRS, BZR):",
+                    options=filter_values['Group'],
+                    default=defaults['groups'],
+                    help="Choose one or more divisions to filter the sales data accordingly."
+                )
+
+                # Years Filter
+                selected_years = st.multiselect(
+                    "Select Years:",
+                    options=filter_values['year'],
+                    default=defaults['years'],
+                    help="Select the years you want to include in the analysis."
+                )
+
+                # Months Filter
+                selected_months = st.multiselect(
+                    "Select Months:",
+                    options=filter_values['Month'],
+                    default=defaults['months'],  # By default, all months are selected
+                    help="Filter the data by selecting specific months."
+                )
+
+                # Stores Filter
+                selected_stores = st.multiselect(
+                    "Select Stores:",
+                    options=filter_values['Store Name'],
+                    default=defaults['stores'],
+                    help="Choose the stores you want to include in the dashboard."
+                )
+
+            with st.sidebar.expander("Grouping Filters", expanded=True):
+                selected_categories = st.multiselect(
+                    "Search and Compare Grouping:",
+                    options=filter_values['Grouping'],
+                    default=defaults['categories'],
+                    help="Select one or more 'Grouping' categories to compare their sales performance."
+                )
+
+            # Cache keys for figures built from the filtered data
+            filter_key, grouping_filter_key, period_key = cache_keys(
+                dataset_key, selected_groups, selected_years, selected_months, selected_stores, selected_categories
+            )
+
+            # Apply General Filters
+            with profiling.span("filter"):
+                # Both results are sorted by Date
+                if out_of_core:
+                    # Partition pruning on year/month, pushdown of the store/division/Grouping filters
+                    filtered_data = history.cached_read_filtered(
+                        filter_key, years=selected_years, months=selected_months, stores=selected_stores,
+                        groups=selected_groups
+                    )
+                    kelompok_data = history.cached_read_filtered(
+                        grouping_filter_key, years=selected_years, months=selected_months,
+                        stores=selected_stores, categories=selected_categories
+                    )
+                else:
+                    filtered_data = backends.filter_rows(raw_data, {
+                        'Group': selected_groups,
+                        'year': selected_years,
+                        'Month': selected_months,
+                        'Store Name': selected_stores,
+                    })
+
+                    # Apply Grouping Filters
+                    kelompok_data = backends.filter_rows(raw_data, {
+                        'Grouping': selected_categories,
+                        'year': selected_years,
+                        'Month': selected_months,
+                        'Store Name': selected_stores,
+                    })
+
+            if filtered_data.empty:
+                st.warning("No data available after applying the selected filters.")
+            else:
+                with profiling.span("aggregates"):
+                    # Aggregations
+                    if out_of_core:
+                        # Stored per-month aggregates of the selection only. The period comparisons and
+                        # the forecast get every month of the selected divisions and stores
+                        monthly_agg = history.cached_read_aggregates(
+                            filter_key, years=selected_years, months=selected_months, stores=selected_stores,
+                            groups=selected_groups
+                        )
+                        dataset_aggregates = period_aggregates = history.cached_read_aggregates(
+                            period_key, stores=selected_stores, groups=selected_groups
+                        )
+                        aggregates_key = period_key
+                    elif stored_aggregates is not None:
+                        # Stored history already keeps per-month aggregates; only select the filtered ones
+                        monthly_agg = aggregates.cached_selection(filter_key, stored_aggregates, selected_groups,
+                                                                  selected_stores, filtered_data['Date'].unique())
+                    else:
+                        monthly_agg = aggregates.cached_monthly_aggregates(filter_key, filtered_data)
+
+                    if not out_of_core:
+                        # Whole-dataset aggregates for the period comparisons and the forecast, which need
+                        # the months outside the year/month filters (previous year, full history)
+                        if stored_aggregates is not None:
+                            dataset_aggregates = stored_aggregates
+                        else:
+                            dataset_aggregates = aggregates.cached_monthly_aggregates((dataset_key, "all"), raw_data)
+                        aggregates_key = dataset_key
+                        period_aggregates = aggregates.cached_selection(
+                            period_key, dataset_aggregates, selected_groups, selected_stores,
+                            dataset_aggregates['Date'].unique()
+                        )
+                    group_sales = filtered_data.groupby(['Group', 'Date'])['Penjualan'].sum().reset_index()
+                    store_comparison = filtered_data.groupby(['Date', 'Store Name'])['Penjualan'].sum().reset_index()
+
+                    # Sort by date
+                    group_sales.sort_values('Date', inplace=True)
+                    store_comparison.sort_values('Date', inplace=True)
+
+                    # Add Month_Display for aggregated data
+                    group_sales['Month_Display'] = group_sales['Date'].dt.strftime('%b %Y')
+                    store_comparison['Month_Display'] = store_comparison['Date'].dt.strftime('%b %Y')
+
+                    if not kelompok_data.empty:
+                        kelompok_data['Date'] = pd.to_datetime(kelompok_data['Date'], errors='coerce')
+                        kelompok_data.dropna(subset=['Date'], inplace=True)
+                        kelompok_data.sort_values('Date', inplace=True)
+                        kelompok_data['Month_Display'] = kelompok_data['Date'].dt.strftime('%b %Y')
+
+                # Define a colorblind-friendly palette
+                color_palette = px.colors.qualitative.Safe
+
+                # Tables offered for export on this rerun (sheet name -> DataFrame), see export_table()
+                export_tables = {}
+
+                def export_download(name, tables, fmt, key, auto_start=True):
+                    """
+                    Download button for the 'fmt' export of 'tables'. Small exports are written right
+                    away; large ones (and auto_start=False) wait for a click and run in the background.
+                    """
+                    extension, mime = exports.FORMATS[fmt]
+                    small = sum(len(df) for df in tables.values()) <= exports.BACKGROUND_ROWS
+                    job = exports.request_export(tables, fmt, start=auto_start and small)
+                    failed = job is not None and job.done() and job.exception() is not None
+                    if job is None or failed:
+                        if st.button(f"Prepare {fmt} export of {name}", key=f"{key}_prepare"):
+                            job = exports.request_export(tables, fmt)
+                            failed = job.done() and job.exception() is not None
+                    if failed:
+                        st.error(f"The export failed: {job.exception()}")
+                    elif job is not None and job.done():
+                        with open(job.result(), 'rb') as fh:
+                            st.download_button(
+                                label=f"Download {name} as {fmt}",
+                                data=fh,
+                                file_name=name.lower().replace(' ', '_') + extension,
+                                mime=mime,
+                                key=f"{key}_download",
+                            )
+                    elif job is not None:
+                        st.info(f"Preparing the {fmt} export of {name} in the background...")
+                        st.button("Check again", key=f"{key}_refresh")
+
+                def export_table(name, table, key):
+                    """
+                    Export format choice and download button for one table, which is also offered
+                    in the sidebar's workbook export.
+                    """
+                    export_tables[name] = table
+                    col_format, col_download = st.columns([1, 3])
+                    with col_format:
+                        fmt = st.selectbox(f"Export {name} as:", options=list(exports.FORMATS), key=f"{key}_format")
+                    with col_download:
+                        export_download(name, {name: table}, fmt, key)
+
+                def period_comparison(column, label, value="Penjualan", value_label="Total Sales", data=None,
+                                      data_key=None, key=None):
+                    """
+                    Selectable period-over-period metric (YoY, rolling windows, YTD...) of 'value' per
+                    member of 'column', over the selected months, as a line chart and a table.
+                    'data' (cached under 'data_key') replaces the filtered whole-dataset aggregates.
+                    """
+                    period_metric = st.selectbox(
+                        f"{value_label} metric by {label}:", options=timeseries.METRICS, key=key,
+                        help="YoY, rolling windows and YTD use the months before the selected ones too."
+                    )
+                    if data is None:
+                        data, data_key = period_aggregates, period_key
+                    metrics = timeseries.cached_period_metrics(data_key, data, column, value)
+                    metrics = metrics[metrics['Date'].isin(filtered_data['Date'].unique())]
+                    metrics = metrics.assign(Month_Display=metrics['Date'].dt.strftime('%b %Y'))
+                    is_percent = period_metric in timeseries.PERCENT_METRICS
+
+                    def build_period_chart():
+                        period_chart = charts.line_chart(
+                            metrics.dropna(subset=[period_metric]),
+                            x='Month_Display',
+                            y=period_metric,
+                            color=column,
+                            title=f"{value_label}: {period_metric} by {label}",
+                            labels={'Month_Display': 'Month', column: label},
+                            color_discrete_sequence=color_palette
+                        )
+                        period_chart.update_traces(mode='lines+markers')
+                        period_chart.update_layout(xaxis_title='Month', yaxis_title=period_metric,
+                                                   legend_title=label, hovermode='x unified')
+                        value_format = "%{y:.2f}%" if is_percent else "%{y:,.0f}"
+                        period_chart.update_traces(hovertemplate=f"Month: %{{x}}<br>{period_metric}: {value_format}")
+                        return period_chart
+
+                    period_chart = charts.cached_figure(
+                        ('period_line', column, value, period_metric) + filter_key, build_period_chart
+                    )
+                    st.plotly_chart(period_chart, use_container_width=True)
+
+                    period_table = metrics.pivot_table(values=period_metric, index=column, columns='Month_Display',
+                                                       aggfunc='sum', dropna=False, sort=False)
+                    period_table = period_table[list(dict.fromkeys(metrics['Month_Display']))].reset_index()
+                    st.dataframe(period_table.style.format(
+                        {col: "{:.2f}%" if is_percent else "{:,.0f}" for col in period_table.columns if col != column},
+                        na_rep="N/A"
+                    ))
+
+                # Create Tabs
+                tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9, tab10, tab11 = st.tabs([
+                    "Group Sales Overview",
+                    "Store Comparison",
+                    "Detailed View per Category",
+                    "Grouping BarChart",
+                    "Grouping PieChart",
+                    "Sales Trend",
+                    "Top/Bottom Performers",
+                    "Gross Margin Analysis",
+                    "Stock Value Analysis",
+                    "Forecast",
+                    "ABC & Stock Cover"
+                ])
+
+                # -------------------- 1. Group Sales Overview (Tab 1) --------------------
+                with tab1, profiling.span("tab1_group_sales"):
+                    st.header("Detailed Group Sales by Month")
+                    st.markdown("""
+                        This section provides a detailed overview of sales by group for each month.
+                        You can toggle between viewing absolute sales figures, percentage differences, 
+                        and contributions to the grand total.
+                    """)
+
+                    if group_sales.empty:
+                        st.write("No Group Sales data available.")
+                    else:
+                        show_percentage = st.checkbox("Show Percentage Differences", value=False, key='group_pct')
+                        show_contribution = st.checkbox("Show Contribution to Grand Total", value=False,
+                                                        key='group_contribution')
+
+                        if show_contribution:
+                            group_blocks = ("Contribution",)
+                        elif show_percentage:
+                            group_blocks = ("Sales", "Difference", "Percent Change")
+                        else:
+                            group_blocks = ("Sales", "Difference")
+                        group_sales_combined = comparison.cached_comparison_table(
+                            ('group_sales',) + filter_key, monthly_agg, 'Group', blocks=group_blocks
+                        )
+
+                        def format_percentage_with_arrows(val):
+                            arrow = '↑' if val > 0 else '↓' if val < 0 else ''
+                            return f"{val:,.2f}% {arrow}"
+
+                        group_format = {
+                            col: "{:,.0f}" for block in ("Sales", "Difference")
+                            for col in comparison.block_columns(group_sales_combined, block)
+                        }
+                        group_format.update({
+                            col: format_percentage_with_arrows
+                            for col in comparison.block_columns(group_sales_combined, "Percent Change")
+                        })
+                        group_format.update({
+                            col: "{:.2f}%" for col in comparison.block_columns(group_sales_combined, "Contribution")
+                        })
+                        st.dataframe(group_sales_combined.style.format(group_format, na_rep=""))
+
+                        # Line chart for group sales
+                        if not group_sales.empty:
+                            st.subheader("Total Sales by Group Over Months")
+                            def build_group_sales_chart():
+                                fig = charts.line_chart(
+                                    group_sales,
+                                    x="Month_Display",
+                                    y="Penjualan",
+                                    color="Group",
+                                    title="Total Sales by Group Over Months",
+                                    labels={"Penjualan": "Total Sales", "Month_Display": "Month"},
+                                    color_discrete_sequence=px.colors.qualitative.Safe
+                                )
+
+                                fig.update_traces(mode='lines+markers')
+                                fig.update_layout(
+                                    xaxis_title='Month',
+                                    yaxis_title='Total Sales',
+                                    legend_title='Group',
+                                    hovermode='x unified'
+                                )
+                                fig.update_traces(
+                                    hovertemplate="Group: %{legendgroup}<br>Month: %{x}<br>Total Sales: %{y:,.0f}"
+                                )
+                                return fig
+
+                            fig = charts.cached_figure(('group_sales_line',) + filter_key, build_group_sales_chart)
+                            st.plotly_chart(fig, use_container_width=True)
+
+                        st.subheader("Period Comparisons by Group")
+                        period_comparison('Group', 'Group', key='group_period_metric')
+
+                # -------------------- 2. Store Comparison (Tab 2) --------------------
+                with tab2, profiling.span("tab2_store_comparison"):
+                    st.header("Month-to-Month Comparison Between Stores")
+                    st.markdown("""
+                        Compare sales performance across different stores on a monthly basis.
+                        This visualization helps in identifying top-performing stores and tracking their growth.
+                    """)
+
+                    if store_comparison.empty or 'Month_Display' not in store_comparison.columns:
+                        st.write("No Store Comparison data available.")
+                    else:
+                        # Bar chart for store comparison
+                        def build_store_chart():
+                            fig_store = charts.bar_chart(
+                                store_comparison,
+                                x="Month_Display",
+                                y="Penjualan",
+                                color="Store Name",
+                                barmode="group",
+                                title="Store Sales Comparison",
+                                labels={"Penjualan": "Total Sales", "Month_Display": "Month"},
+                                color_discrete_sequence=px.colors.qualitative.Safe
+                            )
+                            fig_store.update_traces(hovertemplate="Month: %{x}<br>Total Sales: %{y:,.0f}")
+                            fig_store.update_layout(
+                                xaxis_title='Month',
+                                yaxis_title='Total Sales',
+                                legend_title='Store Name',
+                                hovermode='x unified'
+                            )
+                            return fig_store
+
+                        fig_store = charts.cached_figure(('store_comparison_bar',) + filter_key, build_store_chart)
+                        st.plotly_chart(fig_store, use_container_width=True)
+
+                        # Checkbox to show the detailed data table
+                        show_table = st.checkbox("Show Detailed Data Table with Month-to-Month Changes", value=False,
+                                                 key='store_table')
+                        if show_table:
+                            st.subheader("Detailed Data with Month-to-Month Changes")
+
+                            # Month-to-month differences need at least two months
+                            store_blocks = ("Sales", "Difference") if monthly_agg['Date'].nunique() > 1 else ("Sales",)
+                            combined_store = comparison.cached_comparison_table(
+                                ('store_sales',) + filter_key, monthly_agg, 'Store Name', blocks=store_blocks
+                            )
+
+                            # Use Styler to format numbers with thousand separators
+                            format_dict = {
+                                col: "{:,.0f}" for block in store_blocks
+                                for col in comparison.block_columns(combined_store, block)
+                            }
+                            combined_store_style = combined_store.style.format(format_dict, na_rep="")
+
+                            # Display the styled DataFrame
+                            st.dataframe(combined_store_style)
+
+                        st.subheader("Period Comparisons by Store")
+                        period_comparison('Store Name', 'Store', key='store_period_metric')
+
+
+
+                # -------------------- 3. Detailed View per Category (Tab 3) --------------------
+                with tab3, profiling.span("tab3_detailed_view"):
+                    st.header("Month-to-Month Sales for All Grouping (Detailed View per Category)")
+                    st.markdown("""
+                        Dive deep into the sales data for each grouping across different stores and divisions.
+                        This detailed view allows for comprehensive analysis and comparison.
+                    """)
+
+                    if filtered_data.empty:
+                        st.write("No data available for Detailed View per Category.")
+                    else:
+                        # Change and Percent Change need at least two months
+                        detail_blocks = ("Sales",)
+                        if monthly_agg['Date'].nunique() > 1:
+                            detail_blocks += ("Difference", "Percent Change")
+                        detailed_combined_table = comparison.cached_comparison_table(
+                            ('detail_sales',) + filter_key, monthly_agg, ["Grouping", "Store Name", "Group"],
+                            blocks=detail_blocks, labels={"Difference": "Change"}, grand_total=False
+                        ).copy()
+
+                        # Calculate total sales for ranking
+                        sales_cols = comparison.block_columns(detailed_combined_table, "Sales")
+                        detailed_combined_table['Total Sales'] = detailed_combined_table[sales_cols].sum(axis=1)
+
+                        # Rank by group
+                        detailed_combined_table['Rank'] = detailed_combined_table.groupby('Group')['Total Sales'].rank(
+                            ascending=False, method='min')
+
+                        # Sort by Group and Rank
+                        detailed_combined_table.sort_values(['Group', 'Rank'], inplace=True)
+
+                        # Format numeric columns using Styler
+                        style_dict_detail = {col: "{:,.0f}" for col in detailed_combined_table.columns if
+                                             col.startswith('Sales_') or col.startswith('Change_') or
+                                             col == 'Total Sales'}
+                        style_dict_detail.update({
+                            col: "{:.2f}%" for col in detailed_combined_table.columns if col.startswith('Percent Change_')
+                        })
+                        style_dict_detail['Group'] = '{}'
+                        style_dict_detail['Store Name'] = '{}'
+
+                        detailed_combined_style = detailed_combined_table.style.format(style_dict_detail, na_rep="")
+
+                        st.dataframe(detailed_combined_style)
+                        export_table("Detailed View", detailed_combined_table, key='detail_export')
+
+                # -------------------- 4. Grouping BarChart (Tab 4) --------------------
+                with tab4, profiling.span("tab4_grouping_bar"):
+                    st.header("Grouping Comparison")
+                    st.markdown("""
+                        Compare sales performance across different 'Grouping' categories.
+                        Visualizations adjust based on the number of categories selected.
+                    """)
+
+                    if kelompok_data.empty or 'Month_Display' not in kelompok_data.columns:
+                        st.write("No data available for the selected Grouping.")
+                    else:
+                        if len(selected_categories) == 1:
+                            single_cat = selected_categories[0]
+                            st.subheader(f"Sales Comparison for {single_cat}")
+
+                            comparison_chart = px.bar(
+                                kelompok_data,
+                                x="Month_Display",
+                                y="Penjualan",
+                                color="Store Name",
+                                barmode="group",
+                                title=f"Sales Comparison for {single_cat}",
+                                labels={"Penjualan": "Total Sales", "Month_Display": "Month", "Store Name": "Store"},
+                                color_discrete_sequence=color_palette
+                            )
+                            comparison_chart.update_traces(hovertemplate="Month: %{x}<br>Total Sales: %{y:,.0f}")
+                            comparison_chart.update_layout(
+                                xaxis_title='Month',
+                                yaxis_title='Total Sales',
+                                legend_title='Store',
+                                hovermode='x unified'
+                            )
+                            st.plotly_chart(comparison_chart, use_container_width=True)
+                        else:
+                            st.subheader("Sales Comparison for Selected Grouping")
+
+                            comparison_chart = px.bar(
+                                kelompok_data,
+                                x="Month_Display",
+                                y="Penjualan",
+                                color="Store Name",
+                                barmode="group",
+                                facet_col="Grouping",
+                                facet_col_wrap=2,
+                                title="Sales Comparison for Selected Grouping",
+                                labels={"Penjualan": "Total Sales", "Month_Display": "Month", "Store Name": "Store",
+                                        "Grouping": "Grouping"},
+                                color_discrete_sequence=color_palette
+                            )
+                            comparison_chart.update_traces(hovertemplate="Month: %{x}<br>Total Sales: %{y:,.0f}")
+                            comparison_chart.update_layout(
+                                xaxis_title='Month',
+                                yaxis_title='Total Sales',
+                                legend_title='Store',
+                                hovermode='x unified',
+                                title_font_size=20,
+                                height=600
+                            )
+                            st.plotly_chart(comparison_chart, use_container_width=True)
+
+                # -------------------- 5. Grouping PieChart (Tab 5) --------------------
+                with tab5, profiling.span("tab5_grouping_pie"):
+                    st.header("Comparison of Grouping by PieChart")
+                    st.markdown("""
+                        Visualize the sales distribution of selected 'Grouping' across different stores using a pie chart.
+                    """)
+
+                    if kelompok_data.empty:
+                        st.write("No data available for the selected Grouping.")
+                    else:
+                        pie_chart = px.pie(
+                            kelompok_data,
+                            names="Store Name",
+                            values="Penjualan",
+                            title="Sales Distribution for Selected Grouping",
+                            color_discrete_sequence=color_palette
+                        )
+                        pie_chart.update_traces(hovertemplate="Store: %{label}<br>Sales: %{value:,.0f} (%{percent})")
+                        st.plotly_chart(pie_chart, use_container_width=True)
+
+                # -------------------- 6. Sales Trend (Tab 6) --------------------
+                with tab6, profiling.span("tab6_sales_trend"):
+                    st.header("Sales Trend for Selected Grouping by Store")
+                    st.markdown("""
+                        Analyze the sales trends over time for selected 'Grouping' across different stores.
+                        Faceted line charts provide a clear view of each category's performance.
+                    """)
+
+                    if kelompok_data.empty or 'Month_Display' not in kelompok_data.columns:
+                        st.write("No data available for the selected Grouping.")
+                    else:
+                        trend_data = kelompok_data.groupby(['Date', 'Store Name', 'Grouping'])['Penjualan'].sum().reset_index()
+                        trend_data.sort_values('Date', inplace=True)
+                        if not trend_data.empty:
+                            trend_data['Month_Display'] = trend_data['Date'].dt.strftime('%b %Y')
+
+                        if trend_data.empty or 'Month_Display' not in trend_data.columns:
+                            st.write("No data to display for trend.")
+                        else:
+                            def build_trend_chart():
+                                trend_chart = charts.line_chart(
+                                    trend_data,
+                                    x='Month_Display',
+                                    y='Penjualan',
+                                    color='Store Name',
+                                    facet_col='Grouping',
+                                    facet_col_wrap=2,
+                                    title='Sales Trend for Selected Grouping by Store',
+                                    labels={'Penjualan': 'Total Sales', 'Month_Display': 'Month', 'Store Name': 'Store', 'Grouping': 'Grouping'},
+                                    color_discrete_sequence=color_palette
+                                )
+
+                                # Add markers to the trend chart
+                                trend_chart.update_traces(mode='lines+markers')
+
+                                trend_chart.update_layout(
+                                    xaxis_title='Month',
+                                    yaxis_title='Total Sales',
+                                    legend_title='Store',
+                                    title_font_size=20,
+                                    hovermode='x unified',
+                                    height=600
+                                )
+
+                                trend_chart.update_traces(
+                                    hovertemplate="Month: %{x}<br>Total Sales: %{y:,.0f}<br>Grouping: %{legendgroup}"
+                                )
+                                return trend_chart
+
+                            trend_chart = charts.cached_figure(('sales_trend_line',) + grouping_filter_key,
+                                                               build_trend_chart)
+
+                            st.plotly_chart(trend_chart, use_container_width=True)
+
+                # -------------------- 7. Top/Bottom Performers (Tab 7) --------------------
+                with tab7, profiling.span("tab7_top_bottom"):
+                    st.header("Top/Bottom Performers")
+                    st.markdown("""
+                        Identify the top 10 and bottom 10 performers based on the selected metric.
+                        This helps in recognizing high-performing categories and those that may need attention.
+                    """)
+
+                    rank_col1, rank_col2 = st.columns(2)
+                    rank_dimension = rank_col1.selectbox(
+                        "Rank by:",
+                        options=list(ranking.DIMENSIONS),
+                        key='rank_dimension',
+                        help="Choose whether to rank Grouping, Stores or Divisions."
+                    )
+                    rank_metric = rank_col2.selectbox(
+                        "Metric:",
+                        options=ranking.METRICS,
+                        key='rank_metric',
+                        help="Choose the metric used for ranking."
+                    )
+
+                    top_performers, bottom_performers = ranking.cached_top_bottom(
+                        filter_key, monthly_agg, rank_dimension, rank_metric, n=10
+                    )
+                    rank_format = "{:.2f}%" if rank_metric == "Margin %" else \
+                        "{:.2f}" if rank_metric == "Stock-to-Sales Ratio" else "{:,.0f}"
+
+                    st.subheader(f"Top 10 {rank_dimension}")
+                    # Use Styler for formatting
+                    top_performers_style = top_performers.style.format({
+                        rank_metric: rank_format
+                    })
+                    st.dataframe(top_performers_style)
+
+                    st.subheader(f"Bottom 10 {rank_dimension}")
+                    if bottom_performers.empty:
+                        st.write("No bottom performers with non-zero values.")
+                    else:
+                        # Use Styler for formatting
+                        bottom_performers_style = bottom_performers.style.format({
+                            rank_metric: rank_format
+                        })
+                        st.dataframe(bottom_performers_style)
+
+                # -------------------- 8. Gross Margin Analysis (Tab 8) --------------------
+                with tab8, profiling.span("tab8_gross_margin"):
+                    st.header("Gross Margin Analysis")
+                    st.markdown("""
+                        Analyze the gross margin to understand profitability across divisions and stores.
+                        This section includes total gross margin, average margin percentage, and growth rates.
+                    """)
+
+                    # Recalculate Gross Margin to ensure correctness
+                    filtered_data['Gross Margin'] = filtered_data['Penjualan'] - filtered_data['HPP']
+
+                    # Combine 'GRC' and 'FRS' into 'GRC+FRS' if not already combined
+                    filtered_data['Group'] = filtered_data['Group'].replace({'GRC': 'GRC+FRS', 'FRS': 'GRC+FRS'})
+
+                    # Total Gross Margin and Correct Average Margin %
+                    if not filtered_data.empty:
+                        total_gross_margin = filtered_data['Gross Margin'].sum()
+                        total_penjualan = filtered_data['Penjualan'].sum()
+                        avg_margin_percent = (total_gross_margin / total_penjualan) * 100 if total_penjualan != 0 else 0
+                    else:
+                        total_gross_margin = 0
+                        avg_margin_percent = 0
+
+                    # Display Metrics
+                    col1, col2 = st.columns(2)
+                    col1.metric("Total Gross Margin", f"{total_gross_margin:,.0f}")
+                    col2.metric("Average Margin %", f"{avg_margin_percent:.2f}%")
+
+                    # Additional KPIs: Gross Margin growth of the latest selected month
+                    # (Gross Margin recalculated from Penjualan - HPP, as above)
+                    gm_aggregates = period_aggregates.assign(
+                        **{'Gross Margin': period_aggregates['Penjualan'] - period_aggregates['HPP']})
+                    gm_key = period_key + ('Penjualan - HPP',)
+                    gm_total = timeseries.cached_period_metrics(gm_key, gm_aggregates, None, 'Gross Margin')
+                    gm_latest = timeseries.latest(gm_total, filtered_data['Date'].unique())
+
+                    col1, col2, col3 = st.columns(3)
+                    for col, title, metric in [
+                        (col1, "Gross Margin Growth Rate", "MoM %"),
+                        (col2, "Gross Margin YoY Growth", "YoY %"),
+                        (col3, "Gross Margin YTD vs Prior Year", "YTD vs Prior Year %"),
+                    ]:
+                        growth = gm_latest[metric].iloc[0] if not gm_latest.empty else np.nan
+                        if not np.isnan(growth):
+                            col.metric(title, f"{growth:.2f}%", delta=f"{growth:.2f}%")
+                        else:
+                            col.metric(title, "N/A", delta="N/A")
+
+                    st.subheader("Gross Margin Period Comparisons by Division")
+                    period_comparison('Group', 'Division', value='Gross Margin', value_label='Gross Margin',
+                                      data=gm_aggregates, data_key=gm_key, key='gm_period_metric')
+
+                    # Gross Margin Percentage by Division
+                    st.subheader("Gross Margin Percentage by Division")
+                    gm_by_division = filtered_data.groupby('Group').agg(
+                        {'Gross Margin': 'sum', 'Penjualan': 'sum'}).reset_index()
+                    gm_by_division['Gross Margin %'] = (gm_by_division['Gross Margin'] / gm_by_division['Penjualan']) * 100
+                    gm_by_division['Gross Margin %'] = gm_by_division['Gross Margin %'].fillna(0)  # Handle division by zero
+                    gm_by_division_sorted = gm_by_division.sort_values('Gross Margin %', ascending=False)
+
+                    fig_gm_division = px.bar(
+                        gm_by_division_sorted,
+                        x='Group',
+                        y='Gross Margin %',
+                        title="Gross Margin Percentage by Division",
+                        labels={'Group': 'Division', 'Gross Margin %': 'Gross Margin Percentage (%)'},
+                        color='Group',
+                        color_discrete_sequence=color_palette
+                    )
+                    fig_gm_division.update_traces(hovertemplate="Division: %{x}<br>Gross Margin %: %{y:.2f}%")
+                    fig_gm_division.update_layout(
+                        xaxis_title='Division',
+                        yaxis_title='Gross Margin Percentage (%)',
+                        legend_title='Division',
+                        hovermode='x unified'
+                    )
+                    st.plotly_chart(fig_gm_division, use_container_width=True)
+
+                    # Gross Margin Percentage by Store
+                    st.subheader("Gross Margin Percentage by Store")
+                    gm_by_store = filtered_data.groupby('Store Name').agg(
+                        {'Gross Margin': 'sum', 'Penjualan': 'sum'}).reset_index()
+                    gm_by_store['Gross Margin %'] = (gm_by_store['Gross Margin'] / gm_by_store['Penjualan']) * 100
+                    gm_by_store['Gross Margin %'] = gm_by_store['Gross Margin %'].fillna(0)  # Handle division by zero
+                    gm_by_store_sorted = gm_by_store.sort_values('Gross Margin %', ascending=False)
+
+                    fig_gm_store = px.bar(
+                        gm_by_store_sorted,
+                        x='Store Name',
+                        y='Gross Margin %',
+                        title="Gross Margin Percentage by Store",
+                        labels={'Store Name': 'Store', 'Gross Margin %': 'Gross Margin Percentage (%)'},
+                        color='Store Name',
+                        color_discrete_sequence=color_palette
+                    )
+                    fig_gm_store.update_traces(hovertemplate="Store: %{x}<br>Gross Margin %: %{y:.2f}%")
+                    fig_gm_store.update_layout(
+                        xaxis_title='Store',
+                        yaxis_title='Gross Margin Percentage (%)',
+                        legend_title='Store',
+                        hovermode='x unified'
+                    )
+                    st.plotly_chart(fig_gm_store, use_container_width=True)
+
+                    # Detailed Gross Margin Data by Store and Grouping
+                    st.markdown("---")  # Separator for better UI
+                    show_detailed_store_table = st.checkbox(
+                        "Show Detailed Gross Margin Data by Store and Grouping",
+                        help="View detailed gross margin metrics categorized by each store and product group."
+                    )
+
+                    if show_detailed_store_table:
+                        st.subheader("Detailed Gross Margin Data by Store and Grouping")
+                        detailed_gm_store = filtered_data.groupby(['Store Name', 'Grouping']).agg(
+                            {
+                                'Gross Margin': 'sum',
+                                'Penjualan': 'sum'
+                            }
+                        ).reset_index()
+
+                        detailed_gm_store['Gross Margin %'] = (detailed_gm_store['Gross Margin'] / detailed_gm_store['Penjualan']) * 100
+                        detailed_gm_store['Gross Margin %'] = detailed_gm_store['Gross Margin %'].fillna(0)
+
+                        detailed_gm_store.rename(columns={
+                            'Store Name': 'Store Name',
+                            'Grouping': 'Grouping',
+                            'Gross Margin': 'Gross Margin Value',
+                            'Gross Margin %': 'Gross Margin Percentage (%)'
+                        }, inplace=True)
+
+                        # Use Styler for formatting
+                        detailed_gm_store['Gross Margin Value'] = detailed_gm_store['Gross Margin Value']
+                        detailed_gm_store['Gross Margin Percentage (%)'] = detailed_gm_store['Gross Margin Percentage (%)']
+
+                        detailed_gm_store = detailed_gm_store.sort_values(by=['Gross Margin Value'], ascending=False)
+
+                        detailed_gm_store_style = detailed_gm_store.style.format({
+                            'Gross Margin Value': "{:,.0f}",
+                            'Gross Margin Percentage (%)': "{:.2f}%"
+                        }).highlight_max(axis=0)
+
+                        st.dataframe(detailed_gm_store_style)
+                        export_table("Gross Margin by Store and Grouping", detailed_gm_store, key='gm_store_export')
+
+                    show_detailed_division_table = st.checkbox(
+                        "Show Detailed Gross Margin Data by Division, Store, Month, and Year",
+                        help="View detailed gross margin metrics categorized by Division, Store, Month, and Year."
+                    )
+
+                    if show_detailed_division_table:
+                        st.subheader("Detailed Gross Margin Data by Division, Store, Month, and Year")
+                        # Ensure relevant columns are numeric
+                        filtered_data['Gross Margin'] = pd.to_numeric(filtered_data['Gross Margin'], errors='coerce')
+                        filtered_data['Penjualan'] = pd.to_numeric(filtered_data['Penjualan'], errors='coerce')
+
+                        detailed_gm_division = filtered_data.groupby(['Group', 'Store Name', 'year', 'Month']).agg(
+                            {
+                                'Gross Margin': 'sum',
+                                'Penjualan': 'sum'
+                            }
+                        ).reset_index()
+
+                        detailed_gm_division['Gross Margin %'] = (detailed_gm_division['Gross Margin'] / detailed_gm_division['Penjualan']) * 100
+                        detailed_gm_division['Gross Margin %'] = detailed_gm_division['Gross Margin %'].fillna(0)
+
+                        detailed_gm_division.rename(columns={
+                            'Group': 'Division',
+                            'Store Name': 'Store Name',
+                            'year': 'Year',
+                            'Month': 'Month',
+                            'Gross Margin': 'Gross Margin Value',
+                            'Gross Margin %': 'Gross Margin Percentage (%)'
+                        }, inplace=True)
+
+                        # Use Styler for formatting
+                        detailed_gm_division['Gross Margin Value'] = detailed_gm_division['Gross Margin Value']
+                        detailed_gm_division['Gross Margin Percentage (%)'] = detailed_gm_division['Gross Margin Percentage (%)']
+
+                        detailed_gm_division = detailed_gm_division.sort_values(
+                            by=['Division', 'Store Name', 'Year', 'Month'],
+                            ascending=[True, True, True, True]
+                        )
+
+                        detailed_gm_division_style = detailed_gm_division.style.format({
+                            'Gross Margin Value': "{:,.0f}",
+                            'Gross Margin Percentage (%)': "{:.2f}%"
+                        }).highlight_max(axis=0)
+
+                        st.dataframe(detailed_gm_division_style)
+                        export_table("Gross Margin by Division and Month", detailed_gm_division,
+                                     key='gm_division_export')
+
+                # -------------------- 9. Stock Value Analysis (Tab 9) --------------------
+                with tab9, profiling.span("tab9_stock_value"):
+                    st.header("Stock Value Analysis")
+                    st.markdown("""
+                        Analyze the stock value data over time across different divisions and stores.
+                        This helps in understanding inventory value trends, top/bottom stock value categories, and more.
+                    """)
+
+                    if filtered_data.empty:
+                        st.write("No data available for Stock Value Analysis.")
+                    else:
+                        # -------------------- Stock Value Source --------------------
+                        stock_sources = ["Sales workbook"]
+                        if stock.snapshots_configured():
+                            stock_sources.append("SOH snapshots")
+                        stock_source = st.radio(
+                            "Stock Value source:",
+                            options=stock_sources,
+                            horizontal=True,
+                            key='stock_source',
+                            help="Use the Stock Value column of the sales data, or the month-end "
+                                 "stock-on-hand snapshots loaded by the SOH import."
+                        )
+
+                        stock_rows = filtered_data
+                        stock_dimension = 'Group'
+                        # Snapshot tables and charts are cached per snapshot version
+                        stock_key = stock_source
+                        if stock_source == "SOH snapshots":
+                            try:
+                                snapshots_version = warmup.dataset_version(versions.STOCK_SNAPSHOTS)
+                                stock_key = (stock_source, snapshots_version)
+                                soh_data = stock.cached_monthly_snapshots(db.get_engine(), snapshots_version)
+                                stock_rows = stock.select_snapshots(soh_data, selected_years, selected_months,
+                                                                    selected_stores)
+                                stock_dimension = 'Category'
+                            except Exception as e:
+                                st.error(f"Could not load SOH snapshots, using the sales data instead: {e}")
+                                stock_source = stock_key = "Sales workbook"
+
+                        # -------------------- Aggregate Stock Data --------------------
+                        st.subheader(f"Total Stock Value by {stock_dimension} Over Months")
+                        stock_data = stock_rows.groupby([stock_dimension, 'Date'])['Stock Value'].sum().reset_index()
+                        stock_data['Month_Display'] = stock_data['Date'].dt.strftime('%b %Y')
+
+                        # -------------------- Line Chart of Stock Value Over Months by Group --------------------
+                        if not stock_data.empty:
+                            def build_stock_chart():
+                                fig_stock = charts.line_chart(
+                                    stock_data,
+                                    x="Month_Display",
+                                    y="Stock Value",
+                                    color=stock_dimension,
+                                    title=f"Total Stock Value by {stock_dimension} Over Months",
+                                    labels={"Stock Value": "Total Stock Value", "Month_Display": "Month"},
+                                    color_discrete_sequence=px.colors.qualitative.Safe
+                                )
+
+                                fig_stock.update_traces(mode='lines+markers')
+                                fig_stock.update_layout(
+                                    xaxis_title='Month',
+                                    yaxis_title='Stock Value',
+                                    legend_title=stock_dimension,
+                                    hovermode='x unified'
+                                )
+
+                                fig_stock.update_traces(
+                                    hovertemplate=stock_dimension + ": %{legendgroup}<br>Month: %{x}<br>Stock Value: %{y:,.0f}"
+                                )
+                                return fig_stock
+
+                            fig_stock = charts.cached_figure(('stock_value_line', stock_key) + filter_key,
+                                                             build_stock_chart)
+
+                            st.plotly_chart(fig_stock, use_container_width=True)
+
+                        # -------------------- Top/Bottom Stock Value Categories (Grouping) --------------------
+                        st.subheader("Top 10 Grouping by Average Stock Value")
+                        top_stock_avg, bottom_stock_avg = ranking.cached_top_bottom(
+                            filter_key, monthly_agg, "Grouping", "Average Stock Value", n=10
+                        )
+
+                        top_stock_avg_style = top_stock_avg.style.format({
+                            'Average Stock Value': "{:,.0f}"
+                        })
+                        st.dataframe(top_stock_avg_style)
+
+                        st.subheader("Bottom 10 Grouping by Average Stock Value")
+                        if bottom_stock_avg.empty:
+                            st.write("No bottom performers with non-zero average stock value.")
+                        else:
+                            bottom_stock_avg_style = bottom_stock_avg.style.format({
+                                'Average Stock Value': "{:,.0f}"
+                            })
+                            st.dataframe(bottom_stock_avg_style)
+
+                        # -------------------- Detailed Stock Value by Store and Month --------------------
+                        st.subheader("Detailed Stock Value by Store and Month")
+                        combined_store_stock = comparison.cached_comparison_table(
+                            ('store_stock', stock_key) + filter_key, stock_rows, 'Store Name', value='Stock Value',
+                            labels={"Sales": "Stock Value"}, grand_total=False
+                        ).fillna(0)
+
+                        combined_store_stock_style = combined_store_stock.style.format({
+                            **{col: "{:,.0f}" for col in combined_store_stock.columns if
+                               col.startswith('Stock Value_') or col.startswith('Difference_')},
+                            'Store Name': '{}'
+                        }).highlight_max(axis=0)
+                        st.dataframe(combined_store_stock_style)
+
+                        # -------------------- Compare Sales and Stock for Each Month --------------------
+                        st.subheader("Comparison of Sales and Stock Value by Month and Group")
+                        st.markdown("""
+                            This table allows you to compare both Sales and Stock Value side-by-side for each month, helping you understand
+                            how inventory levels relate to sales performance over time.
+                        """)
+
+                        comparison_basis = st.selectbox(
+                            "Select Comparison Basis:",
+                            options=["Division", "Store", "Grouping"],
+                            help="Choose whether to compare Sales and Stock Value by Division, Store, or Grouping."
+                        )
+
+                        grouping_col = (
+                            "Group" if comparison_basis == "Division"
+                            else "Store Name" if comparison_basis == "Store"
+                            else "Grouping"
+                        )
+
+                        # From the monthly aggregates, with months in Date order
+                        combined_sales_stock, all_months_compare = comparison.sales_stock_table(
+                            monthly_agg, grouping_col)
+
+                        combined_sales_stock_display = combined_sales_stock.copy()
+                        for month in all_months_compare:
+                            pct_col = f"Stock%_{month}"
+                            combined_sales_stock_display[pct_col] = combined_sales_stock_display[pct_col].apply(
+                                lambda x: f"{x:,.2f}%" if pd.notnull(x) else "N/A"
+                            )
+
+                        format_dict_sales_stock = {col: "{:,.0f}" for col in combined_sales_stock.columns if
+                                                   col.endswith('_Sales') or col.endswith('_Stock')}
+                        format_dict_sales_stock.update(
+                            {col: "{}" for col in combined_sales_stock.columns if col.startswith('Stock%_')})
+                        format_dict_sales_stock[grouping_col] = '{}'
+
+                        combined_sales_stock_style = combined_sales_stock_display.style.format(format_dict_sales_stock)
+
+                        st.dataframe(combined_sales_stock_style)
+
+                        # -------------------- Download Option for Comparison Table --------------------
+                        export_table("Sales Stock Comparison", combined_sales_stock, key='sales_stock_export')
+
+                # -------------------- 10. Forecast (Tab 10) --------------------
+                with tab10, profiling.span("tab10_forecast"):
+                    st.header("Sales & Stock Forecast")
+                    st.markdown("""
+                        Projections for the next months per Store and Grouping. Every combination is forecast
+                        from its full monthly history (the year and month filters don't apply); the store and
+                        division filters select which projections are shown.
+                    """)
+
+                    col_metric, col_method, col_horizon = st.columns(3)
+                    with col_metric:
+                        forecast_metric = st.selectbox(
+                            "Forecast:", options=forecast.METRICS, key='forecast_metric',
+                            format_func=lambda m: {"Penjualan": "Sales", "Stock Value": "Stock Value"}[m]
+                        )
+                    with col_method:
+                        forecast_method = st.selectbox(
+                            "Model:", options=forecast.METHODS, key='forecast_method',
+                            help="Auto picks, per Store and Grouping, the model that best forecast the last months."
+                        )
+                    with col_horizon:
+                        forecast_horizon = st.slider("Months ahead:", min_value=1, max_value=6, value=forecast.DEFAULT_HORIZON,
+                                                     key='forecast_horizon')
+
+                    # Forecasts are fitted on the whole dataset once per version (on the selected divisions
+                    # and stores out of core), then filtered
+                    projections = forecast.cached_forecast(aggregates_key, dataset_aggregates, forecast_metric,
+                                                           forecast_method, forecast_horizon)
+                    projections = projections[
+                        projections['Group'].isin(selected_groups) &
+                        projections['Store Name'].isin(selected_stores)
+                    ]
+
+                    if projections.empty:
+                        st.write("No data available to forecast.")
+                    else:
+                        metric_label = "Total Sales" if forecast_metric == "Penjualan" else "Stock Value"
+
+                        def build_forecast_chart():
+                            actual = dataset_aggregates[
+                                dataset_aggregates['Group'].isin(selected_groups) &
+                                dataset_aggregates['Store Name'].isin(selected_stores)
+                            ].groupby(['Group', 'Date'])[forecast_metric].sum().reset_index()
+                            actual['Type'] = "Actual"
+                            projected = projections.groupby(['Group', 'Date'])['Forecast'].sum().reset_index()
+                            projected = projected.rename(columns={'Forecast': forecast_metric})
+                            projected['Type'] = "Forecast"
+                            # Start the forecast line at the last actual month so the two lines connect
+                            last_actual = actual[actual['Date'] == actual['Date'].max()].assign(Type="Forecast")
+                            chart_data = pd.concat([actual, last_actual, projected]).sort_values('Date')
+                            chart_data['Month_Display'] = chart_data['Date'].dt.strftime('%b %Y')
+
+                            forecast_chart = charts.line_chart(
+                                chart_data,
+                                x='Month_Display',
+                                y=forecast_metric,
+                                color='Group',
+                                line_dash='Type',
+                                title=f'{metric_label} and {forecast_horizon}-Month Forecast by Division',
+                                labels={forecast_metric: metric_label, 'Month_Display': 'Month', 'Group': 'Division'},
+                                color_discrete_sequence=color_palette
+                            )
+                            forecast_chart.update_layout(
+                                xaxis_title='Month',
+                                yaxis_title=metric_label,
+                                title_font_size=20,
+                                hovermode='x unified'
+                            )
+                            forecast_chart.update_traces(hovertemplate=f"Month: %{{x}}<br>{metric_label}: %{{y:,.0f}}")
+                            return forecast_chart
+
+                        forecast_chart = charts.cached_figure(
+                            ('forecast_line', dataset_key, forecast_metric, forecast_method, forecast_horizon,
+                             tuple(selected_groups), tuple(selected_stores)),
+                            build_forecast_chart
+                        )
+                        st.plotly_chart(forecast_chart, use_container_width=True)
+
+                        # Projection table: one row per Store and Grouping, one column per future month
+                        st.subheader("Projections per Store and Grouping")
+                        projections = projections.assign(Month_Display=projections['Date'].dt.strftime('%b %Y'))
+                        forecast_table = projections.pivot_table(
+                            values='Forecast',
+                            index=['Store Name', 'Group', 'Grouping', 'Method'],
+                            columns='Month_Display',
+                            aggfunc='sum',
+                            sort=False
+                        )
+                        future_months = list(dict.fromkeys(projections.sort_values('Date')['Month_Display']))
+                        forecast_table = forecast_table[future_months]
+                        forecast_table[f'Total {forecast_horizon} Months'] = forecast_table.sum(axis=1)
+                        forecast_table = forecast_table.reset_index().sort_values(
+                            f'Total {forecast_horizon} Months', ascending=False)
+
+                        st.dataframe(
+                            forecast_table.style.format({col: "{:,.0f}" for col in forecast_table.columns
+                                                         if col not in ('Store Name', 'Group', 'Grouping', 'Method')}),
+                            use_container_width=True
+                        )
+
+                        export_table("Forecast Projections", forecast_table, key='forecast_export')
+
+                # -------------------- 11. ABC & Stock Cover (Tab 11) --------------------
+                with tab11, profiling.span("tab11_abc_stock_cover"):
+                    st.header("ABC Classification and Stock Cover")
+                    st.markdown(f"""
+                        Every Store and Grouping combination ranked by sales over the selected months.
+                        **A** combinations make up the first {inventory.ABC_THRESHOLDS[0]:.0f}% of sales,
+                        **B** the next {inventory.ABC_THRESHOLDS[1] - inventory.ABC_THRESHOLDS[0]:.0f}% and
+                        **C** the rest. Combinations with more than {inventory.SLOW_MOVER_WEEKS:.0f} weeks of
+                        stock cover (or stock without sales) are flagged as slow movers.
+                    """)
+
+                    abc_scope = st.radio(
+                        "Rank combinations:", options=["Across all stores", "Within each store"], horizontal=True,
+                        key='abc_scope'
+                    )
+                    abc_within = 'Store Name' if abc_scope == "Within each store" else None
+                    abc_table = inventory.cached_classify(filter_key, monthly_agg, abc_within)
+
+                    if abc_table.empty:
+                        st.write("No data available for the ABC classification.")
+                    else:
+                        abc_summary = inventory.summary(abc_table)
+                        col1, col2, col3 = st.columns(3)
+                        for col, (_, row) in zip((col1, col2, col3), abc_summary.iterrows()):
+                            col.metric(f"Class {row['ABC Class']}", f"{int(row['Combinations']):,} combinations",
+                                       delta=f"{row['Sales Share %']:.1f}% of sales", delta_color="off")
+
+                        st.dataframe(abc_summary.style.format({
+                            'Combinations': "{:,}", 'Penjualan': "{:,.0f}", 'Average Stock Value': "{:,.0f}",
+                            'Slow Movers': "{:,}", 'Sales Share %': "{:.2f}%"
+                        }))
+
+                        # Pareto curve over all combinations, downsampled to what a chart can show
+                        if abc_within is None:
+                            def build_pareto_chart():
+                                curve = abc_table[['Cumulative Share %', 'ABC Class']].assign(
+                                    Combinations=np.arange(1, len(abc_table) + 1))
+                                kept = charts.lttb_indices(curve['Cumulative Share %'].to_numpy(),
+                                                           charts.MAX_POINTS_PER_SERIES)
+                                pareto_chart = px.line(
+                                    curve.iloc[kept], x='Combinations', y='Cumulative Share %', color='ABC Class',
+                                    title="Cumulative Sales Share (Pareto)",
+                                    category_orders={'ABC Class': ['A', 'B', 'C']},
+                                    color_discrete_sequence=color_palette
+                                )
+                                pareto_chart.update_layout(xaxis_title='Store & Grouping combinations (by sales)',
+                                                           yaxis_title='Cumulative Sales Share (%)')
+                                return pareto_chart
+
+                            pareto_chart = charts.cached_figure(('pareto_line',) + filter_key, build_pareto_chart)
+                            st.plotly_chart(pareto_chart, use_container_width=True)
+
+                        show_classes = st.multiselect("Show classes:", options=["A", "B", "C"],
+                                                      default=["A", "B", "C"], key='abc_classes')
+                        slow_only = st.checkbox("Only slow movers", value=False, key='abc_slow_only')
+                        abc_view = abc_table[abc_table['ABC Class'].isin(show_classes)]
+                        if slow_only:
+                            abc_view = abc_view[abc_view['Slow Mover']]
+
+                        st.write(f"{len(abc_view):,} of {len(abc_table):,} combinations")
+                        st.dataframe(abc_view.style.format({
+                            'Penjualan': "{:,.0f}",
+                            'Average Stock Value': "{:,.0f}",
+                            'Sales Share %': "{:.2f}%",
+                            'Cumulative Share %': "{:.2f}%",
+                            'Stock-to-Sales Ratio': "{:.2f}",
+                            'Weeks of Cover': "{:,.1f}",
+                        }, na_rep="N/A"), use_container_width=True)
+
+                        export_table("ABC Classification", abc_view, key='abc_export')
+
+                # -------------------- Workbook export --------------------
+                if export_tables:
+                    with st.sidebar.expander("Export tables to Excel"):
+                        workbook_sheets = st.multiselect(
+                            "Tables (one sheet each):", options=list(export_tables), default=list(export_tables),
+                            key='workbook_sheets',
+                            help="Tables shown on the page with the current filters."
+                        )
+                        if workbook_sheets:
+                            export_download("Dashboard Tables", {name: export_tables[name] for name in workbook_sheets},
+                                            "Excel", key='workbook_export', auto_start=False)
+
+
+        except Exception as e:
+            st.error(f"An error occurred while processing the file: {e}")
+        finally:
+            # Also logged when the rerun is interrupted (a widget change or st.stop())
+            profile.log(data_source=data_source, dataset=dataset_key)
+
+        # -------------------- Stage timings --------------------
+        if show_profiling:
+            with st.sidebar.expander("Performance (this rerun)", expanded=True):
+                st.caption(f"Total: {profile.total_seconds * 1000:,.0f} ms")
+                st.dataframe(profile.to_frame().style.format(
+                    {"Start (ms)": "{:,.1f}", "Duration (ms)": "{:,.1f}", "Peak memory (MB)": "{:,.2f}"}, na_rep="-"))
+
+    elif data_source == "Stored history":
+        st.info("No stored history yet. Append a month above to get started.")
+    else:
+        st.info("Please upload an Excel file to proceed.")
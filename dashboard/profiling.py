@@ -0,0 +1,211 @@
+"""
+Stage-level timing instrumentation for the Streamlit dashboard.
+
+Each rerun starts a Profile; code wraps its stages in profiling.span("name"),
+which is a no-op when no profile is active (e.g. in benchmarks). Spans may be
+nested. With memory tracking on, every span also records its peak traced
+memory (tracemalloc). tracemalloc is process-wide, so peaks include
+allocations of other sessions rerunning at the same time, and tracking slows
+the rerun down; it is only switched on for the admin panel. Tracing is
+reference-counted across the profiles tracking memory: the last one to finish
+stops it, and profiled() makes sure a profile finishes even when the rerun is
+interrupted (Streamlit's rerun and st.stop() raise BaseExceptions).
+
+At the end of a rerun one structured (JSON) log line is written to the
+'dashboard.profiling' logger, for aggregation across reruns.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger("dashboard.profiling")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Admins open the dashboard with ?admin=<DASHBOARD_ADMIN_TOKEN>
+ADMIN_TOKEN = os.getenv("DASHBOARD_ADMIN_TOKEN")
+
+# Streamlit runs each session's script in its own thread
+_local = threading.local()
+
+# Profiles currently tracking memory, and whether tracing was started by them
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_owns_tracing = False
+
+
+def _acquire_tracing():
+    global _tracing_users, _owns_tracing
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _owns_tracing = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _owns_tracing
+    with _tracing_lock:
+        _tracing_users -= 1
+        # Tracing started by someone else (e.g. PYTHONTRACEMALLOC) is left alone
+        if _tracing_users == 0 and _owns_tracing:
+            tracemalloc.stop()
+            _owns_tracing = False
+
+
+class Profile:
+    """
+    Timings (and optionally peak memory) of the named stages of one rerun.
+    """
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.spans = []
+        self._stack = []
+        if track_memory:
+            _acquire_tracing()
+        self._start = time.perf_counter()
+        self.total_seconds = None
+
+    @contextmanager
+    def span(self, name):
+        record = {
+            "name": name,
+            "depth": len(self._stack),
+            "start": time.perf_counter() - self._start,
+            "seconds": None,
+            "peak_bytes": None,
+        }
+        self.spans.append(record)
+
+        base = 0
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # Fold the parent's peak so far into the parent before resetting
+            if self._stack:
+                self._stack[-1]["_peak"] = max(self._stack[-1]["_peak"], peak)
+            tracemalloc.reset_peak()
+            base = current
+        record["_peak"] = base
+        record["_base"] = base
+
+        self._stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            self._stack.pop()
+            if self.track_memory:
+                peak = max(record.pop("_peak"), tracemalloc.get_traced_memory()[1])
+                record["peak_bytes"] = peak - record.pop("_base")
+                if self._stack:
+                    self._stack[-1]["_peak"] = max(self._stack[-1]["_peak"], peak)
+                tracemalloc.reset_peak()
+            else:
+                record.pop("_peak")
+                record.pop("_base")
+
+    def finish(self):
+        """
+        Ends the rerun: releases memory tracking (stopped once no other profile
+        uses it) and returns the total rerun time in seconds.
+        """
+        if self.total_seconds is None:
+            self.total_seconds = time.perf_counter() - self._start
+            if self.track_memory:
+                _release_tracing()
+        return self.total_seconds
+
+    def to_frame(self):
+        """
+        One row per span, indented by nesting depth.
+        """
+        # Imported here so the page shell doesn't wait for pandas (see dashboard/page.py)
+        import pandas as pd
+
+        rows = [
+            {
+                "Stage": "  " * span["depth"] + span["name"],
+                "Start (ms)": span["start"] * 1000,
+                "Duration (ms)": (span["seconds"] or 0) * 1000,
+                "Peak memory (MB)": span["peak_bytes"] / 1e6 if span["peak_bytes"] is not None else None,
+            }
+            for span in self.spans
+        ]
+        return pd.DataFrame(rows, columns=["Stage", "Start (ms)", "Duration (ms)", "Peak memory (MB)"])
+
+    def log(self, **context):
+        """
+        Writes one JSON line describing the rerun to the 'dashboard.profiling' logger.
+        """
+        total = self.finish()
+        record = {
+            "event": "dashboard_rerun",
+            "total_ms": round(total * 1000, 1),
+            "spans": [
+                {
+                    "name": span["name"],
+                    "depth": span["depth"],
+                    "ms": round((span["seconds"] or 0) * 1000, 1),
+                    **({"peak_mb": round(span["peak_bytes"] / 1e6, 2)} if span["peak_bytes"] is not None else {}),
+                }
+                for span in self.spans
+            ],
+            **context,
+        }
+        logger.info(json.dumps(record, default=str))
+        return record
+
+
+def start(track_memory=False):
+    """
+    Starts the profile of the current rerun (replacing the previous one in this thread).
+    """
+    _local.profile = Profile(track_memory=track_memory)
+    return _local.profile
+
+
+@contextmanager
+def profiled(track_memory=False):
+    """
+    start() for the enclosed rerun, finished on the way out whatever ends the
+    rerun (including Streamlit's RerunException and StopException).
+    """
+    profile = start(track_memory=track_memory)
+    try:
+        yield profile
+    finally:
+        profile.finish()
+
+
+def current():
+    return getattr(_local, "profile", None)
+
+
+@contextmanager
+def span(name):
+    """
+    Times the enclosed block as stage 'name' of the current rerun, if one is being profiled.
+    """
+    profile = current()
+    if profile is None:
+        yield None
+        return
+    with profile.span(name) as record:
+        yield record
+
+
+def is_admin(query_params):
+    """
+    True when the page was opened with ?admin=<DASHBOARD_ADMIN_TOKEN>.
+    """
+    return bool(ADMIN_TOKEN) and query_params.get("admin") == ADMIN_TOKEN
@@ -0,0 +1,113 @@
+"""
+Top-N / Bottom-N ranking service.
+
+Works off the shared monthly aggregates (see dashboard/aggregates.py) and uses
+partial selection (numpy.argpartition) so only the N selected rows are sorted,
+not every Grouping or Store. Per-dimension metric tables and rankings are
+cached, so a rerun with unchanged filters does not recompute them.
+"""
+import numpy as np
+import pandas as pd
+
+from dashboard.aggregates import ROW_COUNT_COL
+from dashboard.cache import LRUCache
+
+# Display name -> column in the aggregates
+DIMENSIONS = {
+    "Grouping": "Grouping",
+    "Store": "Store Name",
+    "Division": "Group",
+}
+
+METRICS = [
+    "Penjualan",
+    "Gross Margin",
+    "Margin %",
+    "Average Stock Value",
+    "Stock-to-Sales Ratio",
+]
+
+_metric_cache = LRUCache(maxsize=32)
+_ranking_cache = LRUCache(maxsize=128)
+
+
+def metric_table(aggregates, dimension):
+    """
+    Rolls the monthly aggregates up to 'dimension' (a key of DIMENSIONS)
+    and derives every ranking metric.
+    """
+    column = DIMENSIONS[dimension]
+    totals = aggregates.groupby(column, observed=True)[
+        ["Penjualan", "Gross Margin", "Stock Value", ROW_COUNT_COL]
+    ].sum()
+
+    sales = totals["Penjualan"].to_numpy(dtype=float)
+    stock = totals["Stock Value"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin_pct = np.where(sales != 0, totals["Gross Margin"].to_numpy(dtype=float) / sales * 100, np.nan)
+        stock_to_sales = np.where(sales != 0, stock / sales, np.nan)
+
+    table = pd.DataFrame({
+        column: totals.index,
+        "Penjualan": sales,
+        "Gross Margin": totals["Gross Margin"].to_numpy(dtype=float),
+        "Margin %": margin_pct,
+        "Average Stock Value": stock / totals[ROW_COUNT_COL].to_numpy(),
+        "Stock-to-Sales Ratio": stock_to_sales,
+    })
+    return table
+
+
+def _select(values, n, largest):
+    """
+    Positions of the n largest (or smallest) values, best first.
+    Only the selected positions are sorted.
+    """
+    if n <= 0 or len(values) == 0:
+        return np.array([], dtype=np.int64)
+    if n < len(values):
+        if largest:
+            candidates = np.argpartition(values, len(values) - n)[len(values) - n:]
+        else:
+            candidates = np.argpartition(values, n - 1)[:n]
+    else:
+        candidates = np.arange(len(values))
+    # Stable order: by value, then by original position for ties
+    keys = -values[candidates] if largest else values[candidates]
+    return candidates[np.lexsort((candidates, keys))]
+
+
+def top_bottom(aggregates, dimension, metric, n=10):
+    """
+    Returns (top, bottom) DataFrames with the 'n' best and worst members of
+    'dimension' by 'metric'. Rows whose metric is missing are ignored and,
+    like the original tables, the bottom list only considers positive values.
+    """
+    table = metric_table(aggregates, dimension)
+    return _rank(table, DIMENSIONS[dimension], metric, n)
+
+
+def _rank(table, column, metric, n):
+    values = table[metric].to_numpy(dtype=float)
+    valid = np.flatnonzero(~np.isnan(values))
+    positive = valid[values[valid] > 0]
+
+    top_idx = valid[_select(values[valid], n, largest=True)]
+    bottom_idx = positive[_select(values[positive], n, largest=False)]
+
+    columns = [column, metric]
+    top = table.iloc[top_idx][columns].reset_index(drop=True)
+    bottom = table.iloc[bottom_idx][columns].reset_index(drop=True)
+    return top, bottom
+
+
+def cached_top_bottom(key, aggregates, dimension, metric, n=10):
+    """
+    top_bottom() cached under 'key' (dataset fingerprint + filters).
+    The per-dimension metric table is shared by every metric ranked on it.
+    """
+    def build():
+        table = _metric_cache.get_or_build(key + (dimension,), lambda: metric_table(aggregates, dimension))
+        return _rank(table, DIMENSIONS[dimension], metric, n)
+
+    return _ranking_cache.get_or_build(key + (dimension, metric, n), build)
@@ -0,0 +1,88 @@
+"""
+Stock-on-hand (SOH) snapshots for the Stock Value tab.
+
+scripts/soh_update.py loads the SOH exports into 'stock_snapshots' (joined with
+'products') and keeps a per-(store, date, category) 'stock_snapshot_summary'.
+The dashboard only reads that summary, taking each store's last snapshot of
+every month as the month's stock.
+"""
+import os
+
+import pandas as pd
+from sqlalchemy import text
+
+import versions
+from dashboard.cache import LRUCache
+from db import read_connection
+
+_snapshot_cache = LRUCache(maxsize=4)
+
+MONTHLY_SNAPSHOTS_SQL = """
+    SELECT s.store, s.snapshot_date, s.category, s.quantity, s.stock_value
+    FROM stock_snapshot_summary s
+    JOIN (
+        SELECT store, MAX(snapshot_date) AS snapshot_date
+        FROM stock_snapshot_summary
+        GROUP BY store, date_trunc('month', snapshot_date)
+    ) month_end
+      ON s.store = month_end.store AND s.snapshot_date = month_end.snapshot_date
+"""
+
+
+def snapshots_configured():
+    """
+    SOH snapshots are only available when a database is configured.
+    """
+    return bool(os.getenv("DATABASE_URL"))
+
+
+def load_monthly_snapshots(engine, version=None):
+    """
+    Returns month-end stock per store and category with the dashboard's
+    'Store Name', 'Category', 'Date', 'Month_Display', 'Quantity' and 'Stock Value' columns.
+    Reads from the read replica when there is one and it has replayed 'version'
+    (a key such as 'stock_snapshots-v12'), from the primary otherwise.
+    """
+    def is_fresh(conn):
+        current = versions.read_version(conn, versions.STOCK_SNAPSHOTS)
+        return version is None or versions.version_key(versions.STOCK_SNAPSHOTS, current) == version
+
+    with read_connection(engine, is_fresh) as conn:
+        df = pd.read_sql(text(MONTHLY_SNAPSHOTS_SQL), conn)
+
+    df = df.rename(columns={
+        "store": "Store Name",
+        "category": "Category",
+        "quantity": "Quantity",
+        "stock_value": "Stock Value",
+    })
+    df["Snapshot Date"] = pd.to_datetime(df.pop("snapshot_date"))
+    df["Date"] = df["Snapshot Date"].dt.to_period("M").dt.to_timestamp()
+    df["Month_Display"] = df["Date"].dt.strftime('%b %Y')
+    df[["Quantity", "Stock Value"]] = df[["Quantity", "Stock Value"]].astype(float)
+    return df.sort_values("Date", kind="stable")
+
+
+def select_snapshots(snapshots, years, months, stores):
+    """
+    The month-end snapshots of the selected years, month names and store names
+    (the sidebar filters). The SOH import stores the 'Store Name' of the sales
+    workbooks (see store_codes in scripts/soh_update.py), so the same selection applies.
+    """
+    return snapshots[
+        snapshots['Date'].dt.year.isin(years) &
+        snapshots['Date'].dt.month_name().isin(months) &
+        snapshots['Store Name'].isin(stores)
+    ]
+
+
+def cached_monthly_snapshots(engine, version=None):
+    """
+    load_monthly_snapshots() cached per snapshot 'version' (see versions.py), or
+    when it isn't known, until the summary is refreshed again.
+    """
+    if version is None:
+        with read_connection(engine) as conn:
+            refreshed_at = conn.execute(text("SELECT MAX(refreshed_at) FROM stock_snapshot_summary")).scalar()
+        return _snapshot_cache.get_or_build(refreshed_at, lambda: load_monthly_snapshots(engine))
+    return _snapshot_cache.get_or_build(version, lambda: load_monthly_snapshots(engine, version))
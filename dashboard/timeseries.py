@@ -0,0 +1,102 @@
+"""
+Period-over-period analytics over the shared monthly aggregates.
+
+For a dimension (Group, Store Name, Grouping or the overall total) the
+aggregates are rolled up once into a month x member frame covering every
+month between the first and last month of the data. All metrics are then
+column-wise window operations on that one frame (shift, rolling, a per-year
+cumulative sum), so every member is computed in the same vectorized pass:
+  - month-over-month and year-over-year growth,
+  - rolling 3/6/12-month sums and averages,
+  - year-to-date totals against the same months of the previous year.
+The year and month filters should be applied to the result, not to the input,
+otherwise YoY and YTD have no previous year to compare with.
+"""
+import numpy as np
+import pandas as pd
+
+from dashboard.cache import LRUCache
+
+WINDOWS = (3, 6, 12)
+TOTAL_LABEL = "Total"
+
+METRICS = (
+    ["Value", "MoM %", "YoY %"]
+    + [f"Rolling {w}M {kind}" for w in WINDOWS for kind in ("Sum", "Avg")]
+    + ["YTD", "YTD Prior Year", "YTD vs Prior Year %"]
+)
+PERCENT_METRICS = ["MoM %", "YoY %", "YTD vs Prior Year %"]
+
+_metrics_cache = LRUCache(maxsize=32)
+
+
+def _by_month(aggregates, column, value):
+    """
+    'value' per month (rows) and member of 'column' (columns); months without rows count as 0.
+    """
+    if column is None:
+        by_month = aggregates.groupby("Date")[value].sum().to_frame(TOTAL_LABEL)
+    else:
+        by_month = aggregates.groupby(["Date", column], observed=True)[value].sum().unstack(column, fill_value=0)
+    months = pd.date_range(by_month.index.min(), by_month.index.max(), freq="MS")
+    return by_month.reindex(months, fill_value=0).astype(float)
+
+
+def _growth(current, previous):
+    """
+    Percentage change from 'previous' to 'current'; NaN where 'previous' isn't
+    positive (a change from a negative value, e.g. a gross margin loss, has no
+    meaningful sign) or is missing.
+    """
+    return (current - previous) / previous.where(previous > 0) * 100
+
+
+def period_metrics(aggregates, column=None, value="Penjualan"):
+    """
+    Returns one row per (member of 'column', month) with 'Date' and every metric
+    in METRICS for 'value'. With column=None the members are the overall total,
+    labelled TOTAL_LABEL in a 'Total' column.
+    """
+    by_month = _by_month(aggregates, column, value)
+
+    frames = {
+        "Value": by_month,
+        "MoM %": _growth(by_month, by_month.shift(1)),
+        "YoY %": _growth(by_month, by_month.shift(12)),
+    }
+    for window in WINDOWS:
+        rolling = by_month.rolling(window, min_periods=window).sum()
+        frames[f"Rolling {window}M Sum"] = rolling
+        frames[f"Rolling {window}M Avg"] = rolling / window
+    ytd = by_month.groupby(by_month.index.year).cumsum()
+    frames["YTD"] = ytd
+    frames["YTD Prior Year"] = ytd.shift(12)
+    frames["YTD vs Prior Year %"] = _growth(ytd, frames["YTD Prior Year"])
+
+    # Long format: month-major, one row per member within each month
+    months, members = by_month.index, by_month.columns
+    result = pd.DataFrame({
+        column or "Total": np.tile(members.to_numpy(), len(months)),
+        "Date": np.repeat(months.to_numpy(), len(members)),
+    })
+    for metric in METRICS:
+        result[metric] = frames[metric].to_numpy().ravel()
+    return result
+
+
+def cached_period_metrics(key, aggregates, column=None, value="Penjualan"):
+    """
+    period_metrics(...) cached under 'key' (dataset fingerprint + filters), 'column' and 'value'.
+    """
+    return _metrics_cache.get_or_build(
+        (key, column, value), lambda: period_metrics(aggregates, column, value)
+    )
+
+
+def latest(metrics, dates=None):
+    """
+    Rows of the latest month in 'metrics', or of the latest of 'dates' when given.
+    """
+    if dates is not None:
+        metrics = metrics[metrics["Date"].isin(dates)]
+    return metrics[metrics["Date"] == metrics["Date"].max()].reset_index(drop=True)
@@ -0,0 +1,218 @@
+"""
+Data-quality report for uploaded sales sheets.
+
+Runs before cleaning (see dashboard/loading.py), so it shows what cleaning is
+about to drop and what it keeps although it looks wrong. Every check is a
+boolean mask over the whole sheet, computed in one pass:
+  - numeric columns are parsed once (numbers as they are, text the way
+    loading.convert_numeric parses it) and reused by the value checks,
+  - text columns with few distinct values (Month, Store Name, Group) are
+    checked on their factorized values, not row by row,
+  - duplicate keys are found on one integer per row combining the key codes.
+The report is a summary with one row per check and a few sample rows per
+failed check, with their row number in the uploaded sheet(s).
+"""
+import calendar
+
+import numpy as np
+import pandas as pd
+
+from dashboard.cache import LRUCache
+from dashboard.loading import DIVISIONS, NUMERIC_COLS, REQUIRED_COLS, standard_columns
+
+KEY_COLS = ["Store Name", "Grouping", "Month", "year"]
+SAMPLE_ROWS = 5
+# Gross Margin may differ from Penjualan - HPP by rounding
+MARGIN_TOLERANCE = 1.0
+
+_report_cache = LRUCache(maxsize=4)
+
+FULL_MONTHS = {name.lower() for name in calendar.month_name[1:]}
+ABBREVIATED_MONTHS = {name.lower() for name in calendar.month_abbr[1:]}
+
+# Check -> (severity, what cleaning does with the rows, description)
+CHECKS = {
+    "Missing columns": ("error", "upload rejected", "Required columns not found (names are matched ignoring case)"),
+    "Invalid numbers": ("error", "dropped", "Penjualan, HPP, Gross Margin or Stock Value is empty or not a number"),
+    "Unparseable year": ("error", "upload rejected", "'year' is empty or not a number"),
+    "Unparseable month": ("error", "dropped", "'Month' is not a month name (e.g. 'January', or 'Jan' for every row)"),
+    "Outside divisions": ("info", "dropped", f"Group (or the first letters of Grouping) is not one of {DIVISIONS}"),
+    "Non-positive sales": ("warning", "kept", "Penjualan is zero or negative"),
+    "Margin mismatch": ("warning", "kept", "Gross Margin differs from Penjualan - HPP"),
+    "Unknown stores": ("warning", "kept", "Store Name is not in the stored history"),
+    "Duplicate keys": ("warning", "kept", "More than one row for the same Store Name, Grouping, Month and year"),
+}
+
+
+def parse_numbers(values):
+    """
+    Numeric column -> float values (NaN where invalid), as loading.convert_numeric
+    reads it: integer columns as they are, anything else as text with '.'
+    thousand separators removed and ',' as the decimal separator.
+    """
+    if pd.api.types.is_integer_dtype(values):
+        return values.to_numpy(dtype=float)
+    text = values.astype(str).str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    return pd.to_numeric(text, errors='coerce').to_numpy(dtype=float)
+
+
+def _codes_in(factorized, accepted, normalize=None):
+    """
+    Boolean mask of the rows whose (normalized) value is in 'accepted', from the
+    (codes, uniques) of pd.factorize: evaluated once per distinct value.
+    """
+    codes, uniques = factorized
+    keys = uniques if normalize is None else [normalize(v) for v in uniques]
+    # The last entry is for code -1 (missing values)
+    return np.array([key in accepted for key in keys] + [False], dtype=bool)[codes]
+
+
+def _month_mask(factorized):
+    """
+    Rows whose 'Month' loading.parse_dates can't read: full names are used
+    when any row has one, abbreviations only when none has.
+    """
+    def normalize(value):
+        return value.lower() if isinstance(value, str) else None
+
+    full = _codes_in(factorized, FULL_MONTHS, normalize)
+    return ~full if full.any() else ~_codes_in(factorized, ABBREVIATED_MONTHS, normalize)
+
+
+def _duplicate_mask(factorized):
+    """
+    Rows sharing their values with another row, given the (codes, uniques) of each key column.
+    """
+    combined = np.zeros(len(factorized[0][0]), dtype=np.int64)
+    for codes, uniques in factorized:
+        combined = combined * (len(uniques) + 1) + (codes + 1)
+    codes = pd.factorize(combined)[0]
+    return np.bincount(codes)[codes] > 1
+
+
+def run_checks(data, known_stores=None):
+    """
+    Returns {check: boolean mask of offending rows} for 'data' with standard column names.
+    """
+    numbers = {col: parse_numbers(data[col]) for col in NUMERIC_COLS}
+    invalid = np.zeros(len(data), dtype=bool)
+    for values in numbers.values():
+        invalid |= np.isnan(values)
+    valid = ~invalid
+
+    # Text columns are checked on their distinct values
+    factorized = {
+        col: pd.factorize(data[col])
+        for col in dict.fromkeys(KEY_COLS + ["Group" if "Group" in data.columns else "Grouping"])
+    }
+
+    sales, hpp, margin = numbers["Penjualan"], numbers["HPP"], numbers["Gross Margin"]
+    # Divisions before GRC and FRS are combined; without a Group column cleaning derives it from Grouping
+    divisions = set(DIVISIONS) | {"GRC", "FRS"}
+    if "Group" in data.columns:
+        in_divisions = _codes_in(factorized["Group"], divisions)
+    else:
+        in_divisions = _codes_in(factorized["Grouping"], divisions, lambda value: str(value)[:3].upper())
+
+    masks = {
+        "Invalid numbers": invalid,
+        "Unparseable year": np.isnan(pd.to_numeric(data["year"], errors='coerce').to_numpy(dtype=float)),
+        "Unparseable month": _month_mask(factorized["Month"]),
+        "Outside divisions": ~in_divisions,
+        "Non-positive sales": valid & (sales <= 0),
+        "Margin mismatch": valid & (np.abs(margin - (sales - hpp)) > MARGIN_TOLERANCE),
+        "Duplicate keys": _duplicate_mask([factorized[col] for col in KEY_COLS]),
+    }
+    if known_stores is not None:
+        masks["Unknown stores"] = ~_codes_in(factorized["Store Name"], set(known_stores))
+    return masks
+
+
+def _sample(data, mask, sheets, sample_rows):
+    """
+    The first 'sample_rows' rows of 'mask', prefixed with their 'Row' number in
+    their sheet (header = row 1) and, with 'sheets', their 'File' and 'Sheet'.
+    """
+    positions = np.flatnonzero(mask)[:sample_rows]
+    sample = data.iloc[positions].reset_index(drop=True)
+    if sheets is None:
+        sample.insert(0, "Row", positions + 2)
+        return sample
+    # Sheets follow each other in the upload: locate each position in the cumulative row counts
+    ends = np.cumsum(sheets["Rows"].to_numpy())
+    sheet = np.searchsorted(ends, positions, side="right")
+    starts = ends - sheets["Rows"].to_numpy()
+    sample.insert(0, "Row", positions - starts[sheet] + 2)
+    sample.insert(0, "Sheet", sheets["Sheet"].to_numpy()[sheet])
+    sample.insert(0, "File", sheets["File"].to_numpy()[sheet])
+    return sample
+
+
+def validate(raw_data, known_stores=None, sheets=None, sample_rows=SAMPLE_ROWS):
+    """
+    Checks an uploaded sheet before cleaning. 'known_stores' (e.g. the stores of
+    the stored history) enables the unknown stores check; 'sheets' (the timings
+    of loading.load_workbooks: File, Sheet, Rows) locates the sample rows.
+    Returns (summary, samples): one summary row per check with its severity,
+    what cleaning does with the rows, the number and share of offending rows,
+    and {check: up to 'sample_rows' offending rows} for the failed checks.
+    """
+    data = raw_data.set_axis(standard_columns(raw_data.columns), axis=1)
+    missing = [col for col in REQUIRED_COLS if col not in data.columns]
+
+    masks = {"Missing columns": None} if missing else run_checks(data, known_stores)
+    rows = []
+    samples = {}
+    for check, mask in masks.items():
+        severity, action, description = CHECKS[check]
+        if mask is None:
+            count, share = len(missing), np.nan
+            description = f"{description}: {missing}"
+        else:
+            count = int(mask.sum())
+            share = count / len(data) * 100 if len(data) else 0.0
+            if count:
+                samples[check] = _sample(data, mask, sheets, sample_rows)
+        rows.append({"Check": check, "Severity": severity, "Rows": count, "Share %": share,
+                     "Cleaning": action, "Description": description})
+    return pd.DataFrame(rows), samples
+
+
+def cached_validate(key, raw_data, known_stores=None, sheets=None):
+    """
+    validate(...) cached under 'key' (the upload fingerprint) and the known stores.
+    """
+    stores_key = None if known_stores is None else tuple(sorted(known_stores))
+    return _report_cache.get_or_build(
+        (key, stores_key), lambda: validate(raw_data, known_stores, sheets)
+    )
+
+
+def has_errors(summary):
+    """
+    Whether an 'error' check failed (rows will be dropped or the upload rejected).
+    """
+    return bool(((summary["Severity"] == "error") & (summary["Rows"] > 0)).any())
+
+
+def show_report(st, summary, samples, in_expander=True):
+    """
+    Renders the report with 'st' (the streamlit module): the summary table, then
+    the sample rows of each failed check. 'in_expander' puts it in an expander,
+    opened when an error check failed (expanders can't be nested).
+    """
+    failed = int((summary["Rows"] > 0).sum())
+    title = f"Data quality report ({failed} check{'s' if failed != 1 else ''} flagged)"
+    if in_expander:
+        with st.expander(title, expanded=has_errors(summary)):
+            _report_body(st, summary, samples)
+    else:
+        st.markdown(f"**{title}**")
+        _report_body(st, summary, samples)
+
+
+def _report_body(st, summary, samples):
+    st.dataframe(summary.style.format({"Rows": "{:,}", "Share %": "{:.2f}"}, na_rep=""), hide_index=True)
+    for check, sample in samples.items():
+        st.markdown(f"**{check}**: {CHECKS[check][2]}")
+        st.dataframe(sample, hide_index=True)
@@ -0,0 +1,182 @@
+"""
+Keeps the dashboard caches fresh after imports, and warm for the default view.
+
+start() (called on every rerun, it acts once per process) runs a daemon
+thread that follows:
+  - the dataset versions published by the batch jobs (see versions.py),
+    e.g. the SOH snapshots loaded by scripts/soh_update.py,
+  - the stored history's manifest version, which changes on every append.
+It wakes up on every version notification, and every WARMUP_POLL_SECONDS
+anyway for the manifest. When a version changes:
+  1. only the cache entries built from the previous version are dropped:
+     every key holds its dataset's version key ('history-v4',
+     'stock_snapshots-v12'), see cache.discard_mentioning. Entries of uploads
+     and of the other datasets stay;
+  2. the stored history's default view (the sidebar's default selection) is
+     recomputed through the same cached helpers and keys as the page: history
+     rows, selection and aggregates, then the tables of every tab (comparison
+     tables, period metrics, rankings, forecast, ABC classes, month-end
+     snapshots), so the first visitor after the nightly run finds them cached.
+     Charts are built from those tables on the first view.
+"""
+import logging
+import os
+import threading
+
+import versions
+from dashboard import history, stock
+from dashboard.cache import discard_mentioning
+
+POLL_SECONDS = float(os.getenv("WARMUP_POLL_SECONDS", "30"))
+# Set to 0 to only drop outdated entries, without recomputing the default view
+WARMUP_ENABLED = os.getenv("DASHBOARD_WARMUP", "1") != "0"
+
+logger = logging.getLogger(__name__)
+
+_started = False
+_start_lock = threading.Lock()
+_wake = threading.Event()
+_watcher = None
+
+
+def dataset_version(dataset):
+    """
+    Version key of a dataset published by the batch jobs (e.g. 'stock_snapshots-v12'),
+    or None when it isn't known (no database, or the watcher hasn't read it yet).
+    """
+    if _watcher is None:
+        return None
+    return versions.version_key(dataset, _watcher.versions.get(dataset))
+
+
+def current_versions(root=history.DATA_DIR):
+    """
+    {dataset: version key} of everything the dashboard caches.
+    """
+    return {"history": history.dataset_version(root),
+            versions.STOCK_SNAPSHOTS: dataset_version(versions.STOCK_SNAPSHOTS)}
+
+
+def warm_default_view(root=history.DATA_DIR, out_of_core=history.OUT_OF_CORE):
+    """
+    Computes the stored history's default view into the caches. Mirrors the
+    data steps of dashboard/page.py for the sidebar's default selection and
+    every widget at its default value.
+    """
+    from dashboard import aggregates, backends, comparison, forecast, inventory, ranking, timeseries
+    from dashboard.page import cache_keys, default_filters, filter_options
+
+    if history.read_manifest(root) is None:
+        return
+    if out_of_core:
+        dataset_key, filter_values = history.cached_filter_options(root)
+    else:
+        dataset_key, raw_data, stored_aggregates = history.load_cached(root)
+        filter_values = filter_options(raw_data)
+    selection = default_filters(filter_values)
+    filter_key, grouping_filter_key, period_key = cache_keys(dataset_key, **selection)
+    groups, years, months, stores = (selection[name] for name in ("groups", "years", "months", "stores"))
+
+    if out_of_core:
+        filtered_data = history.cached_read_filtered(filter_key, root, years=years, months=months, stores=stores,
+                                                     groups=groups)
+        history.cached_read_filtered(grouping_filter_key, root, years=years, months=months, stores=stores,
+                                     categories=selection["categories"])
+        monthly_agg = history.cached_read_aggregates(filter_key, root, years=years, months=months, stores=stores,
+                                                     groups=groups)
+        dataset_aggregates = period_aggregates = history.cached_read_aggregates(period_key, root, stores=stores,
+                                                                                groups=groups)
+        aggregates_key = period_key
+    else:
+        filtered_data = backends.filter_rows(raw_data, {'Group': groups, 'year': years, 'Month': months,
+                                                        'Store Name': stores})
+        monthly_agg = aggregates.cached_selection(filter_key, stored_aggregates, groups, stores,
+                                                  filtered_data['Date'].unique())
+        dataset_aggregates, aggregates_key = stored_aggregates, dataset_key
+        period_aggregates = aggregates.cached_selection(period_key, dataset_aggregates, groups, stores,
+                                                        dataset_aggregates['Date'].unique())
+    if filtered_data.empty:
+        return
+
+    # Tabs 1, 3 and 9
+    comparison.cached_comparison_table(('group_sales',) + filter_key, monthly_agg, 'Group',
+                                       blocks=("Sales", "Difference"))
+    detail_blocks = ("Sales", "Difference", "Percent Change") if monthly_agg['Date'].nunique() > 1 else ("Sales",)
+    comparison.cached_comparison_table(('detail_sales',) + filter_key, monthly_agg, ["Grouping", "Store Name", "Group"],
+                                       blocks=detail_blocks, labels={"Difference": "Change"}, grand_total=False)
+    comparison.cached_comparison_table(('store_stock', "Sales workbook") + filter_key, filtered_data, 'Store Name',
+                                       value='Stock Value', labels={"Sales": "Stock Value"}, grand_total=False)
+
+    # Period comparisons of tabs 1, 2 and 8
+    for column in ('Group', 'Store Name'):
+        timeseries.cached_period_metrics(period_key, period_aggregates, column, 'Penjualan')
+    gm_aggregates = period_aggregates.assign(
+        **{'Gross Margin': period_aggregates['Penjualan'] - period_aggregates['HPP']})
+    gm_key = period_key + ('Penjualan - HPP',)
+    for column in (None, 'Group'):
+        timeseries.cached_period_metrics(gm_key, gm_aggregates, column, 'Gross Margin')
+
+    # Tabs 7, 9, 10 and 11
+    ranking.cached_top_bottom(filter_key, monthly_agg, next(iter(ranking.DIMENSIONS)), ranking.METRICS[0], n=10)
+    ranking.cached_top_bottom(filter_key, monthly_agg, "Grouping", "Average Stock Value", n=10)
+    forecast.cached_forecast(aggregates_key, dataset_aggregates, forecast.METRICS[0], forecast.METHODS[0],
+                             forecast.DEFAULT_HORIZON)
+    inventory.cached_classify(filter_key, monthly_agg, None)
+
+
+def _warm_snapshots():
+    if stock.snapshots_configured():
+        import db
+        stock.cached_monthly_snapshots(db.get_engine(), dataset_version(versions.STOCK_SNAPSHOTS))
+
+
+def refresh(previous, root=history.DATA_DIR, warm=True):
+    """
+    Drops the cache entries of the versions in 'previous' ({dataset: version key})
+    that changed, and (with 'warm') warms the changed datasets. Returns the current versions.
+    """
+    current = current_versions(root)
+    changed = [dataset for dataset, key in current.items() if previous.get(dataset) != key]
+    for dataset in changed:
+        if previous.get(dataset) is not None:
+            removed = discard_mentioning(previous[dataset])
+            logger.info("Dataset %s is now %s: dropped %d cache entries", dataset, current[dataset], removed)
+    if warm and WARMUP_ENABLED:
+        if "history" in changed and current["history"] is not None:
+            warm_default_view(root)
+        if versions.STOCK_SNAPSHOTS in changed and current[versions.STOCK_SNAPSHOTS] is not None:
+            _warm_snapshots()
+    return current
+
+
+def _run():
+    previous = None
+    while True:
+        try:
+            # The rerun that started the thread is computing the current versions itself
+            previous = refresh(previous or {}, warm=previous is not None)
+        except Exception:
+            logger.exception("Dashboard cache warm-up failed")
+        _wake.wait(POLL_SECONDS)
+        _wake.clear()
+
+
+def start():
+    """
+    Starts the refresh thread (once per process) and, with a database, the
+    version watcher that wakes it up.
+    """
+    global _started, _watcher
+    if _started:
+        return
+    with _start_lock:
+        if _started:
+            return
+        if stock.snapshots_configured():
+            try:
+                _watcher = versions.get_watcher()
+                _watcher.subscribe(lambda changed: _wake.set())
+            except Exception:
+                logger.exception("Could not follow the dataset versions; only the stored history is watched")
+        threading.Thread(target=_run, name="dashboard-warmup", daemon=True).start()
+        _started = True
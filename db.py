@@ -0,0 +1,252 @@
+"""
+Shared database helpers for the Flask app, the Streamlit dashboard and the
+batch scripts. The database is configured with the DATABASE_URL environment variable.
+
+Read replica: with DATABASE_READ_URL set, read_connection() hands out
+read-only connections to that database instead of DATABASE_URL's, so the
+dashboard and API reads don't compete with the nightly imports. It uses the
+primary when the replica:
+  - can't be reached (it is then tried again after DB_REPLICA_CHECK_SECONDS),
+  - replays more than DB_REPLICA_MAX_LAG_SECONDS behind the primary (checked
+    at most every DB_REPLICA_CHECK_SECONDS),
+  - or doesn't pass the caller's freshness check (e.g. hasn't replayed the
+    dataset version the caller is loading, see dashboard/stock.py).
+Writes, and reads that must see their own writes, keep using get_engine().
+
+To try it locally, run a second PostgreSQL as a streaming replica of the
+first (pg_basebackup -R -D <dir> from the primary, started on another port)
+and point DATABASE_READ_URL at it. A second instance that isn't a replica is
+treated as having no lag.
+"""
+import contextlib
+import io
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "30"))
+REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "5"))
+
+# Seconds the replica's replay is behind: 0 when it has replayed everything it
+# received (an idle primary sends nothing, so the last replay time alone would
+# grow forever), or when the database isn't a replica at all
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+logger = logging.getLogger(__name__)
+
+_engines = {}
+_engines_lock = threading.Lock()
+_routers = {}
+
+
+def get_database_url():
+    """
+    Returns DATABASE_URL with the 'postgresql://' dialect prefix SQLAlchemy expects.
+    """
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        raise ValueError("DATABASE_URL environment variable is not set!")
+
+    # Ensure the URL uses the correct dialect prefix
+    if db_url.startswith("postgres://"):
+        db_url = db_url.replace("postgres://", "postgresql://", 1)
+    return db_url
+
+
+def get_read_database_url():
+    """
+    Returns DATABASE_READ_URL (with the dialect prefix fixed), or None when no replica is configured.
+    """
+    db_url = os.getenv("DATABASE_READ_URL")
+    if db_url and db_url.startswith("postgres://"):
+        db_url = db_url.replace("postgres://", "postgresql://", 1)
+    return db_url or None
+
+
+def _pool_options():
+    """
+    Pool settings from DB_POOL_SIZE / DB_MAX_OVERFLOW. With threaded gunicorn
+    workers the pool size should be at least the number of threads per worker.
+    """
+    options = {"pool_pre_ping": True}
+    if os.getenv("DB_POOL_SIZE"):
+        options["pool_size"] = int(os.getenv("DB_POOL_SIZE"))
+    if os.getenv("DB_MAX_OVERFLOW"):
+        options["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW"))
+    return options
+
+
+def get_engine():
+    """
+    Returns the SQLAlchemy engine for DATABASE_URL, created once per process.
+    The engine and its pool are thread-safe; connections are not, so every
+    request or thread takes its own with engine.connect() / engine.begin().
+    """
+    return _engine_for(get_database_url())
+
+
+def _engine_for(db_url):
+    with _engines_lock:
+        if db_url not in _engines:
+            _engines[db_url] = create_engine(db_url, **_pool_options())
+        return _engines[db_url]
+
+
+class ReadRouter:
+    """
+    Chooses between a replica and its primary for read-only connections.
+    The replica's state (reachable, lag) is re-checked at most every 'check_seconds'.
+    """
+
+    def __init__(self, primary, replica, max_lag=REPLICA_MAX_LAG_SECONDS, check_seconds=REPLICA_CHECK_SECONDS):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.check_seconds = check_seconds
+        self.lag = None
+        self._usable = False
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def replica_lag(self):
+        """
+        Seconds the replica is behind (0 for a database that isn't a replica), None if unknown.
+        """
+        if self.replica.dialect.name != "postgresql":
+            return 0
+        with self.replica.connect() as conn:
+            lag = conn.execute(text(REPLICA_LAG_SQL)).scalar()
+        return None if lag is None else float(lag)
+
+    def _mark_unusable(self, reason):
+        with self._lock:
+            if self._usable:
+                logger.warning("Reading from the primary: %s", reason)
+            self._usable, self._checked_at = False, time.monotonic()
+
+    def replica_usable(self):
+        """
+        Whether reads go to the replica, checking it again when the last check is too old.
+        """
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.check_seconds:
+                return self._usable
+            # Other threads keep the previous answer while this one checks
+            self._checked_at = time.monotonic()
+        try:
+            lag = self.replica_lag()
+        except DBAPIError as e:
+            self._mark_unusable(f"replica unavailable ({e.orig})")
+            return False
+        if lag is None or lag > self.max_lag:
+            self._mark_unusable(f"replica lag {lag}s above {self.max_lag:g}s")
+            return False
+        with self._lock:
+            if not self._usable:
+                logger.info("Reading from the replica (lag %.1fs)", lag)
+            self.lag, self._usable, self._checked_at = lag, True, time.monotonic()
+        return True
+
+    def _replica_connection(self):
+        if not self.replica_usable():
+            return None
+        try:
+            return self.replica.connect()
+        except DBAPIError as e:
+            self._mark_unusable(f"replica unavailable ({e.orig})")
+            return None
+
+    @contextlib.contextmanager
+    def connect(self, is_fresh=None):
+        """
+        A read-only connection to the replica when it is usable (and 'is_fresh(conn)'
+        holds, when given), to the primary otherwise.
+        """
+        conn = self._replica_connection()
+        if conn is not None and is_fresh is not None:
+            try:
+                fresh = is_fresh(conn)
+            except DBAPIError:
+                fresh = False
+            # End the check's transaction: the read-only mode is set before the next one
+            conn.rollback()
+            if not fresh:
+                conn.close()
+                conn = None
+        if conn is None:
+            conn = self.primary.connect()
+        with conn:
+            yield _read_only(conn)
+
+
+def _read_only(conn):
+    if conn.dialect.name == "postgresql":
+        # Reset when the connection goes back to the pool
+        conn = conn.execution_options(postgresql_readonly=True)
+    return conn
+
+
+def get_read_router(engine=None):
+    """
+    The process's ReadRouter for DATABASE_URL's engine when DATABASE_READ_URL is
+    set, else None (also for any other engine, e.g. a benchmark's).
+    """
+    read_url = get_read_database_url()
+    if not read_url:
+        return None
+    primary = get_engine()
+    if engine is not None and engine is not primary:
+        return None
+    with _engines_lock:
+        router = _routers.get(read_url)
+    if router is None:
+        router = ReadRouter(primary, _engine_for(read_url))
+        with _engines_lock:
+            router = _routers.setdefault(read_url, router)
+    return router
+
+
+@contextlib.contextmanager
+def read_connection(engine=None, is_fresh=None):
+    """
+    A read-only connection for queries of 'engine' (default: DATABASE_URL's),
+    routed to the read replica when there is a usable one (see ReadRouter.connect).
+    """
+    router = get_read_router(engine)
+    if router is not None:
+        with router.connect(is_fresh) as conn:
+            yield conn
+        return
+    with (engine or get_engine()).connect() as conn:
+        yield _read_only(conn)
+
+
+def dispose_engines():
+    """
+    Drops pooled connections inherited from a parent process (call after fork).
+    """
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose(close=False)
+
+
+def copy_dataframe(conn, df, table, columns):
+    """
+    Bulk-loads the 'columns' of 'df' into 'table' with PostgreSQL COPY,
+    using the DBAPI connection behind the SQLAlchemy connection 'conn'.
+    """
+    buffer = io.StringIO()
+    df[columns].to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    with conn.connection.cursor() as cur:
+        cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
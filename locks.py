@@ -0,0 +1,23 @@
+"""
+Advisory file locks shared by the batch jobs (scheduler.py) and the
+dashboard's stored history (dashboard/history.py).
+"""
+import contextlib
+import fcntl
+import os
+
+
+@contextlib.contextmanager
+def file_lock(path, blocking=True):
+    """
+    Holds an exclusive flock on 'path' (created if missing) for the block.
+    Without 'blocking', raises BlockingIOError if another process holds it.
+    The lock is released when the block ends or the process dies.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
@@ -0,0 +1,114 @@
+"""
+Prometheus metrics for the Flask app and the batch scripts.
+
+The Flask app exposes its metrics on /metrics (see instrument_app). Under
+gunicorn every worker keeps its own counters; set PROMETHEUS_MULTIPROC_DIR to an
+empty, writable directory before the workers start so /metrics reports the sum
+over all of them.
+
+Batch jobs don't live long enough to be scraped; they write their metrics with
+write_job_metrics() to METRICS_TEXTFILE_DIR, for the node_exporter textfile collector.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    write_to_textfile,
+)
+from prometheus_client import multiprocess
+
+REQUEST_LATENCY = Histogram(
+    "flask_request_duration_seconds",
+    "Request latency per route",
+    ["route", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+LOGINS = Counter("flask_logins_total", "Login attempts", ["result"])
+# Logged in minus logged out; sessions that simply expire are not subtracted
+ACTIVE_SESSIONS = Gauge("flask_active_sessions", "Sessions logged in and not logged out",
+                        multiprocess_mode="sum")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out of the pool",
+                            multiprocess_mode="livesum")
+DB_POOL_SIZE = Gauge("db_pool_size", "Connections held by the pool", multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections opened beyond the pool size",
+                         multiprocess_mode="livesum")
+
+
+def _update_pool_metrics(engine):
+    pool = engine.pool
+    # Not every pool class (e.g. SQLite's) tracks all of these
+    for gauge, attr in [(DB_POOL_CHECKED_OUT, "checkedout"), (DB_POOL_SIZE, "size"), (DB_POOL_OVERFLOW, "overflow")]:
+        if hasattr(pool, attr):
+            gauge.set(getattr(pool, attr)())
+
+
+def registry():
+    """
+    The registry to expose: the per-process default one, or the aggregate of all
+    gunicorn workers when PROMETHEUS_MULTIPROC_DIR is set.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        aggregate = CollectorRegistry()
+        multiprocess.MultiProcessCollector(aggregate)
+        return aggregate
+    return REGISTRY
+
+
+def instrument_app(app, engine):
+    """
+    Records the latency of every request of 'app', the pool usage of 'engine'
+    and adds the /metrics endpoint.
+    """
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("request_start", None)
+        if start is not None and request.endpoint != "metrics":
+            # The URL rule (not the raw path) keeps the label set small
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            REQUEST_LATENCY.labels(route, request.method, response.status_code).observe(
+                time.perf_counter() - start)
+        _update_pool_metrics(engine)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        _update_pool_metrics(engine)
+        return Response(generate_latest(registry()), mimetype=CONTENT_TYPE_LATEST)
+
+    return app
+
+
+def write_job_metrics(job, values, directory=None):
+    """
+    Writes 'values' (metric name -> number) as gauges named '<job>_<name>' to
+    '<directory>/<job>.prom', together with '<job>_last_success_timestamp_seconds'.
+    'directory' defaults to METRICS_TEXTFILE_DIR; nothing is written when neither is set.
+    Returns the path written, or None.
+    """
+    directory = directory or os.getenv("METRICS_TEXTFILE_DIR")
+    if not directory:
+        return None
+
+    job_registry = CollectorRegistry()
+    for name, value in values.items():
+        Gauge(f"{job}_{name}", f"{job} {name.replace('_', ' ')}", registry=job_registry).set(value)
+    Gauge(f"{job}_last_success_timestamp_seconds", f"Time {job} last completed",
+          registry=job_registry).set_to_current_time()
+
+    path = os.path.join(directory, f"{job}.prom")
+    # write_to_textfile writes a temporary file and renames it, so the collector never reads a partial file
+    write_to_textfile(path, job_registry)
+    return path
@@ -0,0 +1,338 @@
+"""
+Scheduler for the batch jobs (the daily product import and the SOH import).
+
+Every run of a job is for one day (its run date) and goes through:
+  - a lock, so only one run of the job is active at a time: a Postgres
+    advisory lock on a dedicated connection (released even if the process
+    dies), or a file lock in JOB_LOCK_DIR on other databases. A run that
+    finds the lock taken is recorded as 'skipped',
+  - stages (download, read, upsert...) retried on transient errors (network,
+    Drive 429/5xx, dropped database connections) with exponential backoff
+    and full jitter: attempt n waits uniform(0, min(max_delay, base * 2**n)),
+  - a row in 'job_runs' with its status, stage timings, attempts, rows
+    processed and error.
+
+Catch-up: the days from the last successful run date up to today (at most
+JOB_CATCHUP_DAYS) are due, oldest first, and today only once JOB_RUN_AT
+(HH:MM, UTC) has passed. A failed day stays due and blocks the later ones,
+so days are always applied in order; it is tried again after JOB_RETRY_MINUTES.
+
+Usage (from the repository root):
+    python scheduler.py                 # runs the due days, then keeps scheduling
+    python scheduler.py --once          # runs the due days and exits (for an external cron)
+    python scheduler.py --date 2024-12-26
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import random
+import socket
+import ssl
+import sys
+import tempfile
+import time
+import zlib
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from db import get_engine
+from locks import file_lock
+
+LOCK_DIR = os.getenv("JOB_LOCK_DIR", tempfile.gettempdir())
+STAGE_ATTEMPTS = int(os.getenv("JOB_STAGE_ATTEMPTS", "5"))
+BACKOFF_BASE_SECONDS = float(os.getenv("JOB_BACKOFF_BASE_SECONDS", "2"))
+BACKOFF_MAX_SECONDS = float(os.getenv("JOB_BACKOFF_MAX_SECONDS", "120"))
+CATCHUP_DAYS = int(os.getenv("JOB_CATCHUP_DAYS", "7"))
+RUN_AT = os.getenv("JOB_RUN_AT", "02:00")
+RETRY_MINUTES = float(os.getenv("JOB_RETRY_MINUTES", "15"))
+CHECK_SECONDS = 60
+
+# HTTP statuses worth retrying (Google APIs answer 429 when rate limited)
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+
+RUNS_SQL = """
+    CREATE TABLE IF NOT EXISTS job_runs (
+        id             {id_column},
+        job            TEXT NOT NULL,
+        run_date       DATE NOT NULL,
+        status         TEXT NOT NULL,
+        started_at     TIMESTAMP NOT NULL,
+        finished_at    TIMESTAMP,
+        rows_processed BIGINT,
+        attempts       INTEGER,
+        timings        TEXT,
+        error          TEXT
+    )
+"""
+RUNS_INDEX_SQL = "CREATE INDEX IF NOT EXISTS job_runs_job_date_idx ON job_runs (job, run_date)"
+
+logger = logging.getLogger("scheduler")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+
+class LockHeld(RuntimeError):
+    """
+    Raised when another run of the job holds its lock.
+    """
+
+
+def is_transient(exc):
+    """
+    Whether 'exc' is worth retrying: network errors, rate limiting / server
+    errors of HTTP APIs, and database connection errors.
+    """
+    if isinstance(exc, (ConnectionError, TimeoutError, socket.timeout, socket.gaierror, ssl.SSLError)):
+        return True
+    if isinstance(exc, DBAPIError):
+        return exc.connection_invalidated or isinstance(exc, OperationalError)
+    # googleapiclient's HttpError, without importing it here
+    status = getattr(getattr(exc, "resp", None), "status", None)
+    return status is not None and int(status) in TRANSIENT_STATUSES
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE_SECONDS, max_delay=BACKOFF_MAX_SECONDS):
+    """
+    Seconds to wait before retry 'attempt' (0-based): full jitter over an exponential cap.
+    """
+    return random.uniform(0, min(max_delay, base * 2 ** attempt))
+
+
+def retry(func, *args, attempts=STAGE_ATTEMPTS, on_retry=None, **kwargs):
+    """
+    Calls func(*args, **kwargs), retrying transient errors up to 'attempts'
+    times in all. Returns (result, attempts used).
+    """
+    for attempt in range(attempts):
+        try:
+            return func(*args, **kwargs), attempt + 1
+        except Exception as e:
+            if attempt + 1 == attempts or not is_transient(e):
+                raise
+            delay = backoff_delay(attempt)
+            if on_retry:
+                on_retry(attempt + 1, e, delay)
+            time.sleep(delay)
+
+
+@contextlib.contextmanager
+def job_lock(engine, job):
+    """
+    Holds the job's lock for the block; raises LockHeld if another run holds it.
+    """
+    if engine.dialect.name == "postgresql":
+        # Session-level advisory lock on a connection of its own, held until the block ends
+        key = zlib.crc32(f"job:{job}".encode()) - 2 ** 31
+        with engine.connect() as conn:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar()
+            # The lock belongs to the session: don't keep a transaction open while the job runs
+            conn.commit()
+            if not acquired:
+                raise LockHeld(f"Another {job} run holds its lock")
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                conn.commit()
+        return
+
+    path = os.path.join(LOCK_DIR, f"{job}.lock")
+    with contextlib.ExitStack() as stack:
+        try:
+            stack.enter_context(file_lock(path, blocking=False))
+        except BlockingIOError:
+            raise LockHeld(f"Another {job} run holds {path}") from None
+        yield
+
+
+def ensure_runs_table(engine):
+    id_column = "BIGSERIAL PRIMARY KEY" if engine.dialect.name == "postgresql" else "INTEGER PRIMARY KEY"
+    with engine.begin() as conn:
+        conn.execute(text(RUNS_SQL.format(id_column=id_column)))
+        conn.execute(text(RUNS_INDEX_SQL))
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Run:
+    """
+    One run of a job: its run date, stage timings, attempts and rows processed.
+    The job function gets it and runs its stages through stage().
+    """
+
+    def __init__(self, job, run_date):
+        self.job = job
+        self.run_date = run_date
+        self.timings = {}
+        self.attempts = 0
+        self.rows = None
+
+    def stage(self, name, func, *args, **kwargs):
+        """
+        Runs one stage with retries and records its duration (retries included).
+        """
+        def attempt(*args, **kwargs):
+            # Counted here so that a stage that gives up reports its attempts too
+            self.attempts += 1
+            return func(*args, **kwargs)
+
+        def on_retry(attempt, error, delay):
+            logger.warning("%s %s: %s failed (attempt %d): %s; retrying in %.1fs",
+                           self.job, self.run_date, name, attempt, error, delay)
+
+        start = time.perf_counter()
+        try:
+            return retry(attempt, *args, on_retry=on_retry, **kwargs)[0]
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 3)
+
+
+def _record_start(engine, job, run_date, status="running"):
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            INSERT INTO job_runs (job, run_date, status, started_at)
+            VALUES (:job, :run_date, :status, :started_at)
+            RETURNING id
+        """), {"job": job, "run_date": run_date, "status": status, "started_at": _now()}).scalar()
+
+
+def _record_end(engine, run_id, status, run, error=None):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE job_runs
+            SET status = :status, finished_at = :finished_at, rows_processed = :rows,
+                attempts = :attempts, timings = :timings, error = :error
+            WHERE id = :id
+        """), {"id": run_id, "status": status, "finished_at": _now(), "rows": run.rows,
+               "attempts": run.attempts, "timings": json.dumps(run.timings), "error": error})
+
+
+def run_job(job, func, run_date, engine=None):
+    """
+    Runs func(run) for 'run_date' under the job's lock and records it in
+    job_runs. Returns the status: 'success', 'failed' or 'skipped'.
+    """
+    engine = engine or get_engine()
+    ensure_runs_table(engine)
+    run = Run(job, run_date)
+    try:
+        with job_lock(engine, job):
+            run_id = _record_start(engine, job, run_date)
+            try:
+                func(run)
+            except Exception as e:
+                logger.exception("%s %s failed", job, run_date)
+                _record_end(engine, run_id, "failed", run, error=f"{type(e).__name__}: {e}")
+                return "failed"
+            _record_end(engine, run_id, "success", run)
+    except LockHeld as e:
+        logger.warning("%s %s skipped: %s", job, run_date, e)
+        _record_end(engine, _record_start(engine, job, run_date, "skipped"), "skipped", run, error=str(e))
+        return "skipped"
+    logger.info("%s %s succeeded in %s (%s rows)", job, run_date, run.timings, run.rows)
+    return "success"
+
+
+def _run_at(day):
+    hours, minutes = (int(part) for part in RUN_AT.split(":"))
+    return datetime.combine(day, datetime.min.time()) + timedelta(hours=hours, minutes=minutes)
+
+
+def due_dates(job, engine=None, now=None, catchup_days=CATCHUP_DAYS):
+    """
+    Run dates of 'job' that haven't succeeded yet, oldest first: the days after
+    the last successful one (at most 'catchup_days') whose JOB_RUN_AT has passed.
+    """
+    engine = engine or get_engine()
+    ensure_runs_table(engine)
+    now = now or _now()
+    with engine.connect() as conn:
+        last = conn.execute(text("SELECT MAX(run_date) FROM job_runs WHERE job = :job AND status = 'success'"),
+                            {"job": job}).scalar()
+    today = now.date()
+    if isinstance(last, str):
+        last = date.fromisoformat(last)
+    first = max(last + timedelta(days=1), today - timedelta(days=catchup_days - 1)) if last else today
+    days = [first + timedelta(days=n) for n in range((today - first).days + 1)]
+    return [day for day in days if _run_at(day) <= now]
+
+
+def run_due(jobs, engine=None, now=None):
+    """
+    Runs the due days of every job ({name: func}), stopping a job at its first
+    day that doesn't succeed. Returns {name: [(run date, status)]}.
+    """
+    results = {}
+    for job, func in jobs.items():
+        results[job] = []
+        for day in due_dates(job, engine, now):
+            status = run_job(job, func, day, engine)
+            results[job].append((day, status))
+            if status != "success":
+                break
+    return results
+
+
+def serve(jobs, engine=None):
+    """
+    Runs the due days every CHECK_SECONDS, forever; a job that failed waits
+    JOB_RETRY_MINUTES before its day is tried again. Errors of the scheduling
+    itself (e.g. the database being down) are logged and retried on the next check.
+    """
+    blocked_until = {}
+    while True:
+        for job, func in jobs.items():
+            if time.monotonic() < blocked_until.get(job, 0):
+                continue
+            try:
+                statuses = [status for _, status in run_due({job: func}, engine)[job]]
+            except Exception:
+                logger.exception("Scheduling %s failed; retrying in %ds", job, CHECK_SECONDS)
+                continue
+            if statuses and statuses[-1] != "success":
+                blocked_until[job] = time.monotonic() + RETRY_MINUTES * 60
+        time.sleep(CHECK_SECONDS)
+
+
+def registered_jobs():
+    """
+    {job name: function of a Run} of the scheduled jobs.
+    """
+    # scripts/ is not a package; make the job scripts importable
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+    import daily_update
+    import soh_update
+
+    return {
+        daily_update.JOB: daily_update.run_import,
+        soh_update.JOB: soh_update.run_import,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the scheduled batch jobs.")
+    parser.add_argument("--once", action="store_true", help="Run the due days and exit")
+    parser.add_argument("--date", type=date.fromisoformat, help="Run every job for this day only (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    jobs = registered_jobs()
+    if args.date:
+        failed = [job for job, func in jobs.items() if run_job(job, func, args.date) != "success"]
+        sys.exit(1 if failed else 0)
+    if args.once:
+        results = run_due(jobs)
+        sys.exit(1 if any(status == "failed" for runs in results.values() for _, status in runs) else 0)
+    serve(jobs)
+
+
+if __name__ == "__main__":
+    main()
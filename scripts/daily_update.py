@@ -1,13 +1,26 @@
 import os
+import sys
 import base64
 import json
+import time
+from datetime import datetime, timedelta, timezone
 import pandas as pd
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import io
 
+# Allow imports of the shared modules at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scheduler
+import versions
+from db import copy_dataframe, get_engine
+from metrics import write_job_metrics
+
+JOB = "daily_import"
+
 def get_google_creds():
     """
     Decodes the base64-encoded service account JSON from SERVICE_ACCOUNT_BASE64
@@ -28,17 +41,24 @@ def get_drive_service():
     creds = get_google_creds()
     return build('drive', 'v3', credentials=creds)
 
-def download_latest_file(folder_id, destination):
+def download_latest_file(folder_id, destination, created_before=None):
     """
     Fetches the newest file in the specified Google Drive folder,
     downloads it, and saves it to 'destination' (e.g., "daily_products.xlsx").
+    If 'destination' is a directory, the file keeps its Drive name inside it.
+    With 'created_before' (a UTC datetime), only files created before it are
+    considered, so a catch-up run picks the file of its own day.
     Returns the local file path if successful, or None if the folder is empty.
     """
     service = get_drive_service()
 
+    query = f"'{folder_id}' in parents"
+    if created_before is not None:
+        query += f" and createdTime < '{created_before.strftime('%Y-%m-%dT%H:%M:%S')}Z'"
+
     # List the newest file in the folder
     results = service.files().list(
-        q=f"'{folder_id}' in parents",
+        q=query,
         orderBy="createdTime desc",
         pageSize=1,
         fields="files(id, name, createdTime)"
@@ -55,6 +75,9 @@ def download_latest_file(folder_id, destination):
 
     print(f"Found latest file: {file_name} (ID: {file_id}). Downloading...")
 
+    if os.path.isdir(destination):
+        destination = os.path.join(destination, file_name)
+
     request = service.files().get_media(fileId=file_id)
     with open(destination, 'wb') as fh:
         downloader = MediaIoBaseDownload(fh, request)
@@ -65,7 +88,111 @@ def download_latest_file(folder_id, destination):
     print(f"Downloaded '{file_name}' to '{destination}'.")
     return destination
 
-def upsert_products(df):
+PRODUCT_COLUMNS = ["product_id", "product_name", "vendor_name", "category", "barcode"]
+
+# Upsert SQL with ON CONFLICT
+UPSERT_SQL = text("""
+    INSERT INTO products (product_id, product_name, vendor_name, category, barcode)
+    VALUES (:pid, :pname, :vname, :cat, :bc)
+    ON CONFLICT (product_id)
+    DO UPDATE SET
+        product_name = EXCLUDED.product_name,
+        vendor_name  = EXCLUDED.vendor_name,
+        category     = EXCLUDED.category,
+        barcode      = EXCLUDED.barcode;
+""")
+
+# updated_at tells readers such as the product catalog (catalog.py) which rows changed
+PRODUCTS_SCHEMA_SQL = [
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+    "CREATE INDEX IF NOT EXISTS products_updated_at_idx ON products (updated_at)",
+]
+
+# Type-2 history of the products: one row per version, valid over [valid_from, valid_to).
+# The current version has valid_to NULL. It is created from 'products' by the first
+# import that finds it missing (so it has the same column types), with the existing
+# products seeded as valid since ever.
+PRODUCTS_HISTORY_SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS products_history AS
+    SELECT product_id, product_name, vendor_name, category, barcode,
+           '-infinity'::timestamptz AS valid_from, NULL::timestamptz AS valid_to
+    FROM products
+    """,
+    "ALTER TABLE products_history ALTER COLUMN valid_from SET NOT NULL",
+    # Point-in-time lookups: the last version of a product starting at or before a time
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS products_history_product_valid_from_idx
+    ON products_history (product_id, valid_from)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS products_history_current_idx
+    ON products_history (product_id) WHERE valid_to IS NULL
+    """,
+    """
+    CREATE OR REPLACE VIEW products_current AS
+    SELECT product_id, product_name, vendor_name, category, barcode, valid_from
+    FROM products_history
+    WHERE valid_to IS NULL
+    """,
+    # SELECT * FROM products_as_of('2024-06-30') (every product), or with a product_id
+    # filter, which the (product_id, valid_from) index answers directly
+    """
+    CREATE OR REPLACE FUNCTION products_as_of(at timestamptz)
+    RETURNS SETOF products_history
+    LANGUAGE sql STABLE AS $$
+        SELECT * FROM products_history
+        WHERE valid_from <= at AND (valid_to IS NULL OR valid_to > at)
+    $$
+    """,
+]
+
+# One statement for the staging table: closes the current versions that changed
+# and inserts the new versions (of changed and new products), both as of the
+# transaction's timestamp. Both parts read the history as it was before the
+# statement, so the rows they touch never overlap.
+PRODUCTS_HISTORY_MERGE_SQL = """
+    WITH changed AS (
+        SELECT s.product_id, s.product_name, s.vendor_name, s.category, s.barcode,
+               h.product_id IS NOT NULL AS has_current
+        FROM products_staging s
+        LEFT JOIN products_history h
+            ON h.product_id = s.product_id AND h.valid_to IS NULL
+        WHERE h.product_id IS NULL
+           OR (h.product_name, h.vendor_name, h.category, h.barcode)
+              IS DISTINCT FROM (s.product_name, s.vendor_name, s.category, s.barcode)
+    ), closed AS (
+        UPDATE products_history h
+        SET valid_to = now()
+        FROM changed c
+        WHERE c.has_current AND h.product_id = c.product_id AND h.valid_to IS NULL
+    )
+    INSERT INTO products_history (product_id, product_name, vendor_name, category, barcode, valid_from)
+    SELECT product_id, product_name, vendor_name, category, barcode, now()
+    FROM changed
+"""
+
+def _barcodes(df):
+    """
+    The barcodes of 'df', None where they are missing or blank. COPY (FORMAT csv)
+    loads an empty field as NULL, so every path stores a missing barcode as NULL
+    and the change detection of the merge and of products_history agree.
+    """
+    if "barcode" not in df.columns:
+        return None
+    values = df["barcode"].astype(object)
+    return values.where(values.notna() & (values.astype(str).str.strip() != ""), None)
+
+def _product_frame(df):
+    """
+    Returns the product columns of 'df' with a NULL barcode where it's missing
+    and only the last row of every product_id (the same row a row-by-row upsert keeps).
+    """
+    df = df.assign(barcode=_barcodes(df))
+    df = df[PRODUCT_COLUMNS]
+    return df.drop_duplicates(subset="product_id", keep="last")
+
+def upsert_products_rowwise(df, engine=None):
     """
     Takes a DataFrame with columns:
       - product_id
@@ -73,78 +200,145 @@ def upsert_products(df):
       - vendor_name
       - category
       - barcode
-    and upserts each row into the 'products' table in the PostgreSQL database
-    specified by DATABASE_URL.
-    """
-    # Get the database URL from environment variables
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
-        raise ValueError("DATABASE_URL environment variable is not set!")
-
-    # Ensure the URL uses the correct dialect prefix
-    if db_url.startswith("postgres://"):
-        db_url = db_url.replace("postgres://", "postgresql://", 1)
-
-    # Create the SQLAlchemy engine
-    engine = create_engine(db_url)
-
-    # Upsert SQL with ON CONFLICT
-    sql = text("""
-        INSERT INTO products (product_id, product_name, vendor_name, category, barcode)
-        VALUES (:pid, :pname, :vname, :cat, :bc)
-        ON CONFLICT (product_id)
-        DO UPDATE SET
-            product_name = EXCLUDED.product_name,
-            vendor_name  = EXCLUDED.vendor_name,
-            category     = EXCLUDED.category,
-            barcode      = EXCLUDED.barcode;
-    """)
+    and upserts each row into the 'products' table, one statement per row.
+    Kept as the baseline for benchmarks/bench_import.py.
+    """
+    engine = engine or get_engine()
+    df = df.assign(barcode=_barcodes(df))
 
     with engine.begin() as conn:
         for _, row in df.iterrows():
-            conn.execute(sql, {
+            conn.execute(UPSERT_SQL, {
                 "pid": row["product_id"],
                 "pname": row["product_name"],
                 "vname": row["vendor_name"],
                 "cat": row["category"],
-                "bc":  row.get("barcode", "")
+                "bc":  row["barcode"]
             })
 
-def main():
+def upsert_products(df, engine=None, batch_size=10_000):
+    """
+    Takes a DataFrame with columns:
+      - product_id
+      - product_name
+      - vendor_name
+      - category
+      - barcode
+    and upserts it into the 'products' table in the database specified by DATABASE_URL.
+    On PostgreSQL the rows are COPYed into a staging table and merged with a single
+    INSERT ... SELECT ... ON CONFLICT, which only rewrites (and stamps with
+    updated_at) the products that changed; other databases get batched executemany calls.
+    On PostgreSQL the staging table also maintains 'products_history' (type-2
+    history, see PRODUCTS_HISTORY_SCHEMA_SQL) with one statement, before the merge.
+    The 'products' dataset version is bumped in the same transaction (see versions.py).
     """
-    Main script logic:
-    1. Read FOLDER_ID from environment.
-    2. Download the newest file from Google Drive, saving as 'daily_products.xlsx'.
-    3. Read the .xlsx file.
-    4. Rename columns to match the screenshot structure.
-    5. Upsert into the DB.
+    engine = engine or get_engine()
+    df = _product_frame(df)
+
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            for statement in PRODUCTS_SCHEMA_SQL:
+                conn.execute(text(statement))
+            conn.execute(text("""
+                CREATE TEMP TABLE products_staging
+                (LIKE products INCLUDING DEFAULTS) ON COMMIT DROP
+            """))
+            copy_dataframe(conn, df, "products_staging", PRODUCT_COLUMNS)
+            # Temp tables are never auto-analyzed: give the planner the row count for the joins
+            conn.execute(text("ANALYZE products_staging"))
+            if conn.execute(text("SELECT to_regclass('products_history')")).scalar() is None:
+                for statement in PRODUCTS_HISTORY_SCHEMA_SQL:
+                    conn.execute(text(statement))
+            conn.execute(text(PRODUCTS_HISTORY_MERGE_SQL))
+            conn.execute(text("""
+                INSERT INTO products (product_id, product_name, vendor_name, category, barcode)
+                SELECT product_id, product_name, vendor_name, category, barcode
+                FROM products_staging
+                ON CONFLICT (product_id)
+                DO UPDATE SET
+                    product_name = EXCLUDED.product_name,
+                    vendor_name  = EXCLUDED.vendor_name,
+                    category     = EXCLUDED.category,
+                    barcode      = EXCLUDED.barcode,
+                    updated_at   = now()
+                WHERE (products.product_name, products.vendor_name, products.category, products.barcode)
+                    IS DISTINCT FROM
+                    (EXCLUDED.product_name, EXCLUDED.vendor_name, EXCLUDED.category, EXCLUDED.barcode);
+            """))
+        else:
+            params = df.rename(columns={
+                "product_id": "pid",
+                "product_name": "pname",
+                "vendor_name": "vname",
+                "category": "cat",
+                "barcode": "bc",
+            }).to_dict("records")
+            for start in range(0, len(params), batch_size):
+                conn.execute(UPSERT_SQL, params[start:start + batch_size])
+        versions.bump(conn, versions.PRODUCTS)
+
+COLUMN_MAP = {
+    "BARCODE": "barcode",
+    "ITEM ID": "product_id",
+    "nama item": "product_name",
+    "category": "category",
+    "vendor_name": "vendor_name"
+}
+
+def read_products(path):
+    """
+    Reads the downloaded .xlsx file and renames its columns to the products table's.
+    """
+    # Read the XLSX file using the openpyxl engine
+    df = pd.read_excel(path, engine="openpyxl")
+    return df.rename(columns=COLUMN_MAP)
+
+def run_import(run):
+    """
+    The import of one day, run by the scheduler (see scheduler.py):
+    1. Download the newest file created before the end of the run date from
+       the FOLDER_ID Google Drive folder, saving as 'daily_products.xlsx'.
+    2. Read the .xlsx file and rename its columns.
+    3. Upsert into the DB.
+    4. Write throughput metrics for the textfile collector.
+    Each stage is retried on transient errors; the upsert is one transaction.
     """
     folder_id = os.getenv("FOLDER_ID")
     if not folder_id:
         raise ValueError("Missing FOLDER_ID environment variable!")
 
-    # Adjust the destination file to an XLSX file
-    local_file = download_latest_file(folder_id, "daily_products.xlsx")
+    start = time.perf_counter()
+    day_end = datetime.combine(run.run_date + timedelta(days=1), datetime.min.time())
+    local_file = run.stage("download", download_latest_file, folder_id, "daily_products.xlsx",
+                           created_before=day_end)
     if not local_file:
-        print("No file downloaded. Exiting.")
-        return
+        raise FileNotFoundError(f"No file created before {day_end:%Y-%m-%d} in folder {folder_id}")
 
-    # Read the XLSX file using the openpyxl engine
-    df = pd.read_excel(local_file, engine="openpyxl")
-
-    # Rename columns to match the screenshot
-    column_map = {
-        "BARCODE": "barcode",
-        "ITEM ID": "product_id",
-        "nama item": "product_name",
-        "category": "category",
-        "vendor_name": "vendor_name"
-    }
-    df.rename(columns=column_map, inplace=True)
-
-    # Upsert to DB
-    upsert_products(df)
-    print("Daily product update complete!")
+    df = run.stage("read", read_products, local_file)
+    run.stage("upsert", upsert_products, df)
+    run.rows = len(df)
+    duration = time.perf_counter() - start
+
+    # Throughput metrics for the node_exporter textfile collector (METRICS_TEXTFILE_DIR)
+    upsert_seconds = run.timings["upsert"]
+    write_job_metrics(JOB, {
+        "rows_processed": len(df),
+        "rows_per_second": len(df) / upsert_seconds if upsert_seconds else 0,
+        "download_bytes": os.path.getsize(local_file),
+        "download_duration_seconds": run.timings["download"],
+        "duration_seconds": duration,
+    })
+    print(f"Daily product update complete! {len(df):,} rows in {duration:.1f}s")
+
+def main():
+    """
+    Runs today's import once through the scheduler: under the job's lock,
+    with retries, and recorded in job_runs. 'python scheduler.py' also
+    catches up on the days missed.
+    """
+    status = scheduler.run_job(JOB, run_import, datetime.now(timezone.utc).date())
+    if status == "failed":
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
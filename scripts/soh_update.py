@@ -0,0 +1,310 @@
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from sqlalchemy import text
+
+# Allow imports of the shared modules at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scheduler
+import versions
+from convert import read_xls
+from db import copy_dataframe, get_engine
+from daily_update import download_latest_file
+from metrics import write_job_metrics
+
+JOB = "soh_import"
+
+# 'soh gc 20241226.xls' -> store code 'GC', snapshot date 2024-12-26
+SOH_FILE_PATTERN = re.compile(r"soh[\s_]+(?P<store>.+?)[\s_]+(?P<date>\d{8})", re.IGNORECASE)
+
+# SOH export headers (matched case-insensitively) -> stock_snapshots columns
+COLUMN_MAP = {
+    "item id": "product_id",
+    "itemid": "product_id",
+    "store": "store",
+    "qty": "quantity",
+    "soh": "quantity",
+    "quantity": "quantity",
+    "stock value": "stock_value",
+    "value": "stock_value",
+}
+
+SNAPSHOT_COLUMNS = ["product_id", "store", "snapshot_date", "quantity", "stock_value"]
+
+SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS stock_snapshots (
+        product_id    TEXT NOT NULL,
+        store         TEXT NOT NULL,
+        snapshot_date DATE NOT NULL,
+        quantity      NUMERIC,
+        stock_value   NUMERIC,
+        product_name  TEXT,
+        vendor_name   TEXT,
+        category      TEXT,
+        loaded_at     TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (product_id, store, snapshot_date)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS stock_snapshots_date_store_idx ON stock_snapshots (snapshot_date, store)",
+    """
+    CREATE TABLE IF NOT EXISTS stock_snapshot_summary (
+        store         TEXT NOT NULL,
+        snapshot_date DATE NOT NULL,
+        category      TEXT NOT NULL,
+        quantity      NUMERIC,
+        stock_value   NUMERIC,
+        products      INTEGER,
+        refreshed_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (store, snapshot_date, category)
+    )
+    """,
+    # Store codes of the SOH exports -> the 'Store Name' of the sales workbooks, e.g.
+    # INSERT INTO store_codes VALUES ('GC', 'GRAND CITY')
+    """
+    CREATE TABLE IF NOT EXISTS store_codes (
+        code       TEXT PRIMARY KEY,
+        store_name TEXT NOT NULL
+    )
+    """,
+]
+
+# Digits that always fit the integer key types, for casting SOH item ids to them
+INTEGER_KEY_DIGITS = {"smallint": 4, "integer": 9, "bigint": 18}
+
+
+def parse_soh_filename(path):
+    """
+    Extracts (store code, snapshot_date) from an SOH export name such as 'soh gc 20241226.xls'.
+    Returns (None, None) if the name doesn't follow that pattern.
+    """
+    match = SOH_FILE_PATTERN.search(os.path.basename(path))
+    if not match:
+        return None, None
+    return match.group("store").strip().upper(), datetime.strptime(match.group("date"), "%Y%m%d").date()
+
+
+def read_soh_file(path):
+    """
+    Reads one SOH export (.xls via xlrd, anything else via pandas) and returns
+    a DataFrame with the stock_snapshots columns:
+      - product_id, store, snapshot_date, quantity, stock_value
+    Store and snapshot date come from the file name unless the sheet has them.
+    """
+    if path.lower().endswith(".xls"):
+        df = read_xls(path)
+    else:
+        df = pd.read_excel(path, engine="openpyxl")
+
+    df.columns = [str(col).strip() for col in df.columns]
+    rename = {col: COLUMN_MAP[col.lower()] for col in df.columns if col.lower() in COLUMN_MAP}
+    df = df.rename(columns=rename)
+    df = df.loc[:, ~df.columns.duplicated()]
+
+    if "product_id" not in df.columns:
+        raise ValueError(f"{path}: no item id column found in {list(df.columns)}")
+
+    store, snapshot_date = parse_soh_filename(path)
+    if "store" not in df.columns:
+        if store is None:
+            raise ValueError(f"{path}: no store column and no store in the file name")
+        df["store"] = store
+    if "snapshot_date" not in df.columns:
+        if snapshot_date is None:
+            raise ValueError(f"{path}: no snapshot date in the file name")
+        df["snapshot_date"] = snapshot_date
+
+    for col in ["quantity", "stock_value"]:
+        if col not in df.columns:
+            df[col] = None
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    df["product_id"] = df["product_id"].astype(str).str.strip()
+    df = df[df["product_id"].ne("") & df["product_id"].ne("nan")]
+    return df[SNAPSHOT_COLUMNS]
+
+
+def apply_store_names(df, store_names):
+    """
+    Replaces the store codes of 'df' (matched case-insensitively) with their
+    store names from 'store_names' ({code: name}, see the store_codes table).
+    Returns (frame, stores that are neither a known code nor a known name).
+    """
+    codes = df["store"].astype(str).str.strip()
+    names = codes.str.upper().map({code.upper(): name for code, name in store_names.items()})
+    df = df.assign(store=names.fillna(codes))
+    unknown = sorted(set(df["store"]) - set(store_names.values()))
+    return df, unknown
+
+
+def _product_key(conn):
+    """
+    SQL expression of the staged item id (s.product_id) cast to the type of
+    products.product_id, so the join can use the products primary key.
+    Ids that can't be of that type become NULL (no product).
+    """
+    key_type = conn.execute(text("""
+        SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = 'products'::regclass AND attname = 'product_id'
+    """)).scalar()
+    if key_type in ("text", "character varying") or key_type.startswith(("character varying(", "character(")):
+        return "s.product_id"
+    if key_type in INTEGER_KEY_DIGITS:
+        digits = INTEGER_KEY_DIGITS[key_type]
+        return f"CASE WHEN s.product_id ~ '^[+-]?[0-9]{{1,{digits}}}$' THEN s.product_id::{key_type} END"
+    return f"s.product_id::{key_type}"
+
+
+def load_snapshots(df):
+    """
+    Loads SOH rows into stock_snapshots, keyed by (product_id, store, snapshot_date):
+    1. Replace the store codes by store names (store_codes) and COPY the rows
+       into a temporary staging table.
+    2. Join the staging table against 'products' in one INSERT ... SELECT
+       (upserting rows that were loaded before).
+    3. Rebuild the per-category summary for the loaded (store, date) pairs.
+    4. Bump the 'stock_snapshots' dataset version (see versions.py), so the
+       dashboards drop their cached snapshots when the load commits.
+    Returns the number of snapshot rows written.
+    """
+    engine = get_engine()
+
+    with engine.begin() as conn:
+        for statement in SCHEMA_SQL:
+            conn.execute(text(statement))
+
+        store_names = dict(conn.execute(text("SELECT code, store_name FROM store_codes")).all())
+        df, unknown = apply_store_names(df, store_names)
+        if unknown:
+            print(f"Warning: no store_codes entry for {unknown}; "
+                  "these snapshots won't match the sales workbook's store names.")
+
+        conn.execute(text("""
+            CREATE TEMP TABLE soh_staging (
+                product_id    TEXT,
+                store         TEXT,
+                snapshot_date DATE,
+                quantity      NUMERIC,
+                stock_value   NUMERIC
+            ) ON COMMIT DROP
+        """))
+        copy_dataframe(conn, df, "soh_staging", SNAPSHOT_COLUMNS)
+
+        product_key = _product_key(conn)
+        result = conn.execute(text(f"""
+            INSERT INTO stock_snapshots (product_id, store, snapshot_date, quantity, stock_value,
+                                         product_name, vendor_name, category)
+            SELECT s.product_id, s.store, s.snapshot_date, s.quantity, s.stock_value,
+                   p.product_name, p.vendor_name, p.category
+            FROM (
+                SELECT product_id, store, snapshot_date,
+                       SUM(quantity) AS quantity, SUM(stock_value) AS stock_value
+                FROM soh_staging
+                GROUP BY product_id, store, snapshot_date
+            ) s
+            LEFT JOIN products p ON p.product_id = {product_key}
+            ON CONFLICT (product_id, store, snapshot_date)
+            DO UPDATE SET
+                quantity     = EXCLUDED.quantity,
+                stock_value  = EXCLUDED.stock_value,
+                product_name = EXCLUDED.product_name,
+                vendor_name  = EXCLUDED.vendor_name,
+                category     = EXCLUDED.category,
+                loaded_at    = now();
+        """))
+        rows = result.rowcount
+
+        conn.execute(text("""
+            DELETE FROM stock_snapshot_summary t
+            USING (SELECT DISTINCT store, snapshot_date FROM soh_staging) k
+            WHERE t.store = k.store AND t.snapshot_date = k.snapshot_date;
+        """))
+        conn.execute(text("""
+            INSERT INTO stock_snapshot_summary (store, snapshot_date, category, quantity, stock_value, products)
+            SELECT s.store, s.snapshot_date, COALESCE(s.category, 'Unknown'),
+                   SUM(s.quantity), SUM(s.stock_value), COUNT(*)
+            FROM stock_snapshots s
+            JOIN (SELECT DISTINCT store, snapshot_date FROM soh_staging) k
+              ON s.store = k.store AND s.snapshot_date = k.snapshot_date
+            GROUP BY s.store, s.snapshot_date, COALESCE(s.category, 'Unknown');
+        """))
+        versions.bump(conn, versions.STOCK_SNAPSHOTS)
+    return rows
+
+
+def read_soh_files(paths):
+    """
+    read_soh_file() of every path, concatenated.
+    """
+    frames = []
+    for path in paths:
+        df = read_soh_file(path)
+        print(f"Read {len(df):,} SOH rows from '{path}'.")
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def run_import(run):
+    """
+    The SOH import of one day, run by the scheduler (see scheduler.py):
+    1. Download the newest file created before the end of the run date from
+       the SOH_FOLDER_ID Google Drive folder into SOH_DOWNLOAD_DIR.
+    2. Read it into (product_id, store, snapshot_date, quantity, stock_value) rows.
+    3. Bulk-load them into stock_snapshots joined with products.
+    4. Write throughput metrics for the textfile collector.
+    Each stage is retried on transient errors; the load is one transaction.
+    """
+    folder_id = os.getenv("SOH_FOLDER_ID")
+    if not folder_id:
+        raise ValueError("Missing SOH_FOLDER_ID environment variable!")
+
+    # Keep the Drive file name, it carries the store and snapshot date
+    download_dir = os.getenv("SOH_DOWNLOAD_DIR", "soh_downloads")
+    os.makedirs(download_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    day_end = datetime.combine(run.run_date + timedelta(days=1), datetime.min.time())
+    local_file = run.stage("download", download_latest_file, folder_id, download_dir, created_before=day_end)
+    if not local_file:
+        raise FileNotFoundError(f"No file created before {day_end:%Y-%m-%d} in folder {folder_id}")
+
+    df = run.stage("read", read_soh_files, [local_file])
+    rows = run.stage("load", load_snapshots, df)
+    run.rows = rows
+    duration = time.perf_counter() - start
+
+    load_seconds = run.timings["load"]
+    write_job_metrics(JOB, {
+        "rows_processed": rows,
+        "rows_per_second": rows / load_seconds if load_seconds else 0,
+        "download_bytes": os.path.getsize(local_file),
+        "download_duration_seconds": run.timings["download"],
+        "duration_seconds": duration,
+    })
+    print(f"SOH ingestion complete! {rows:,} snapshot rows written in {duration:.1f}s.")
+
+
+def main():
+    """
+    Loads the SOH files given on the command line, or else runs today's
+    import once through the scheduler: under the job's lock, with retries,
+    and recorded in job_runs. 'python scheduler.py' also catches up on the
+    days missed.
+    """
+    paths = sys.argv[1:]
+    if paths:
+        rows = load_snapshots(read_soh_files(paths))
+        print(f"SOH ingestion complete! {rows:,} snapshot rows written.")
+        return
+
+    status = scheduler.run_job(JOB, run_import, datetime.now(timezone.utc).date())
+    if status == "failed":
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+The Polars and DuckDB backends must give the same results as pandas for
+every step of dashboard/backends.py.
+"""
+import pandas as pd
+import pytest
+
+from benchmarks.bench_backends import _filters, messy_frame
+from benchmarks.synthetic import make_sales_frame
+from dashboard import backends
+
+FRAMES = {
+    "messy": messy_frame,
+    "synthetic": lambda: make_sales_frame(5_000, seed=1),
+    "synthetic_small": lambda: make_sales_frame(37, stores=3, months=12, seed=2),
+}
+
+
+@pytest.fixture(params=["polars", "duckdb"])
+def backend(request):
+    pytest.importorskip(request.param)
+    return request.param
+
+
+@pytest.fixture(params=list(FRAMES))
+def raw(request):
+    return FRAMES[request.param]()
+
+
+def test_clean(backend, raw):
+    expected = backends.clean(raw.copy(), "pandas")
+    pd.testing.assert_frame_equal(backends.clean(raw.copy(), backend), expected)
+
+
+def test_filter(backend, raw):
+    cleaned = backends.clean(raw.copy(), "pandas")
+    filters = _filters(cleaned)
+    expected = backends.filter_rows(cleaned, filters, "pandas")
+    pd.testing.assert_frame_equal(backends.filter_rows(cleaned, filters, backend), expected)
+
+
+def test_filter_without_matches(backend, raw):
+    cleaned = backends.clean(raw.copy(), "pandas")
+    filters = {"Store Name": ["No such store"]}
+    expected = backends.filter_rows(cleaned, filters, "pandas")
+    assert expected.empty
+    pd.testing.assert_frame_equal(backends.filter_rows(cleaned, filters, backend), expected)
+
+
+def test_aggregate(backend, raw):
+    cleaned = backends.clean(raw.copy(), "pandas")
+    expected = backends.aggregate(cleaned, "pandas")
+    pd.testing.assert_frame_equal(backends.aggregate(cleaned, backend), expected)
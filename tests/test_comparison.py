@@ -0,0 +1,36 @@
+"""
+The month matrices of dashboard/comparison.py must match the pivot tables they replaced.
+"""
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_sales_frame
+from dashboard import aggregates, backends, comparison
+
+
+@pytest.fixture(scope="module")
+def cleaned():
+    return backends.clean(make_sales_frame(3_000, stores=4, months=14, seed=3), "pandas")
+
+
+@pytest.mark.parametrize("index", ["Group", "Store Name", "Grouping"])
+def test_sales_stock_table_matches_pivots(cleaned, index):
+    data = cleaned.assign(Month_Display=cleaned['Date'].dt.strftime('%b %Y'))
+    sales = data.pivot_table(values="Penjualan", index=index, columns="Month_Display", aggfunc="sum", fill_value=0)
+    stock = data.pivot_table(values="Stock Value", index=index, columns="Month_Display", aggfunc="sum", fill_value=0)
+    months = sorted(sales.columns.union(stock.columns), key=lambda x: datetime.strptime(x, '%b %Y'))
+    expected = pd.merge(sales.reindex(columns=months, fill_value=0).reset_index(),
+                        stock.reindex(columns=months, fill_value=0).reset_index(),
+                        on=index, how='outer', suffixes=('_Sales', '_Stock')).fillna(0)
+    expected.columns.name = None
+
+    table, month_names = comparison.sales_stock_table(aggregates.monthly_aggregates(data), index)
+
+    assert month_names == months
+    pd.testing.assert_frame_equal(table[expected.columns], expected, check_dtype=False)
+    pct = table[[f"Stock%_{month}" for month in months]].to_numpy()
+    ratio = (expected[[f"{m}_Stock" for m in months]].to_numpy() /
+             expected[[f"{m}_Sales" for m in months]].to_numpy() * 100)
+    pd.testing.assert_frame_equal(pd.DataFrame(pct), pd.DataFrame(ratio))
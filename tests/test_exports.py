@@ -0,0 +1,91 @@
+"""
+Evicted exports of dashboard/exports.py must not leave their files behind,
+including exports that were still being written when they were evicted.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import pytest
+
+from dashboard import exports
+
+
+@pytest.fixture(autouse=True)
+def export_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(exports, "_jobs", OrderedDict())
+    monkeypatch.setattr(exports, "MAX_EXPORTS", 1)
+    return tmp_path
+
+
+@pytest.fixture
+def paused(monkeypatch):
+    """
+    Background exports (every export) wait for the returned event before writing.
+    """
+    release = threading.Event()
+    write_export = exports.write_export
+
+    def paused_write(tables, fmt, path):
+        assert release.wait(30)
+        return write_export(tables, fmt, path)
+
+    monkeypatch.setattr(exports, "BACKGROUND_ROWS", 0)
+    monkeypatch.setattr(exports, "write_export", paused_write)
+    return release
+
+
+def _table(n):
+    return {"Sales": pd.DataFrame({"Store Name": ["A", "B"], "Penjualan": [n, n + 1]})}
+
+
+def _path(tables, fmt="CSV"):
+    return os.path.join(exports.EXPORT_DIR, exports.fingerprint(tables) + exports.FORMATS[fmt][0])
+
+
+def _wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_evicted_export_file_is_removed():
+    first = exports.request_export(_table(1), "CSV")
+    assert os.path.exists(first.result())
+
+    second = exports.request_export(_table(2), "CSV")
+    assert not os.path.exists(first.result())
+    assert os.path.exists(second.result())
+
+
+def test_evicted_running_export_removes_its_file_when_done(paused, export_dir):
+    first = exports.request_export(_table(1), "CSV")
+    second = exports.request_export(_table(2), "CSV")
+    assert not first.done()
+
+    paused.set()
+    assert first.result(timeout=30) == _path(_table(1))
+    assert second.result(timeout=30) == _path(_table(2))
+    assert _wait_until(lambda: not os.path.exists(first.result()))
+    assert os.path.exists(second.result())
+    assert sorted(os.listdir(export_dir)) == [os.path.basename(second.result())]
+
+
+def test_export_requested_again_keeps_its_file(paused):
+    first = exports.request_export(_table(1), "CSV")
+    exports.request_export(_table(2), "CSV")
+    # Evicts the second export, and writes the first one's path again
+    again = exports.request_export(_table(1), "CSV")
+    assert again is not first
+
+    paused.set()
+    assert first.result(timeout=30) == again.result(timeout=30)
+    time.sleep(0.1)
+    assert os.path.exists(again.result())
+    assert exports.request_export(_table(1), "CSV", start=False) is again
@@ -0,0 +1,100 @@
+"""
+Appends to the stored history of dashboard/history.py: replacing a month only
+replaces the uploaded stores' rows, and concurrent appends don't lose updates.
+"""
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_sales_frame
+from dashboard import aggregates, backends, history
+from locks import file_lock
+
+
+@pytest.fixture(scope="module")
+def cleaned():
+    return backends.clean(make_sales_frame(2_000, stores=3, months=4, seed=5), "pandas")
+
+
+def _month(data, month):
+    return data[data['Date'].dt.month == month]
+
+
+def _sorted(data):
+    return data.sort_values(['Date', 'Store Name', 'Group', 'Grouping']).reset_index(drop=True)
+
+
+def test_replace_keeps_other_stores_of_the_month(cleaned, tmp_path):
+    root = str(tmp_path)
+    history.append_month(cleaned, root=root)
+    stores = sorted(cleaned['Store Name'].unique())
+
+    upload = _month(cleaned, 2)
+    upload = upload[upload['Store Name'] == stores[0]].assign(Penjualan=1.0)
+    manifest = history.append_month(upload, root=root, replace=True)
+
+    stored = history.load_history(root)
+    assert len(stored) == len(cleaned)
+    replaced = _month(stored, 2)
+    assert (replaced.loc[replaced['Store Name'] == stores[0], 'Penjualan'] == 1.0).all()
+
+    expected = cleaned[~((cleaned['Date'].dt.month == 2) & (cleaned['Store Name'] == stores[0]))]
+    kept = stored[~((stored['Date'].dt.month == 2) & (stored['Store Name'] == stores[0]))]
+    pd.testing.assert_frame_equal(_sorted(kept[expected.columns]), _sorted(expected), check_dtype=False)
+
+    # The month's aggregates are rebuilt from the merged rows
+    stored_aggregates = history.read_aggregates(root, months=[2])
+    expected_aggregates = aggregates.monthly_aggregates(_month(stored, 2))
+    assert stored_aggregates['Penjualan'].sum() == pytest.approx(expected_aggregates['Penjualan'].sum())
+    assert set(stored_aggregates['Store Name']) == set(stores)
+    assert manifest["version"] == 2
+
+
+def test_stored_month_needs_replace(cleaned, tmp_path):
+    root = str(tmp_path)
+    history.append_month(_month(cleaned, 1), root=root)
+    with pytest.raises(history.AppendError, match="Months already stored"):
+        history.append_month(_month(cleaned, 1), root=root)
+
+
+def test_append_waits_for_the_lock(cleaned, tmp_path):
+    root = str(tmp_path)
+    done = threading.Event()
+
+    def append():
+        history.append_month(_month(cleaned, 1), root=root)
+        done.set()
+
+    with file_lock(os.path.join(root, history.LOCK_FILE)):
+        thread = threading.Thread(target=append)
+        thread.start()
+        assert not done.wait(0.5)
+        assert history.read_manifest(root) is None
+    thread.join(timeout=30)
+    assert done.is_set()
+    assert history.read_manifest(root)["partitions"] == [[2022, 1]]
+
+
+def test_concurrent_appends_keep_every_month(cleaned, tmp_path):
+    root = str(tmp_path)
+    errors = []
+
+    def append(month):
+        try:
+            history.append_month(_month(cleaned, month), root=root)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=append, args=(month,)) for month in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+
+    assert errors == []
+    manifest = history.read_manifest(root)
+    assert manifest["partitions"] == [[2022, month] for month in range(1, 5)]
+    assert manifest["version"] == 4
+    assert len(history.load_history(root)) == len(cleaned)
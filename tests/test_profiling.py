@@ -0,0 +1,60 @@
+"""
+Memory tracking of dashboard/profiling.py must end with the rerun, however it ends.
+"""
+import tracemalloc
+
+import pytest
+
+from dashboard import profiling
+
+
+class Interrupted(BaseException):
+    """
+    Stands in for Streamlit's RerunException / StopException.
+    """
+
+
+@pytest.fixture(autouse=True)
+def no_tracing():
+    if tracemalloc.is_tracing():
+        pytest.skip("tracemalloc is already tracing (PYTHONTRACEMALLOC)")
+    yield
+    tracemalloc.stop()
+
+
+def test_interrupted_rerun_stops_tracing():
+    with pytest.raises(Interrupted):
+        with profiling.profiled(track_memory=True) as profile:
+            with profile.span("stage"):
+                assert tracemalloc.is_tracing()
+                raise Interrupted()
+    assert not tracemalloc.is_tracing()
+    assert profile.total_seconds is not None
+
+
+def test_next_rerun_owns_tracing_after_an_interrupted_one():
+    with pytest.raises(Interrupted):
+        with profiling.profiled(track_memory=True):
+            raise Interrupted()
+    with profiling.profiled(track_memory=True) as profile:
+        with profile.span("stage"):
+            bytearray(1_000_000)
+    assert not tracemalloc.is_tracing()
+    assert profile.spans[0]["peak_bytes"] >= 1_000_000
+
+
+def test_tracing_lasts_until_the_last_profile_finishes():
+    first = profiling.Profile(track_memory=True)
+    second = profiling.Profile(track_memory=True)
+    first.finish()
+    assert tracemalloc.is_tracing()
+    second.finish()
+    assert not tracemalloc.is_tracing()
+
+
+def test_log_finishes_the_profile():
+    with profiling.profiled(track_memory=True) as profile:
+        record = profile.log(data_source="test")
+        assert not tracemalloc.is_tracing()
+    assert record["event"] == "dashboard_rerun"
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,115 @@
+"""
+The scheduler runs every registered job (the daily product import and the
+SOH import) through its lock, stages and job_runs record.
+"""
+import os
+import sys
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+import scheduler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import daily_update  # noqa: E402
+import soh_update  # noqa: E402
+
+RUN_DATE = date(2024, 12, 26)
+NOW = datetime(2024, 12, 26, 12, 0)
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler, "LOCK_DIR", str(tmp_path))
+    monkeypatch.delenv("METRICS_TEXTFILE_DIR", raising=False)
+    return create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+
+
+@pytest.fixture
+def imports(tmp_path, monkeypatch):
+    """
+    Both imports with Google Drive and the database replaced; returns {job: rows loaded}.
+    """
+    monkeypatch.setenv("FOLDER_ID", "products-folder")
+    monkeypatch.setenv("SOH_FOLDER_ID", "soh-folder")
+    monkeypatch.setenv("SOH_DOWNLOAD_DIR", str(tmp_path / "soh"))
+
+    products_file = tmp_path / "daily_products.xlsx"
+    products_file.write_bytes(b"products")
+    soh_file = tmp_path / "soh gc 20241226.xlsx"
+    pd.DataFrame({"Item ID": ["1001", "1002"], "Qty": [5, 2], "Stock Value": [50_000, 12_500]}).to_excel(
+        soh_file, index=False)
+
+    loaded = {}
+    downloads = []
+
+    def download(files):
+        def download_latest_file(folder_id, destination, created_before=None):
+            downloads.append((folder_id, created_before))
+            return str(files[folder_id]) if folder_id in files else None
+        return download_latest_file
+
+    def upsert_products(df):
+        loaded[daily_update.JOB] = len(df)
+
+    def load_snapshots(df):
+        loaded[soh_update.JOB] = len(df)
+        return len(df)
+
+    monkeypatch.setattr(daily_update, "download_latest_file", download({"products-folder": products_file}))
+    monkeypatch.setattr(daily_update, "read_products", lambda path: pd.DataFrame({"product_id": [1, 2, 3]}))
+    monkeypatch.setattr(daily_update, "upsert_products", upsert_products)
+    monkeypatch.setattr(soh_update, "download_latest_file", download({"soh-folder": soh_file}))
+    monkeypatch.setattr(soh_update, "load_snapshots", load_snapshots)
+    return loaded, downloads
+
+
+def _runs(engine):
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT job, run_date, status, rows_processed, error FROM job_runs ORDER BY job"
+        )).all()
+
+
+def test_both_imports_are_registered():
+    jobs = scheduler.registered_jobs()
+    assert jobs == {
+        daily_update.JOB: daily_update.run_import,
+        soh_update.JOB: soh_update.run_import,
+    }
+    assert daily_update.JOB != soh_update.JOB
+
+
+def test_due_days_of_both_jobs_run(engine, imports):
+    loaded, downloads = imports
+
+    results = scheduler.run_due(scheduler.registered_jobs(), engine, now=NOW)
+
+    assert results == {daily_update.JOB: [(RUN_DATE, "success")], soh_update.JOB: [(RUN_DATE, "success")]}
+    assert loaded == {daily_update.JOB: 3, soh_update.JOB: 2}
+    # Both downloads only look at files created before the end of the run date
+    assert [created_before for _, created_before in downloads] == [datetime(2024, 12, 27)] * 2
+    assert [tuple(row) for row in _runs(engine)] == [
+        (daily_update.JOB, "2024-12-26", "success", 3, None),
+        (soh_update.JOB, "2024-12-26", "success", 2, None),
+    ]
+    # Nothing is due any more
+    assert scheduler.run_due(scheduler.registered_jobs(), engine, now=NOW) == {
+        daily_update.JOB: [], soh_update.JOB: []
+    }
+
+
+def test_failed_job_does_not_block_the_other(engine, imports, monkeypatch):
+    monkeypatch.setenv("SOH_FOLDER_ID", "empty-folder")
+
+    results = scheduler.run_due(scheduler.registered_jobs(), engine, now=NOW)
+
+    assert results == {daily_update.JOB: [(RUN_DATE, "success")], soh_update.JOB: [(RUN_DATE, "failed")]}
+    runs = {row.job: row for row in _runs(engine)}
+    assert runs[soh_update.JOB].error.startswith("FileNotFoundError")
+    # The failed day stays due
+    assert scheduler.due_dates(soh_update.JOB, engine, now=NOW) == [RUN_DATE]
+    assert scheduler.due_dates(daily_update.JOB, engine, now=NOW) == []
@@ -0,0 +1,97 @@
+"""
+SOH snapshots are imported under the sales workbooks' store names, so the
+dashboard's store filter finds them.
+"""
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, event, text
+
+from dashboard import stock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import soh_update  # noqa: E402
+
+STORE_NAMES = {"GC": "GRAND CITY", "PM": "PLAZA MALL"}
+
+
+@pytest.fixture
+def soh_file(tmp_path):
+    path = tmp_path / "soh gc 20241226.xlsx"
+    pd.DataFrame({
+        "Item ID": ["1001", "1002", "1003"],
+        "Qty": [5, 2, 7],
+        "Stock Value": [50_000, 12_500, 70_000],
+    }).to_excel(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'soh.db'}")
+
+    @event.listens_for(engine, "connect")
+    def add_date_trunc(dbapi_conn, _):
+        # Only date_trunc('month', ...) is used by MONTHLY_SNAPSHOTS_SQL
+        dbapi_conn.create_function("date_trunc", 2, lambda _, value: value[:7])
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE stock_snapshot_summary (
+                store TEXT, snapshot_date DATE, category TEXT,
+                quantity NUMERIC, stock_value NUMERIC, products INTEGER, refreshed_at TIMESTAMP
+            )
+        """))
+    return engine
+
+
+def _load_summary(engine, rows):
+    """
+    The stock_snapshot_summary rows soh_update.load_snapshots would write for 'rows'.
+    """
+    summary = rows.groupby(["store", "snapshot_date"], as_index=False)[["quantity", "stock_value"]].sum()
+    summary["snapshot_date"] = summary["snapshot_date"].astype(str)
+    summary["category"] = "Unknown"
+    with engine.begin() as conn:
+        summary.to_sql("stock_snapshot_summary", conn, if_exists="append", index=False)
+
+
+def test_store_codes_become_store_names(soh_file):
+    rows = soh_update.read_soh_file(soh_file)
+    assert set(rows["store"]) == {"GC"}
+
+    named, unknown = soh_update.apply_store_names(rows, STORE_NAMES)
+    assert set(named["store"]) == {"GRAND CITY"}
+    assert unknown == []
+    assert named["product_id"].tolist() == rows["product_id"].tolist()
+
+
+def test_unmapped_store_codes_are_reported(soh_file):
+    rows = soh_update.read_soh_file(soh_file)
+    named, unknown = soh_update.apply_store_names(rows, {"pm": "PLAZA MALL"})
+    assert set(named["store"]) == {"GC"}
+    assert unknown == ["GC"]
+
+
+def test_store_codes_match_case_insensitively():
+    rows = pd.DataFrame({"store": ["gc ", "GRAND CITY"]})
+    named, unknown = soh_update.apply_store_names(rows, STORE_NAMES)
+    assert named["store"].tolist() == ["GRAND CITY", "GRAND CITY"]
+    assert unknown == []
+
+
+def test_filtered_snapshots_return_rows(soh_file, engine):
+    rows, _ = soh_update.apply_store_names(soh_update.read_soh_file(soh_file), STORE_NAMES)
+    _load_summary(engine, rows)
+
+    snapshots = stock.load_monthly_snapshots(engine)
+    selected = stock.select_snapshots(snapshots, [2024], ["December"], ["GRAND CITY"])
+
+    assert len(selected) == 1
+    assert selected["Stock Value"].iloc[0] == 132_500
+    assert selected["Date"].iloc[0] == datetime(2024, 12, 1)
+    assert stock.select_snapshots(snapshots, [2024], ["December"], ["PLAZA MALL"]).empty
@@ -0,0 +1,183 @@
+"""
+Dataset versions: how the batch jobs tell the web and Streamlit processes that data changed.
+
+A job calls bump(conn, dataset) in the transaction that loads the data. It
+increments the dataset's row of 'dataset_versions' and, on PostgreSQL, sends
+a NOTIFY on the 'dataset_versions' channel, which is delivered when the
+transaction commits (so readers never hear about data they can't see yet).
+
+Readers follow the versions with a VersionWatcher: a daemon thread that
+LISTENs on the channel and re-reads the table whenever a notification
+arrives, and every VERSION_POLL_SECONDS anyway. A dropped listener
+connection or a database without LISTEN/NOTIFY only delays an update.
+Subscribers are called with {dataset: version} of the datasets that changed.
+"""
+import logging
+import os
+import select
+import threading
+import time
+
+from sqlalchemy import inspect, text
+
+from db import get_engine
+
+PRODUCTS = "products"
+STOCK_SNAPSHOTS = "stock_snapshots"
+
+CHANNEL = "dataset_versions"
+POLL_SECONDS = float(os.getenv("VERSION_POLL_SECONDS", "30"))
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS dataset_versions (
+        dataset    TEXT PRIMARY KEY,
+        version    BIGINT NOT NULL,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+BUMP_SQL = text("""
+    INSERT INTO dataset_versions (dataset, version) VALUES (:dataset, 1)
+    ON CONFLICT (dataset)
+    DO UPDATE SET version = dataset_versions.version + 1, updated_at = CURRENT_TIMESTAMP
+""")
+
+logger = logging.getLogger(__name__)
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def version_key(dataset, version):
+    """
+    Cache key part identifying a version of a dataset, e.g. 'stock_snapshots-v12'
+    (the stored sales history uses 'history-v<n>' the same way).
+    """
+    return None if version is None else f"{dataset}-v{version}"
+
+
+def bump(conn, dataset):
+    """
+    Increments the version of 'dataset' and notifies the listeners when the
+    transaction of 'conn' commits. Returns the new version.
+    """
+    conn.execute(text(SCHEMA_SQL))
+    conn.execute(BUMP_SQL, {"dataset": dataset})
+    version = conn.execute(text("SELECT version FROM dataset_versions WHERE dataset = :dataset"),
+                           {"dataset": dataset}).scalar()
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                     {"channel": CHANNEL, "payload": f"{dataset}:{version}"})
+    return version
+
+
+def read_version(conn, dataset):
+    """
+    The current version of 'dataset' as seen by 'conn' (e.g. on a read replica), or None.
+    """
+    if not inspect(conn).has_table("dataset_versions"):
+        return None
+    return conn.execute(text("SELECT version FROM dataset_versions WHERE dataset = :dataset"),
+                        {"dataset": dataset}).scalar()
+
+
+def read_versions(engine):
+    """
+    Returns {dataset: version} ({} before any job bumped a version).
+    """
+    if not inspect(engine).has_table("dataset_versions"):
+        return {}
+    with engine.connect() as conn:
+        return dict(conn.execute(text("SELECT dataset, version FROM dataset_versions")).all())
+
+
+class VersionWatcher:
+    """
+    Follows the dataset versions of 'engine' in a daemon thread, started by the first subscriber.
+    """
+
+    def __init__(self, engine, poll_seconds=POLL_SECONDS):
+        self.engine = engine
+        self.poll_seconds = poll_seconds
+        self.versions = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, callback):
+        """
+        Calls 'callback({dataset: version})' with the datasets that changed,
+        first with every dataset once the versions are read.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="version-watcher", daemon=True)
+                self._thread.start()
+
+    def check(self):
+        """
+        Re-reads the versions and calls the subscribers if some changed. Returns the changes.
+        """
+        versions = read_versions(self.engine)
+        changed = {dataset: version for dataset, version in versions.items()
+                   if self.versions.get(dataset) != version}
+        self.versions = versions
+        if changed:
+            for callback in list(self._subscribers):
+                try:
+                    callback(changed)
+                except Exception:
+                    logger.exception("Dataset version subscriber failed")
+        return changed
+
+    def _listen(self):
+        # A connection of its own, outside the pool: it stays in LISTEN for the life of the thread
+        connection = self.engine.raw_connection()
+        connection.detach()
+        connection.dbapi_connection.autocommit = True
+        with connection.dbapi_connection.cursor() as cur:
+            cur.execute(f"LISTEN {CHANNEL}")
+        return connection
+
+    def _wait(self, listener):
+        """
+        Waits up to poll_seconds for a notification.
+        """
+        if listener is None:
+            time.sleep(self.poll_seconds)
+            return
+        dbapi = listener.dbapi_connection
+        if select.select([dbapi], [], [], self.poll_seconds)[0]:
+            dbapi.poll()
+            dbapi.notifies.clear()
+
+    def _run(self):
+        listener = None
+        while True:
+            try:
+                if listener is None and self.engine.dialect.name == "postgresql":
+                    listener = self._listen()
+                self.check()
+                self._wait(listener)
+            except Exception:
+                logger.exception("Dataset version watcher failed; retrying in %.0fs", self.poll_seconds)
+                if listener is not None:
+                    try:
+                        listener.close()
+                    except Exception:
+                        pass
+                    listener = None
+                time.sleep(self.poll_seconds)
+
+
+def get_watcher(engine=None):
+    """
+    The process's VersionWatcher for 'engine' (default: DATABASE_URL's).
+    """
+    engine = engine or get_engine()
+    with _watchers_lock:
+        key = str(engine.url)
+        if key not in _watchers:
+            _watchers[key] = VersionWatcher(engine)
+        return _watchers[key]